@@ -0,0 +1,260 @@
+"""
+Precomputed distances from every postcode to every school.
+
+Flow: json/school_coordinates.json + postcodes.csv -> afstanden.duckdb
+
+For lookups and aggregate analyses (e.g. how far placed students travel,
+per stadsdeel) without computing distances per session. The distances
+are haversine distances (see distance.py) stored as whole metres in a
+USMALLINT (uint16, so 65535 means 65.5 km or more), with the postcode and
+school as integer ids, 8 bytes per pair before compression. The table is
+sorted by postcode, so DuckDB's min/max zonemaps skip to a postcode's rows
+for a lookup; an ART index would triple the file without being faster.
+When only school_coordinates.json changed, only the distances of the
+schools that were added or moved are computed; a changed postcodes.csv
+rebuilds everything.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .distance import SchoolLocations, haversine, load_postcodes, normalize_postcode, postcode_arrays
+from .manifest import file_state, load_manifest, save_manifest
+from .scholen import database_swap
+
+DB_NAME = "afstanden.duckdb"
+# Bump when the tables in afstanden.duckdb change, to force a full rebuild
+TABLE_VERSION = 1
+# Postcodes per batch of distances, which bounds memory for all PC6 codes
+CHUNK_POSTCODES = 20000
+MAX_METRES = np.iinfo(np.uint16).max
+
+
+def quantize(metres) -> np.ndarray:
+    """Round distances to whole metres as uint16, capped at MAX_METRES."""
+    return np.minimum(np.rint(metres), MAX_METRES).astype(np.uint16)
+
+
+def create_distance_schema(con):
+    """Create the tables of afstanden.duckdb."""
+    con.execute("""
+        CREATE TABLE postcode (
+            postcode_id INTEGER PRIMARY KEY,
+            postcode VARCHAR NOT NULL UNIQUE,
+            lat DOUBLE NOT NULL,
+            lon DOUBLE NOT NULL
+        )
+    """)
+    con.execute("""
+        CREATE TABLE school_location (
+            school_id USMALLINT PRIMARY KEY,
+            naam VARCHAR NOT NULL UNIQUE,
+            lat DOUBLE NOT NULL,
+            lon DOUBLE NOT NULL
+        )
+    """)
+    con.execute("""
+        CREATE TABLE postcode_afstand (
+            postcode_id INTEGER NOT NULL,
+            school_id USMALLINT NOT NULL,
+            afstand USMALLINT NOT NULL
+        )
+    """)
+
+
+def insert_distances(con, table: str, postcode_ids, postcode_points, school_ids, school_points) -> int:
+    """
+    Insert the quantized distances from every postcode to every school
+    into table, CHUNK_POSTCODES postcodes at a time, ordered by postcode.
+    Returns the number of rows inserted.
+    """
+    school_ids = np.asarray(school_ids, dtype=np.uint16)
+    count = 0
+    for start in range(0, len(postcode_ids), CHUNK_POSTCODES):
+        chunk_ids = np.asarray(postcode_ids[start:start + CHUNK_POSTCODES], dtype=np.int32)
+        metres = haversine(postcode_points[start:start + CHUNK_POSTCODES], school_points)
+        _insert_columns(con, table, {
+            "postcode_id": np.repeat(chunk_ids, len(school_ids)),
+            "school_id": np.tile(school_ids, len(chunk_ids)),
+            "afstand": quantize(metres).ravel(),
+        })
+        count += metres.size
+    return count
+
+
+def _insert_columns(con, table: str, columns: dict):
+    """Insert rows given as NumPy columns with one INSERT ... SELECT over the registered arrays."""
+    con.register("afstanden_buffer", columns)
+    try:
+        con.execute(f"INSERT INTO {table} SELECT {', '.join(columns)} FROM afstanden_buffer")
+    finally:
+        con.unregister("afstanden_buffer")
+
+
+def _insert_schools(con, school_ids, names, points):
+    _insert_columns(con, "school_location", {
+        "school_id": np.asarray(school_ids, dtype=np.uint16), "naam": np.array(names, dtype=str),
+        "lat": points[:, 0], "lon": points[:, 1],
+    })
+
+
+def _rebuild_tables(con, postcodes: dict, coordinates: dict) -> dict:
+    """Fill a new afstanden.duckdb. Returns counts for the summary."""
+    create_distance_schema(con)
+    names, points = postcode_arrays(postcodes)
+    postcode_ids = np.arange(1, len(names) + 1, dtype=np.int32)
+    _insert_columns(con, "postcode", {
+        "postcode_id": postcode_ids, "postcode": np.array(names, dtype=str),
+        "lat": points[:, 0], "lon": points[:, 1],
+    })
+    locations = SchoolLocations(coordinates)
+    school_ids = np.arange(1, len(locations) + 1)
+    _insert_schools(con, school_ids, locations.names, locations.points)
+    count = insert_distances(con, "postcode_afstand", postcode_ids, points, school_ids, locations.points)
+    return {"postcodes": len(names), "schools": len(locations), "distances computed": count}
+
+
+def _update_schools(con, previous_path: Path, coordinates: dict) -> dict:
+    """
+    Fill a new afstanden.duckdb from the previous one, computing only the
+    distances of the schools that were added or moved; those of removed
+    schools are left out. Returns counts for the summary.
+    """
+    quoted = str(previous_path).replace("'", "''")
+    con.execute(f"ATTACH '{quoted}' AS previous (READ_ONLY)")
+    create_distance_schema(con)
+    con.execute("INSERT INTO postcode SELECT postcode_id, postcode, lat, lon FROM previous.postcode")
+
+    stored = {naam: (school_id, (lat, lon)) for school_id, naam, lat, lon in con.execute(
+        "SELECT school_id, naam, lat, lon FROM previous.school_location"
+    ).fetchall()}
+    changed = sorted(
+        name for name, point in coordinates.items()
+        if name not in stored or stored[name][1] != tuple(float(v) for v in point)
+    )
+    kept = sorted(name for name in stored if name in coordinates and name not in changed)
+
+    next_id = max((school_id for school_id, _ in stored.values()), default=0) + 1
+    school_ids = []
+    for name in changed:
+        if name in stored:
+            school_ids.append(stored[name][0])
+        else:
+            school_ids.append(next_id)
+            next_id += 1
+    if next_id > MAX_METRES + 1:
+        raise ValueError("too many schools for USMALLINT school ids; rebuild with --full")
+
+    names = kept + changed
+    ids = [stored[name][0] for name in kept] + school_ids
+    points = np.array([coordinates[name] for name in names], dtype=np.float64).reshape(-1, 2)
+    _insert_schools(con, ids, names, points)
+
+    con.execute("CREATE TEMP TABLE changed_afstand AS SELECT * FROM postcode_afstand LIMIT 0")
+    postcode_ids, lats, lons = con.execute(
+        "SELECT list(postcode_id ORDER BY postcode_id), list(lat ORDER BY postcode_id), "
+        "list(lon ORDER BY postcode_id) FROM postcode"
+    ).fetchone()
+    count = insert_distances(
+        con, "changed_afstand", postcode_ids or [], np.column_stack([lats or [], lons or []]),
+        school_ids, points[len(kept):],
+    )
+    # Kept and new distances are written together in postcode order
+    con.execute("""
+        INSERT INTO postcode_afstand
+        SELECT * FROM (
+            SELECT * FROM previous.postcode_afstand WHERE school_id IN (SELECT UNNEST(?::USMALLINT[]))
+            UNION ALL
+            SELECT * FROM changed_afstand
+        )
+        ORDER BY postcode_id, school_id
+    """, [ids[:len(kept)]])
+    return {"schools added or moved": len(changed), "distances computed": count}
+
+
+def create_database(base_dir: Path, full: bool = False) -> bool:
+    """
+    Create or update afstanden.duckdb from school_coordinates.json and postcodes.csv.
+
+    Rebuilt from scratch when the database is missing, postcodes.csv or
+    TABLE_VERSION changed, or full is set; otherwise only the distances of
+    the schools whose coordinates changed are computed, and the others are
+    copied from the previous database. Returns False if there is nothing to
+    build from.
+    """
+    db_path = base_dir / DB_NAME
+    coordinates_path = base_dir / "json" / "school_coordinates.json"
+    postcodes_path = base_dir / "postcodes.csv"
+    if not postcodes_path.exists() or not coordinates_path.exists():
+        print(f"No {postcodes_path.name} or {coordinates_path.name}, skipping {DB_NAME}")
+        return False
+
+    manifest = load_manifest(base_dir)
+    previous = manifest.get("afstanden", {})
+    states = {
+        "coordinates": file_state(coordinates_path, previous.get("coordinates")),
+        "postcodes": file_state(postcodes_path, previous.get("postcodes")),
+    }
+    rebuild = (full or not db_path.exists() or previous.get("version") != TABLE_VERSION
+               or previous.get("postcodes", {}).get("hash") != states["postcodes"]["hash"])
+    if not rebuild and previous.get("coordinates", {}).get("hash") == states["coordinates"]["hash"]:
+        print(f"School coordinates and postcodes unchanged, {db_path} is up to date")
+        return True
+
+    with open(coordinates_path, encoding="utf-8") as f:
+        coordinates = json.load(f)
+
+    start = time.perf_counter()
+    with database_swap(db_path) as con:
+        if rebuild:
+            counts = _rebuild_tables(con, load_postcodes(postcodes_path), coordinates)
+        else:
+            counts = _update_schools(con, db_path, coordinates)
+        total = con.execute("SELECT COUNT(*) FROM postcode_afstand").fetchone()[0]
+    elapsed = time.perf_counter() - start
+
+    print(f"\n--- Distance Table ({'full rebuild' if rebuild else 'changed schools only'}) ---")
+    for label, count in counts.items():
+        print(f"  {label}: {count}")
+    print(f"  postcode_afstand: {total} rows in total, {db_path.stat().st_size / 1024 / 1024:.1f} MiB")
+    print(f"Built in {elapsed:.2f}s")
+
+    manifest["afstanden"] = {**states, "version": TABLE_VERSION}
+    save_manifest(base_dir, manifest)
+    return True
+
+
+def lookup_distances(con, postcode: str, schema: str = "") -> dict:
+    """
+    Return {school naam: metres} for a postcode from afstanden.duckdb,
+    falling back from a PC6 to its PC4; {} if the postcode is unknown.
+    """
+    postcode = normalize_postcode(postcode)
+    if postcode is None:
+        return {}
+    for code in dict.fromkeys([postcode, postcode[:4]]):
+        rows = con.execute(f"""
+            SELECT s.naam, a.afstand
+            FROM {schema}postcode p
+            JOIN {schema}postcode_afstand a ON a.postcode_id = p.postcode_id
+            JOIN {schema}school_location s ON s.school_id = a.school_id
+            WHERE p.postcode = ?
+        """, [code]).fetchall()
+        if rows:
+            return dict(rows)
+    return {}
+
+
+def build(base_dir: Path, full: bool = False):
+    """Create or update afstanden.duckdb."""
+    print("=" * 60)
+    print("Building afstanden.duckdb from school coordinates and postcodes")
+    print("=" * 60)
+    print()
+
+    create_database(base_dir, full=full)
+
+    print("\nDone!")
@@ -2,24 +2,55 @@
 CLI for regenerating the databases from source files.
 
 Usage:
-    uv run middelbare
+    uv run middelbare [--jobs N] [--full] [--load {python,sql}]
+    uv run middelbare fetch [--threads N] [--interval SECONDS] [--urls FILE]
+    uv run middelbare [--jobs N] simulate AFDELING_ID [AFDELING_ID ...]
+    uv run middelbare [--jobs N] extract-pdf [PDF]
+    uv run middelbare update-loting [--jaar JAAR ...] [--json DIR ...]
 
 This will:
-1. Parse HTML files from html/ -> JSON files in json/
+1. Parse the HTML pages in pages/ (imported from html/ or fetched) -> JSON files in json/
 2. Create scholen.duckdb from JSON files
 3. Update loting_matching.duckdb from json/matching_en_plaatsing/
+4. Precompute afstanden.duckdb from json/school_coordinates.json and postcodes.csv, if present
+
+Only files that changed since the last build (see build_manifest.json) are
+parsed and reloaded; --full rebuilds everything. With --jobs N the HTML
+files are parsed on N worker processes (0 = one per CPU). With --load sql
+scholen.duckdb is built from the JSON by DuckDB's read_json instead of in
+Python.
+
+The fetch command downloads the resultaten and tevredenheid pages of the
+schools in urls.txt into the page store (pages/), a few at a time and rate
+limited per host. Pages that did not change since the last fetch (see
+fetch_cache.json) are not downloaded or stored again.
+
+The simulate command estimates the chance of being placed at each afdeling
+of a ranked list (afdeling ids from loting_matching.duckdb) by simulating
+the lottery and matching, on --jobs worker processes.
+
+The extract-pdf command parses the tables of a Loting en Matching verslag
+(by default the most recent Loting-en-Matching-*-Verslag.pdf) into the JSON
+files in json/matching_en_plaatsing/, laying out pages on --jobs worker
+processes and caching them in pdf_cache/.
+
+The update-loting command only runs step 3, for the years given with
+--jaar (default: every year found in the JSON). To backfill several years
+in one pass, extract each verslag with --output to its own directory and
+pass those directories with --json, oldest first.
 """
 
+import argparse
+import os
 from pathlib import Path
 
+from . import afstanden
 from . import scholen
 from . import loting
 
 
-def main():
+def build(base_dir: Path, jobs: int = 1, full: bool = False, load: str = "python"):
     """Regenerate all databases from source files."""
-    base_dir = Path(".")
-
     print()
     print("=" * 60)
     print("  Middelbare Database Builder")
@@ -27,13 +58,18 @@ def main():
     print()
 
     # Build scholen.duckdb
-    scholen.build(base_dir)
+    scholen.build(base_dir, jobs=jobs, full=full, load=load)
 
     print()
 
     # Update loting_matching.duckdb
     loting.build(base_dir)
 
+    print()
+
+    # Precompute postcode x school distances, if there are postcodes
+    afstanden.build(base_dir, full=full)
+
     print()
     print("=" * 60)
     print("  All databases updated successfully!")
@@ -41,5 +77,93 @@ def main():
     print()
 
 
+def main(argv=None):
+    """Parse command line arguments and run the requested command."""
+    parser = argparse.ArgumentParser(prog="middelbare", description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Worker processes for parsing HTML or PDF pages, or simulating (0 = one per CPU, default 1)",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Rebuild everything instead of only files changed since the last build",
+    )
+    parser.add_argument(
+        "--load", choices=["python", "sql"], default="python",
+        help="Load scholen.duckdb in Python (incremental) or with DuckDB's read_json (full)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    fetch_parser = subparsers.add_parser(
+        "fetch", help="Download the school pages in urls.txt into the page store"
+    )
+    fetch_parser.add_argument("--threads", type=int, default=4, help="Concurrent requests (default 4)")
+    fetch_parser.add_argument(
+        "--interval", type=float, default=0.5, help="Minimum seconds between requests to one host (default 0.5)"
+    )
+    fetch_parser.add_argument("--urls", type=Path, help="URL list (default: urls.txt)")
+
+    simulate_parser = subparsers.add_parser(
+        "simulate", help="Estimate placement probabilities for a ranked list of afdelingen"
+    )
+    simulate_parser.add_argument("afdeling_ids", type=int, nargs="+", help="Afdeling ids, in order of preference")
+    simulate_parser.add_argument("--replications", type=int, default=20000, help="Simulated matchings")
+    simulate_parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible results")
+    simulate_parser.add_argument("--jaar", type=int, default=2025, help="Year of capacities and preferences")
+    simulate_parser.add_argument(
+        "--niveau", type=int, action="append",
+        help="Onderwijsniveau id taking part in the matching (repeatable, default 1 = vwo)",
+    )
+    simulate_parser.add_argument(
+        "--tie-breaking", choices=["single", "multiple"], default="single",
+        help="One lottery number per student, or one per student and afdeling",
+    )
+
+    extract_parser = subparsers.add_parser(
+        "extract-pdf", help="Extract the tables of a Loting en Matching verslag to JSON"
+    )
+    extract_parser.add_argument("pdf", type=Path, nargs="?", help="Verslag PDF (default: the most recent)")
+    extract_parser.add_argument(
+        "--output", type=Path, help="Directory for the JSON files (default: json/matching_en_plaatsing)"
+    )
+
+    update_parser = subparsers.add_parser(
+        "update-loting", help="Update loting_matching.duckdb from the JSON of one or more verslagen"
+    )
+    update_parser.add_argument(
+        "--jaar", type=int, action="append", help="Year to update (repeatable, default: all years in the JSON)"
+    )
+    update_parser.add_argument(
+        "--json", type=Path, action="append", dest="json_dirs",
+        help="Directory with the extracted JSON (repeatable, later wins; default: json/matching_en_plaatsing)",
+    )
+
+    args = parser.parse_args(argv)
+    base_dir = Path(".")
+
+    if args.command == "fetch":
+        from . import fetch
+        if not fetch.fetch(base_dir, args.urls, threads=args.threads, interval=args.interval):
+            raise SystemExit(1)
+    elif args.command == "simulate":
+        from . import simulatie
+        if not simulatie.simulate(
+            base_dir, args.afdeling_ids, replications=args.replications, seed=args.seed,
+            jobs=args.jobs or os.cpu_count(), jaar=args.jaar, niveaus=tuple(args.niveau or [1]),
+            tie_breaking=args.tie_breaking,
+        ):
+            raise SystemExit(1)
+    elif args.command == "extract-pdf":
+        from . import verslag
+        if not verslag.extract_pdf(
+            base_dir, args.pdf, jobs=args.jobs or os.cpu_count(), output_dir=args.output
+        ):
+            raise SystemExit(1)
+    elif args.command == "update-loting":
+        loting.build(base_dir, jaren=args.jaar, json_dirs=args.json_dirs)
+    else:
+        build(base_dir, jobs=args.jobs or os.cpu_count(), full=args.full, load=args.load)
+
+
 if __name__ == "__main__":
     main()
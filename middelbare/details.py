@@ -0,0 +1,233 @@
+"""
+Data behind the School Details tab of the dashboard.
+
+Everything the detail view shows for an afdeling (lottery figures,
+placements per preference, exams, pass rate, satisfaction and inspection)
+is fetched with two parameterized queries, for one or several afdelingen
+at once, instead of one string-interpolated query per section.
+SchoolDetailCache keeps recent results and prefetches the neighbours of
+the current selection in the background. Expects a connection with
+scholen.duckdb attached as scholen_db and loting_matching.duckdb as
+loting_db, like the notebook.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SchoolDetail:
+    """Everything the detail view shows for one afdeling."""
+
+    afdeling_id: int
+    school_name: str
+    # School, afdeling, variant, type, stadsdeel, capaciteit, voorkeuren and ratio
+    loting: dict | None = None
+    # Placed students per preference position (1 = first choice)
+    plaatsingen: dict = field(default_factory=dict)
+    # Exam results per schooljaar, most recent first
+    examens: list = field(default_factory=list)
+    # Most recent pass rate and national comparison
+    slagingspercentage: dict | None = None
+    # Most recent satisfaction score per metric
+    tevredenheid: dict = field(default_factory=dict)
+    # Satisfaction questions per respondent, best scores first
+    tevredenheid_vragen: list = field(default_factory=list)
+    # Inspection indicators with their norm
+    inspectie: list = field(default_factory=list)
+
+
+# Lottery figures for the requested afdelingen, one row each
+LOTING_SQL = """
+    SELECT a.id AS afdeling_id, ls.naam as school, a.naam as afdeling, a.variant, ls.type,
+           sd.naam as stadsdeel, c.definitieve_capaciteit as capaciteit,
+           v.eerste_voorkeur, v.tweede_voorkeur, v.derde_voorkeur,
+           ROUND(CAST(v.eerste_voorkeur AS FLOAT) / NULLIF(c.definitieve_capaciteit, 0), 2) as ratio
+    FROM loting_db.afdeling a
+    JOIN loting_db.loting_school ls ON a.school_id = ls.id
+    JOIN loting_db.stadsdeel sd ON ls.stadsdeel_id = sd.id
+    LEFT JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = $jaar
+    LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = $jaar
+    WHERE list_contains($afdeling_ids, a.id)
+"""
+
+# Everything else as flat (kind, owner, label, detail, v1, v2, v3, seq) rows:
+# placements are owned by an afdeling id, the rest by a school name. Flat
+# UNION ALL branches are several times cheaper in DuckDB than building the
+# same nested lists with aggregates.
+RESULTS_SQL = """
+    WITH ids AS MATERIALIZED (
+        SELECT id, name FROM scholen_db.schools WHERE list_contains($school_names, name)
+    )
+    SELECT 'plaatsing' AS kind, p.afdeling_id::VARCHAR AS owner, NULL AS label, NULL AS detail,
+           p.voorkeur_positie::DOUBLE AS v1, p.aantal::DOUBLE AS v2, NULL::DOUBLE AS v3, p.rowid AS seq
+    FROM loting_db.plaatsing_per_voorkeur p
+    WHERE list_contains($afdeling_ids, p.afdeling_id) AND p.jaar = $jaar
+    UNION ALL
+    SELECT 'examen', i.name, e.schooljaar, NULL, ROUND(e.centraal_examen, 2),
+           ROUND(e.centraal_examen_vergelijking, 2), ROUND(e.eindcijfer, 2), e.rowid
+    FROM ids i JOIN scholen_db.examencijfers e ON e.school_id = i.id
+    UNION ALL
+    SELECT 'slaag', i.name, sp.schooljaar, NULL, ROUND(sp.percentage, 1), ROUND(sp.vergelijking, 1), NULL, sp.rowid
+    FROM ids i JOIN scholen_db.slagingspercentage sp ON sp.school_id = i.id
+    UNION ALL
+    SELECT 'trend', i.name, t.schooljaar, t.metric, ROUND(t.cijfer, 1), NULL, NULL, t.rowid
+    FROM ids i JOIN scholen_db.tevredenheid_trend t ON t.school_id = i.id
+    UNION ALL
+    SELECT 'vraag', i.name, tv.respondent, tv.vraag, ROUND(tv.cijfer, 1), NULL, NULL, tv.rowid
+    FROM ids i JOIN scholen_db.tevredenheid_vragen tv ON tv.school_id = i.id
+    UNION ALL
+    SELECT 'inspectie', i.name, o.indicator, NULL, ROUND(o.schoolwaarde, 2), ROUND(o.inspectienorm, 2), NULL, o.rowid
+    FROM ids i JOIN scholen_db.oordeel_inspectie o ON o.school_id = i.id
+"""
+
+
+def _school_results(rows):
+    """Group the school-owned RESULTS_SQL rows per school name and kind."""
+    results = {}
+    for kind, owner, label, detail, v1, v2, v3, seq in sorted(rows, key=lambda row: row[-1]):
+        results.setdefault(owner, {}).setdefault(kind, []).append((label, detail, v1, v2, v3))
+    return results
+
+
+def fetch_school_details(db, keys, jaar: int = 2025) -> dict:
+    """
+    Fetch the details of several afdelingen in two queries.
+
+    keys are (afdeling_id, school name in scholen_db) pairs. Returns
+    {afdeling_id: SchoolDetail}.
+    """
+    names = dict(keys)
+    if not names:
+        return {}
+
+    params = {"jaar": jaar, "afdeling_ids": list(names)}
+    cursor = db.execute(LOTING_SQL, params)
+    columns = [column[0] for column in cursor.description]
+    loting = {row[0]: dict(zip(columns[1:], row[1:])) for row in cursor.fetchall()}
+
+    rows = db.execute(RESULTS_SQL, {**params, "school_names": sorted(set(names.values()) - {None})}).fetchall()
+    plaatsingen = {}
+    for kind, owner, _, _, positie, aantal, _, _ in rows:
+        if kind != "plaatsing":
+            continue
+        plaatsingen.setdefault(int(owner), {})[int(positie)] = int(aantal)
+    results = _school_results(r for r in rows if r[0] != "plaatsing")
+
+    details = {}
+    for afdeling_id, school_name in names.items():
+        school = results.get(school_name, {})
+        examens = [
+            {"schooljaar": label, "ce": ce, "ce_land": ce_land, "eindcijfer": eindcijfer}
+            for label, _, ce, ce_land, eindcijfer in school.get("examen", [])
+        ]
+        examens.sort(key=lambda row: row["schooljaar"], reverse=True)
+        slaag = [
+            {"schooljaar": label, "pct": pct, "land": land}
+            for label, _, pct, land, _ in school.get("slaag", [])
+        ]
+        tevredenheid = {}
+        for label, metric, cijfer, _, _ in sorted(school.get("trend", []), key=lambda row: row[0]):
+            tevredenheid[metric] = cijfer
+        vragen = [
+            {"respondent": respondent, "vraag": vraag, "cijfer": cijfer}
+            for respondent, vraag, cijfer, _, _ in school.get("vraag", [])
+        ]
+        # Best scores first per respondent, missing scores last
+        vragen.sort(key=lambda row: (row["respondent"], row["cijfer"] is None, -(row["cijfer"] or 0)))
+
+        details[afdeling_id] = SchoolDetail(
+            afdeling_id=afdeling_id,
+            school_name=school_name,
+            loting=loting.get(afdeling_id),
+            plaatsingen=plaatsingen.get(afdeling_id, {}),
+            examens=examens,
+            slagingspercentage=max(slaag, key=lambda row: row["schooljaar"]) if slaag else None,
+            tevredenheid=tevredenheid,
+            tevredenheid_vragen=vragen,
+            inspectie=[
+                {"indicator": label, "waarde": waarde, "norm": norm}
+                for label, _, waarde, norm, _ in school.get("inspectie", [])
+            ],
+        )
+    return details
+
+
+def fetch_school_detail(db, afdeling_id: int, school_name: str, jaar: int = 2025) -> SchoolDetail:
+    """Fetch the details of one afdeling."""
+    return fetch_school_details(db, [(afdeling_id, school_name)], jaar)[afdeling_id]
+
+
+class SchoolDetailCache:
+    """
+    Recently viewed school details, with background prefetching.
+
+    get() returns a cached detail, waits for a prefetch in flight, or
+    fetches on the caller's connection. prefetch() fetches the given keys
+    on a worker thread with its own cursor, so the next click is served
+    from memory. At most max_entries details are kept (least recently used
+    are dropped first).
+    """
+
+    def __init__(self, db, jaar: int = 2025, max_entries: int = 64):
+        self.db = db
+        self.jaar = jaar
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.worker_db = db.cursor()
+
+    def _store(self, key, detail):
+        self.entries[key] = detail
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all cached details, e.g. after the databases were rebuilt."""
+        with self.lock:
+            self.entries.clear()
+            self.pending.clear()
+
+    def get(self, afdeling_id: int, school_name: str) -> SchoolDetail:
+        """Return the details of an afdeling, from the cache if possible."""
+        key = (afdeling_id, school_name)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            future = self.pending.pop(key, None)
+
+        if future is not None and future.exception() is None:
+            detail = future.result()[afdeling_id]
+        else:
+            detail = fetch_school_detail(self.db, afdeling_id, school_name, self.jaar)
+        with self.lock:
+            self._store(key, detail)
+        return detail
+
+    def prefetch(self, keys):
+        """Fetch (afdeling_id, school name) keys in the background, in one batch."""
+        with self.lock:
+            missing = [key for key in dict.fromkeys(keys) if key not in self.entries and key not in self.pending]
+            if not missing:
+                return
+            future = self.executor.submit(fetch_school_details, self.worker_db, missing, self.jaar)
+            for key in missing:
+                self.pending[key] = future
+        future.add_done_callback(lambda f: self._prefetched(missing, f))
+
+    def _prefetched(self, keys, future):
+        """Move finished prefetches into the cache; failed ones are refetched by get()."""
+        if future.exception() is not None:
+            return
+        details = future.result()
+        with self.lock:
+            for key in keys:
+                if self.pending.get(key) is future:
+                    del self.pending[key]
+                    self._store(key, details[key[0]])
@@ -0,0 +1,138 @@
+"""
+Distances from home to the schools.
+
+Flow: json/school_coordinates.json (+ postcodes.csv) -> SchoolLocations -> metres per school
+
+Distances are great-circle (haversine) distances in metres, computed for
+one origin or a batch of origins against all schools in one NumPy
+expression. Cycling times are approximated from them with a detour factor
+for the street network and an average speed; they are estimates, not
+routes. An origin is a "lat, lon" pair or a Dutch postcode, looked up in
+an optional local file of postcode centroids (postcodes.csv, columns
+postcode,lat,lon with PC4 and/or PC6 rows).
+"""
+
+import csv
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000
+
+# Cycling route length over straight-line distance, and average speed
+DETOUR_FACTOR = 1.3
+CYCLING_SPEED_KMH = 15
+
+POSTCODE_PATTERN = re.compile(r"^(\d{4})\s*([A-Za-z]{2})?$")
+LAT_LON_PATTERN = re.compile(r"^(-?\d+(?:\.\d+)?)\s*[,; ]\s*(-?\d+(?:\.\d+)?)$")
+
+
+def haversine(origins, destinations) -> np.ndarray:
+    """
+    Return the distances in metres between (lat, lon) points in degrees.
+
+    origins and destinations are (lat, lon) pairs or arrays of shape (n, 2);
+    the result has shape (origins, destinations), without the dimensions
+    of single points, so one origin against all schools is a 1-d array.
+    """
+    origins = np.radians(np.asarray(origins, dtype=np.float64))
+    destinations = np.radians(np.asarray(destinations, dtype=np.float64))
+    lat1, lon1 = origins[..., 0], origins[..., 1]
+    lat2, lon2 = destinations[..., 0], destinations[..., 1]
+    if origins.ndim > 1 and destinations.ndim > 1:
+        lat1, lon1 = lat1[:, None], lon1[:, None]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cycling_minutes(metres) -> np.ndarray:
+    """Approximate cycling time in minutes for straight-line distances in metres."""
+    return np.asarray(metres) * DETOUR_FACTOR / (CYCLING_SPEED_KMH * 1000 / 60)
+
+
+# =============================================================================
+# Origins
+# =============================================================================
+
+def normalize_postcode(text: str) -> str | None:
+    """Return a postcode as '1234AB' or '1234', or None if text is not one."""
+    match = POSTCODE_PATTERN.match((text or "").strip())
+    if not match:
+        return None
+    return match.group(1) + (match.group(2) or "").upper()
+
+
+def load_postcodes(path: Path) -> dict:
+    """Load {postcode: (lat, lon)} from a postcode centroid CSV, or {} if it is missing."""
+    if not path.exists():
+        return {}
+    postcodes = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            postcode = normalize_postcode(row["postcode"])
+            if postcode:
+                postcodes[postcode] = (float(row["lat"]), float(row["lon"]))
+    return postcodes
+
+
+def postcode_arrays(postcodes: dict):
+    """Return the postcodes and their centroids as an (n, 2) array, as batch origins."""
+    names = sorted(postcodes)
+    points = np.array([postcodes[name] for name in names], dtype=np.float64).reshape(-1, 2)
+    return names, points
+
+
+def parse_origin(text: str, postcodes: dict):
+    """
+    Return (lat, lon) for a 'lat, lon' pair or a postcode, or None.
+
+    A PC6 postcode missing from postcodes falls back to its PC4 centroid.
+    """
+    text = (text or "").strip()
+    match = LAT_LON_PATTERN.match(text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+        return None
+    postcode = normalize_postcode(text)
+    if postcode is None:
+        return None
+    return postcodes.get(postcode) or postcodes.get(postcode[:4])
+
+
+# =============================================================================
+# Schools
+# =============================================================================
+
+class SchoolLocations:
+    """
+    The coordinates of all schools, keyed by loting school name, as one
+    array, so distances to all of them are one haversine() call.
+    """
+
+    def __init__(self, coordinates: dict):
+        self.names = sorted(coordinates)
+        self.points = np.array([coordinates[name] for name in self.names], dtype=np.float64).reshape(-1, 2)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_json(cls, path: Path):
+        """Load json/school_coordinates.json ({naam: [lat, lon]})."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, name: str):
+        """Return the (lat, lon) of a school, or None."""
+        i = self.positions.get(name)
+        return None if i is None else (float(self.points[i, 0]), float(self.points[i, 1]))
+
+    def distances(self, origins) -> np.ndarray:
+        """Return metres from one origin (n_schools,) or a batch (n_origins, n_schools) to every school."""
+        return haversine(origins, self.points)
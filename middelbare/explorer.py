@@ -0,0 +1,139 @@
+"""
+Queries behind the School Explorer tab of the dashboard.
+
+The explorer filters are evaluated in DuckDB, so a keystroke in the name
+search only re-runs one query instead of fetching every afdeling and
+filtering in Python. With a NameIndex (see search.py) the name search is
+fuzzy: the index gives the matching afdelingen and their scores, which
+are joined in as a registered relation. Distances from an origin to the
+schools (see distance.py) are computed in NumPy and joined in the same
+way, so the radius filter is part of the query too. Expects a connection
+with loting_matching.duckdb attached as loting_db, like the notebook.
+"""
+
+import numpy as np
+
+EXPLORER_SQL = """
+    SELECT * EXCLUDE (score)
+    FROM (
+        SELECT
+            a.id as afdeling_id, ls.naam as school, a.naam as afdeling, a.variant,
+            ls.type, sd.naam as stadsdeel, c.definitieve_capaciteit as capaciteit,
+            v.eerste_voorkeur,
+            ROUND(CAST(v.eerste_voorkeur AS FLOAT) / NULLIF(c.definitieve_capaciteit, 0), 2) as ratio,
+            {afstand} as afstand, {score} as score
+        FROM loting_db.afdeling a
+        JOIN loting_db.loting_school ls ON a.school_id = ls.id
+        JOIN loting_db.stadsdeel sd ON ls.stadsdeel_id = sd.id
+        LEFT JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = {jaar}
+        LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = {jaar}
+        {match_join}
+        {distance_join}
+        WHERE {where}
+    )
+    WHERE {outer_where}
+    ORDER BY {order}ratio DESC NULLS LAST, afdeling_id
+"""
+
+
+def explorer_rows(db, stadsdeel_id=None, school_type=None, ratio_range=(0, 3),
+                  name_search: str = "", hidden=(), show_hidden: bool = False,
+                  jaar: int = 2025, name_index=None, locations=None, origin=None,
+                  max_distance=None) -> list[dict]:
+    """
+    Return the vwo afdelingen matching the explorer filters, as dicts.
+
+    ratio_range is inclusive; a missing ratio counts as 0. name_search is
+    a case-insensitive substring of the school name or variant, or with
+    name_index a fuzzy match on any school or afdeling name, best match
+    first. Afdelingen in hidden are left out unless show_hidden is set;
+    is_hidden marks them. With locations (distance.SchoolLocations) and an
+    origin (lat, lon), afstand holds the distance to the school in metres,
+    NULL for schools without coordinates (under their name or the part
+    before " - "); max_distance (metres) then leaves out schools further
+    away or without coordinates.
+
+    Only the active filters end up in the query. Numbers are formatted
+    into it through int() or float(); only text is bound as a parameter,
+    as every bound value adds to the fixed cost of a refresh. Hidden ids
+    are a set lookup per row, cheaper than registering them for a join.
+    """
+    where = ["a.onderwijsniveau_id = 1"]
+    params = {}
+
+    if stadsdeel_id:
+        where.append(f"ls.stadsdeel_id = {int(stadsdeel_id)}")
+    if school_type:
+        where.append("ls.type = $type")
+        params["type"] = school_type
+
+    # The ratio is computed once, in the subquery, and filtered on outside it
+    min_ratio, max_ratio = ratio_range
+    outer_where = [f"COALESCE(ratio, 0) BETWEEN {float(min_ratio)!r} AND {float(max_ratio)!r}"]
+
+    name_search = (name_search or "").strip().lower()
+    matches = {}
+    if name_search and name_index is not None:
+        matches = name_index.afdeling_scores(name_search)
+        if not matches:
+            return []
+    elif name_search:
+        where.append(
+            "(contains(lower(ls.naam), $name_search)"
+            " OR contains(lower(COALESCE(a.variant, '')), $name_search))"
+        )
+        params["name_search"] = name_search
+
+    if matches:
+        match_join = "JOIN explorer_matches m ON a.id = m.id"
+        score = "m.score"
+        order = "score DESC, "
+        db.register("explorer_matches", {
+            "id": np.fromiter(matches.keys(), dtype=np.int64, count=len(matches)),
+            "score": np.fromiter(matches.values(), dtype=np.float64, count=len(matches)),
+        })
+    else:
+        match_join = ""
+        score = "NULL"
+        order = ""
+
+    with_distance = locations is not None and origin is not None and len(locations) > 0
+    if with_distance:
+        # Variants listed as schools of their own ("<school> - <variant>")
+        # share the coordinates of the school
+        afstand = "COALESCE(d.afstand, dp.afstand)"
+        distance_join = (
+            "LEFT JOIN explorer_distance d ON ls.naam = d.naam"
+            " LEFT JOIN explorer_distance dp ON split_part(ls.naam, ' - ', 1) = dp.naam"
+        )
+        if max_distance is not None:
+            outer_where.append(f"afstand <= {float(max_distance)!r}")
+        db.register("explorer_distance", {
+            "naam": np.array(locations.names, dtype=str),
+            "afstand": locations.distances(origin),
+        })
+    else:
+        afstand = "CAST(NULL AS DOUBLE)"
+        distance_join = ""
+
+    query = EXPLORER_SQL.format(jaar=int(jaar), afstand=afstand, score=score, match_join=match_join,
+                                distance_join=distance_join, where=" AND ".join(where),
+                                outer_where=" AND ".join(outer_where), order=order)
+    try:
+        cursor = db.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        if matches:
+            db.unregister("explorer_matches")
+        if with_distance:
+            db.unregister("explorer_distance")
+
+    hidden = set(hidden)
+    result = []
+    for row in rows:
+        row = dict(zip(columns, row))
+        row["is_hidden"] = row["afdeling_id"] in hidden
+        if show_hidden or not row["is_hidden"]:
+            result.append(row)
+    return result
@@ -0,0 +1,260 @@
+"""
+Download the scholenopdekaart pages listed in urls.txt into the page store.
+
+Flow: urls.txt -> pages/ (resultaten-<slug>.html + tevredenheid-<slug>.html)
+
+Every school URL has two pages, <url>resultaten/ and <url>tevredenheid/.
+Pages are fetched on a thread pool, with one keep-alive connection per
+thread and host, and requests to the same host are spaced at least
+--interval seconds apart. The ETag and Last-Modified of every page are kept
+in fetch_cache.json and sent back as If-None-Match and If-Modified-Since,
+so unchanged pages come back as 304 Not Modified and are not stored
+again. Changed pages are added to the page store as a new snapshot; the
+store's index is only written at the end, so a failed run never leaves a
+half-written page for the build to parse.
+"""
+
+import gzip
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .pagestore import open_store
+
+CACHE_NAME = "fetch_cache.json"
+PAGES = ("resultaten", "tevredenheid")
+USER_AGENT = "middelbare (+https://github.com/evertlammerts/middelboard)"
+TIMEOUT = 30
+# Attempts per page; connection errors and these statuses are retried
+ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# =============================================================================
+# Page List
+# =============================================================================
+
+def read_urls(path: Path) -> list[str]:
+    """Return the school URLs in a urls.txt, skipping blank lines and comments."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def page_targets(urls) -> list[tuple[str, str]]:
+    """Return (page URL, html file name) for the resultaten and tevredenheid page of every school."""
+    targets = []
+    for url in urls:
+        base = url if url.endswith("/") else url + "/"
+        slug = urlsplit(base).path.rstrip("/").rsplit("/", 1)[-1]
+        for page in PAGES:
+            targets.append((f"{base}{page}/", f"{page}-{slug}.html"))
+    return targets
+
+
+def load_cache(base_dir: Path) -> dict:
+    """Load the ETag cache, or an empty one if missing or unreadable."""
+    path = base_dir / CACHE_NAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_cache(base_dir: Path, cache: dict):
+    """Write the ETag cache atomically."""
+    path = base_dir / CACHE_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    tmp_path.replace(path)
+
+
+# =============================================================================
+# Connections
+# =============================================================================
+
+class HostRateLimiter:
+    """
+    Spaces requests to the same host at least interval seconds apart.
+
+    wait() reserves the next free slot for the host under a lock and sleeps
+    outside it, so threads waiting for one host do not hold up another.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host: str):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections, one per thread and host.
+
+    http.client connections are not thread-safe, so every thread gets its
+    own; all of them are kept in a list so close() can close them at the end.
+    """
+
+    def __init__(self, timeout: float = TIMEOUT):
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.opened = 0
+
+    def get(self, scheme: str, host: str):
+        """Return this thread's connection to a host, opening it if needed."""
+        connections = self.local.__dict__.setdefault("connections", {})
+        key = (scheme, host)
+        if key not in connections:
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connections[key] = connection_class(host, timeout=self.timeout)
+            with self.lock:
+                self.connections.append(connections[key])
+                self.opened += 1
+        return connections[key]
+
+    def discard(self, scheme: str, host: str):
+        """Close this thread's connection to a host, e.g. after the server dropped it."""
+        connection = self.local.__dict__.get("connections", {}).pop((scheme, host), None)
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+
+
+# =============================================================================
+# Fetching
+# =============================================================================
+
+def _retry_delay(response, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if given in seconds, else a backoff."""
+    retry_after = response.getheader("Retry-After", "")
+    return float(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt
+
+
+def fetch_page(pool, limiter, url: str, store, name: str, cached: dict | None):
+    """
+    Fetch one page with a conditional request and add it to the page store.
+
+    Returns (status, cache entry), status being updated or unchanged. A
+    page whose content did not change is not stored again, even without
+    a 304. Raises RuntimeError when the page cannot be fetched.
+    """
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+    if cached and store.latest(name) is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    for attempt in range(ATTEMPTS):
+        limiter.wait(parts.netloc)
+        connection = pool.get(parts.scheme, parts.netloc)
+        try:
+            connection.request("GET", target, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError) as e:
+            # A keep-alive connection the server closed fails on reuse; reconnect
+            pool.discard(parts.scheme, parts.netloc)
+            if attempt == ATTEMPTS - 1:
+                raise RuntimeError(f"{type(e).__name__}: {e}") from e
+            continue
+        if response.will_close:
+            pool.discard(parts.scheme, parts.netloc)
+
+        if response.status == 304:
+            return "unchanged", cached
+        if response.status in RETRY_STATUSES and attempt < ATTEMPTS - 1:
+            time.sleep(_retry_delay(response, attempt))
+            continue
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} {response.reason}")
+        break
+
+    if response.getheader("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    entry = {"url": url, "etag": response.getheader("ETag"), "last_modified": response.getheader("Last-Modified")}
+    return ("updated" if store.put(name, body) else "unchanged"), entry
+
+
+# =============================================================================
+# Main Entry Point
+# =============================================================================
+
+def fetch(base_dir: Path, urls_path: Path | None = None, threads: int = 4, interval: float = 0.5) -> bool:
+    """
+    Download the pages of the schools in urls.txt into the page store.
+
+    Uses up to threads concurrent requests, at most one per interval
+    seconds per host. Returns False if any page failed; pages fetched
+    before the failure are kept, as are their cache entries.
+    """
+    urls_path = urls_path or base_dir / "urls.txt"
+    if not urls_path.exists():
+        print(f"Error: URL list not found at {urls_path}")
+        return False
+    store = open_store(base_dir)
+    targets = page_targets(read_urls(urls_path))
+    cache = load_cache(base_dir)
+    hosts = {urlsplit(url).netloc for url, _ in targets}
+    print(f"Fetching {len(targets)} pages from {len(hosts)} host(s) with {threads} thread(s), "
+          f"{interval}s apart per host...")
+
+    start = time.perf_counter()
+    pool = ConnectionPool()
+    limiter = HostRateLimiter(interval)
+    counts = {"updated": 0, "unchanged": 0}
+    failed = {}
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {
+                name: executor.submit(fetch_page, pool, limiter, url, store, name, cache.get(name))
+                for url, name in targets
+            }
+            for name, future in futures.items():
+                try:
+                    status, entry = future.result()
+                except RuntimeError as e:
+                    failed[name] = str(e)
+                    continue
+                counts[status] += 1
+                cache[name] = entry
+                if status == "updated":
+                    print(f"  {name}")
+    finally:
+        pool.close()
+        store.save()
+        save_cache(base_dir, cache)
+    wall_time = time.perf_counter() - start
+
+    print("\n--- Fetch Summary ---")
+    print(f"  Updated: {counts['updated']} pages")
+    print(f"  Unchanged: {counts['unchanged']} pages")
+    print(f"  Failed: {len(failed)} pages")
+    for name, error in sorted(failed.items()):
+        print(f"  - {name}: {error}")
+    print(f"Fetched in {wall_time:.2f}s over {pool.opened} connection(s)")
+    return not failed
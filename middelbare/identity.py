@@ -0,0 +1,171 @@
+"""
+One key per school across scholenopdekaart and the loting.
+
+Flow: urls.txt + schools (scholen.duckdb) + loting_school/afdeling (loting_matching.duckdb)
+      -> school_identity + afdeling_identity (scholen.duckdb)
+
+The key of a school is the vestiging id in its scholenopdekaart URL
+(.../amsterdam/395/barlaeus-gymnasium/ -> 395). The URL's slug also names
+the school's resultaten and tevredenheid pages, which links the key to
+schools.id. Loting schools are matched on name, through LOTING_NAMES for
+the schools that are named differently in the two sources. The dashboard
+joins on these integer ids instead of comparing names per row.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import duckdb
+
+IDENTITY_TABLES = ["school_identity", "afdeling_identity"]
+
+# Loting school name -> scholenopdekaart school name, where they differ
+LOTING_NAMES = {
+    "Ignatiusgymnasium": "Sint Ignatiusgymnasium",
+    "Alasca": "ALASCA",
+    "Damstede": "Damstede Lyceum",
+    "Geert Groote College": "Geert Groote College Amsterdam",
+    "HLZ (Hervormd Lyceum Zuid)": "HLZ",
+    "Hervormd Lyceum West": "Het Hervormd Lyceum West",
+    "Cartesius Amsterdam": "Het Cartesius Lyceum",
+    "Metis Montessori Lyceum": "Metis Montessori Lyceum . vwo . havo",
+    "Montessori Lyceum Amsterdam": "Montessori Lyceum Amsterdam - Hoofdlocatie",
+    "OSB": "OSB Amsterdam",
+    "Spinoza Lyceum": "Spinoza Lyceum Amsterdam",
+    "Xplore": "Xplore - Agora Amsterdam",
+    "Cornelius Haga Lyceum": "Cornelius Haga Lyceum, Islamitische Scholengemeenschap voor mavo havo en vwo",
+}
+
+# .../middelbare-scholen/<plaats>/<vestiging id>/<slug>/
+URL_PATTERN = re.compile(r"/(\d+)/([^/]+)/?$")
+
+
+def read_school_keys(urls_path: Path) -> dict:
+    """Return {slug: (vestiging id, url)} for the school URLs in urls.txt."""
+    keys = {}
+    if not urls_path.exists():
+        return keys
+    with open(urls_path, encoding="utf-8") as f:
+        for line in f:
+            url = line.strip()
+            match = URL_PATTERN.search(url)
+            if match and not url.startswith("#"):
+                keys[match.group(2)] = (int(match.group(1)), url)
+    return keys
+
+
+def read_loting_schools(loting_path: Path):
+    """
+    Return the (id, naam) of every loting school and the (id, school_id,
+    naam, variant) of every afdeling, or None if loting_matching.duckdb
+    cannot be read.
+    """
+    if not loting_path.exists():
+        return None
+    try:
+        con = duckdb.connect(str(loting_path), read_only=True)
+    except duckdb.Error as e:
+        print(f"  -> Warning: could not read {loting_path.name} ({e}); loting ids left empty")
+        return None
+    try:
+        schools = con.execute("SELECT id, naam FROM loting_school ORDER BY id").fetchall()
+        afdelingen = con.execute("SELECT id, school_id, naam, variant FROM afdeling ORDER BY id").fetchall()
+    finally:
+        con.close()
+    return schools, afdelingen
+
+
+def read_identity_sources(base_dir: Path) -> dict:
+    """Read the school URLs and loting schools the identity tables are built from."""
+    return {
+        "keys": read_school_keys(base_dir / "urls.txt"),
+        "loting": read_loting_schools(base_dir / "loting_matching.duckdb"),
+    }
+
+
+def sources_fingerprint(sources: dict) -> str:
+    """Return a hash of the identity sources, to tell if the tables must be rebuilt."""
+    return hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()
+
+
+def match_loting_school(naam: str, school_ids: dict):
+    """
+    Return (schools.id, whether the full name matched) for a loting school,
+    or (None, False).
+
+    Tries the full name, then the part before ' - ' (the loting lists some
+    variants as schools of their own), each through LOTING_NAMES.
+    """
+    for name in (naam, naam.split(" - ")[0]):
+        school_id = school_ids.get(LOTING_NAMES.get(name, name))
+        if school_id is not None:
+            return school_id, name == naam
+    return None, False
+
+
+def create_identity_tables(con, file_ids: dict, sources: dict) -> int:
+    """
+    (Re)create school_identity and afdeling_identity in an open scholen.duckdb.
+
+    file_ids maps resultaten JSON file names to schools.id; sources come
+    from read_identity_sources(). Returns the number of schools with a key.
+    """
+    # scholen imports this module
+    from .scholen import ColumnBuffers
+
+    school_ids = dict(con.execute("SELECT name, id FROM schools ORDER BY id").fetchall())
+    school_keys = {}
+    rows = []
+    for slug, (key, url) in sources["keys"].items():
+        school_id = file_ids.get(f"resultaten-{slug}.json")
+        rows.append([key, slug, url, school_id, None])
+        if school_id is not None:
+            school_keys[school_id] = rows[-1]
+
+    afdeling_rows = []
+    loting = sources["loting"]
+    if loting is not None:
+        schools, afdelingen = loting
+        loting_keys = {}
+        exact = set()
+        for loting_id, naam in schools:
+            school_id, full_name = match_loting_school(naam or "", school_ids)
+            row = school_keys.get(school_id)
+            if row is None:
+                continue
+            loting_keys[loting_id] = row[0]
+            # Several loting schools can be one scholenopdekaart school (its
+            # variants); prefer the one matched on its full name
+            if row[4] is None or (full_name and row[0] not in exact):
+                row[4] = loting_id
+                if full_name:
+                    exact.add(row[0])
+        afdeling_rows = [
+            [afdeling_id, loting_keys[loting_id]] for afdeling_id, loting_id, _, _ in afdelingen if loting_id in loting_keys
+        ]
+
+    con.execute("""
+        CREATE OR REPLACE TABLE school_identity (
+            school_key INTEGER PRIMARY KEY,
+            slug VARCHAR NOT NULL,
+            url VARCHAR,
+            school_id INTEGER,
+            loting_school_id INTEGER
+        )
+    """)
+    con.execute("""
+        CREATE OR REPLACE TABLE afdeling_identity (
+            afdeling_id INTEGER PRIMARY KEY,
+            school_key INTEGER NOT NULL
+        )
+    """)
+    buffers = ColumnBuffers()
+    for key, slug, url, school_id, loting_school_id in sorted(rows):
+        buffers.append("school_identity", school_key=key, slug=slug, url=url, school_id=school_id,
+                       loting_school_id=loting_school_id)
+    for afdeling_id, key in afdeling_rows:
+        buffers.append("afdeling_identity", afdeling_id=afdeling_id, school_key=key)
+    buffers.flush(con)
+    return sum(1 for row in rows if row[3] is not None)
@@ -0,0 +1,245 @@
+"""
+The school map of the School Explorer tab.
+
+The folium map is rendered once per session, from a GeoJSON
+FeatureCollection of all schools with coordinates, with the markers in a
+MarkerCluster so thousands of schools stay fast. The map is built with an
+initial state (which schools match the filters, their colour, whether they
+are on the list, the popups and the home marker), so it is right from the
+start. Later states are not re-rendered into it: state_html() is a tiny
+page that posts the state with postMessage to every frame of the window,
+and a script in the map applies it with setStyle() and batched cluster
+additions and removals. postMessage works whatever the origin of the
+frames, so also when the notebook sandboxes them. Messages carry a channel
+name unique to the map and a sequence number, so other dashboards and
+older states are ignored. The state page re-posts until the map confirms,
+and again when the map reloads.
+"""
+
+import itertools
+import json
+import uuid
+from html import escape
+
+import folium
+from branca.element import MacroElement
+from folium.plugins import MarkerCluster
+from jinja2 import Template
+
+CENTER = [52.36, 4.89]
+ZOOM = 12
+# Markers are only clustered when zoomed out further than this, so a city
+# looks as before and the whole country stays responsive
+CLUSTER_BELOW_ZOOM = 12
+
+COLORS = {"red": "#d63e2a", "orange": "#f69730", "green": "#72b026", "unknown": "#888888"}
+
+
+def school_features(locations) -> dict:
+    """Return a GeoJSON FeatureCollection with one point per school in locations."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "id": i,
+                "properties": {"i": i, "naam": name},
+                "geometry": {"type": "Point", "coordinates": [round(lon, 7), round(lat, 7)]},
+            }
+            for i, (name, (lat, lon)) in enumerate(zip(locations.names, locations.points.tolist()))
+        ],
+    }
+
+
+# Posts a message to every frame under the top window, the map and the
+# state pages being frames of the notebook (or of frames in it)
+POST_JS = """
+function postToFrames(message) {
+    function visit(frame) {
+        for (var i = 0; i < frame.frames.length; i++) {
+            try {
+                frame.frames[i].postMessage(message, "*");
+                visit(frame.frames[i]);
+            } catch (e) {}
+        }
+    }
+    visit(window.top);
+}
+"""
+
+
+class StateListener(MacroElement):
+    """
+    Script in the map that applies the states posted by state_html().
+
+    A state lists [feature index, colour, on list, popup] for the schools
+    to show; the others are taken out of the cluster. The state the map
+    was rendered with is applied on load.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            {{ this.post_js }}
+            var channel = {{ this.channel|tojson }};
+            var cluster = {{ this.cluster.get_name() }};
+            var layer = {{ this.layer.get_name() }};
+            var map = {{ this._parent.get_name() }};
+            var markers = {};
+            var shown = {};
+            layer.eachLayer(function (marker) {
+                markers[marker.feature.properties.i] = marker;
+                shown[marker.feature.properties.i] = true;
+            });
+            var home = null;
+            var applied = -1;
+
+            function apply(state) {
+                var next = {};
+                state.markers.forEach(function (s) { next[s[0]] = s; });
+                var add = [], remove = [];
+                Object.keys(markers).forEach(function (i) {
+                    var marker = markers[i], s = next[i];
+                    if (s) {
+                        marker.setStyle({color: s[1], fillColor: s[1], weight: s[2] ? 4 : 2});
+                        marker.setRadius(s[2] ? 10 : 7);
+                        if (marker.getPopup()) {
+                            marker.setPopupContent(s[3]);
+                        } else {
+                            marker.bindPopup(s[3], {maxWidth: 250});
+                        }
+                        if (!shown[i]) { add.push(marker); shown[i] = true; }
+                    } else if (shown[i]) {
+                        remove.push(marker);
+                        shown[i] = false;
+                    }
+                });
+                cluster.removeLayers(remove);
+                cluster.addLayers(add);
+
+                if (home) { map.removeLayer(home); home = null; }
+                if (state.origin) {
+                    home = L.circleMarker(state.origin, {
+                        radius: 6, color: "#1f4e9c", fillColor: "#1f4e9c", fillOpacity: 1
+                    }).bindTooltip("Vanaf").addTo(map);
+                }
+                applied = state.seq;
+            }
+
+            apply({{ this.state|tojson }});
+            window.addEventListener("message", function (event) {
+                var message = event.data;
+                if (!message || message.channel !== channel || message.type !== "state") { return; }
+                if (message.seq > applied) { apply(message); }
+                postToFrames({channel: channel, type: "applied", seq: message.seq});
+            });
+            postToFrames({channel: channel, type: "ready"});
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, cluster, layer, channel: str, state: dict):
+        super().__init__()
+        self._name = "StateListener"
+        self.cluster = cluster
+        self.layer = layer
+        self.channel = channel
+        self.state = state
+        self.post_js = POST_JS
+
+
+def build_map(locations, state: dict, channel: str) -> str:
+    """
+    Return the HTML of the map of all schools in locations
+    (distance.SchoolLocations), showing state, see map_state().
+    """
+    school_map = folium.Map(location=CENTER, zoom_start=ZOOM)
+    cluster = MarkerCluster(options={"disableClusteringAtZoom": CLUSTER_BELOW_ZOOM, "chunkedLoading": True})
+    cluster.add_to(school_map)
+    layer = folium.GeoJson(
+        school_features(locations),
+        marker=folium.CircleMarker(radius=7, color=COLORS["unknown"], fill=True,
+                                   fill_color=COLORS["unknown"], fill_opacity=0.8, weight=2),
+        tooltip=folium.GeoJsonTooltip(fields=["naam"], labels=False),
+    )
+    layer.add_to(cluster)
+    school_map.add_child(StateListener(cluster, layer, channel, {**state, "seq": 0}))
+    return school_map._repr_html_()
+
+
+def ratio_color(ratio) -> str:
+    """Marker colour for a popularity ratio, like the explorer's traffic lights."""
+    if ratio is None:
+        return COLORS["unknown"]
+    if ratio > 1.0:
+        return COLORS["red"]
+    return COLORS["orange"] if ratio >= 0.7 else COLORS["green"]
+
+
+def map_state(rows, locations, list_ids, origin=None) -> dict:
+    """
+    Return the map state for explorer rows (the notebook's schools_list).
+
+    Afdelingen of the same school share its marker: it gets the colour of
+    the most popular one, is marked when any of them is in list_ids, and
+    its popup lists them all. Schools without coordinates, under their name
+    or the part before " - ", are left out.
+    """
+    schools = {}
+    for row in rows:
+        name = row["_school_name"]
+        i = locations.positions.get(name, locations.positions.get(name.split(" - ")[0]))
+        if i is None:
+            continue
+        school = schools.setdefault(i, {"names": {}, "ratio": None, "in_list": False})
+        ratio = row["_ratio"]
+        school["ratio"] = ratio if school["ratio"] is None else max(school["ratio"], ratio)
+        school["in_list"] = school["in_list"] or row["_afdeling_id"] in list_ids
+        label = f"{name} ({row['_variant']})" if row.get("_variant") not in (None, "Regulier") else name
+        star = " ⭐" if row["_afdeling_id"] in list_ids else ""
+        school["names"][label] = f"{escape(label)}: {ratio:.2f}{star}"
+
+    markers = []
+    for i, school in sorted(schools.items()):
+        popup = f"<b>{escape(locations.names[i])}</b><br>" + "<br>".join(school["names"].values())
+        markers.append([i, ratio_color(school["ratio"]), school["in_list"], popup])
+    return {"type": "state", "markers": markers, "origin": list(origin) if origin else None}
+
+
+class SchoolMap:
+    """
+    The map of one session: rendered once, with initial_state (see
+    map_state()), and updated through state_html() after that.
+    """
+
+    def __init__(self, locations, initial_state: dict):
+        self.locations = locations
+        self.channel = f"middelbare-kaart-{uuid.uuid4().hex}"
+        self.html = build_map(locations, initial_state, self.channel)
+        self.seq = itertools.count(1)
+
+    def state_html(self, state: dict) -> str:
+        """
+        Return a page that posts state to the map, until the map confirms
+        it, and again whenever the map (re)loads.
+        """
+        message = {**state, "channel": self.channel, "seq": next(self.seq)}
+        payload = json.dumps(message, ensure_ascii=False).replace("</", "<\\/")
+        # No margin: the notebook grows the frame to the height of its page
+        return f"""<style>body {{ margin: 0; }}</style>
+<script>
+{POST_JS}
+var state = {payload};
+var attempts = 0;
+var retry = setInterval(function () {{
+    if (++attempts > 20) {{ clearInterval(retry); return; }}
+    postToFrames(state);
+}}, 250);
+window.addEventListener("message", function (event) {{
+    var message = event.data;
+    if (!message || message.channel !== state.channel) {{ return; }}
+    if (message.type === "ready") {{ postToFrames(state); }}
+    if (message.type === "applied" && message.seq >= state.seq) {{ clearInterval(retry); }}
+}});
+postToFrames(state);
+</script>"""
@@ -1,16 +1,24 @@
 """
 Update loting_matching.duckdb from JSON source files.
 
-Flow: json/matching_en_plaatsing/*.json -> loting_matching.duckdb (updates 2025 data)
+Flow: json/matching_en_plaatsing/*.json -> loting_matching.duckdb (updates one or more years)
 
 Note: The loting_matching.duckdb database contains historical data from previous years.
-This module updates the 2025 data from JSON files extracted from the PDF report.
+This module updates the years found in the JSON files extracted from the PDF reports
+(or the years asked for), from one or several JSON directories, e.g. one per report
+for a backfill. Resolved entries go into temp staging tables first and are then
+applied with one MERGE per table, in a single transaction for all years.
 """
 
 import json
+import re
 import duckdb
+import numpy as np
 from pathlib import Path
 
+from .scholen import ColumnBuffers
+from .search import NameIndex
+
 
 # =============================================================================
 # Helper Functions
@@ -47,34 +55,147 @@ def build_afdeling_lookup(db):
     return lookup, result
 
 
-def find_afdeling_id(lookup, all_afdelingen, school: str, niveau: str):
-    """Find the afdeling ID for a school+niveau combination."""
-    niveau = normalize_niveau(niveau)
-
-    # Try exact match first
-    full_name = f"{school} - {niveau}".lower()
-    if full_name in lookup:
-        return lookup[full_name]
-
-    # Try matching school name from database
-    for afd_id, afd_naam, school_naam in all_afdelingen:
-        afd_lower = afd_naam.lower()
-
-        if niveau.lower() in afd_lower:
-            school_lower = school.lower()
-
-            # Direct match
-            if school_lower in afd_lower:
-                return afd_id
-
-            # Handle abbreviated names
-            school_parts = school_lower.split()
-            if len(school_parts) >= 2:
-                if all(part in afd_lower for part in school_parts[:2]):
-                    if afd_lower.endswith(niveau.lower()):
-                        return afd_id
+def normalize_name(name: str) -> str:
+    """Lowercase a name and collapse its whitespace."""
+    return " ".join(name.lower().split())
+
+
+def name_tokens(name: str) -> set:
+    """Return the words of a normalized name."""
+    return set(re.findall(r"\w+", name))
+
+
+class AfdelingResolver:
+    """
+    Resolve (school, niveau) pairs from the PDF report to afdeling ids.
+
+    Built once from the rows of build_afdeling_lookup() and the hand-made
+    create_name_mapping(). Afdeling names are indexed by their exact
+    normalized name, by niveau (each " - " segment after the first) and by
+    word, so a lookup only checks the few afdelingen sharing the niveau and
+    the first school-name words. Tried in order:
+
+    - mapped: the explicit name mapping (None there means skip)
+    - exact: "<school> - <niveau>"
+    - direct: the school name occurs in the afdeling name
+    - abbreviated: the first two words of the school name occur in an
+      afdeling name ending with the niveau
+    - fuzzy: the afdeling with the niveau whose school part is most similar
+      to the school name in a trigram index (see search.NameIndex), if the
+      similarity is at least FUZZY_SCORE, e.g. a typo or a missing word
+
+    A tier with more than one match is reported as ambiguous, unless exactly
+    one of the matches belongs to a school with that exact name.
+    """
+
+    # Minimum trigram similarity of a fuzzy match; high, as a sister school
+    # with the same niveau must not match
+    FUZZY_SCORE = 0.8
+
+    def __init__(self, all_afdelingen, name_mapping=None):
+        self.names = {}
+        self.school_names = {}
+        self.exact = {}
+        self.by_niveau = {}
+        self.by_token = {}
+
+        for afd_id, afd_naam, school_naam in all_afdelingen:
+            name = normalize_name(afd_naam)
+            self.names[afd_id] = name
+            self.school_names[afd_id] = normalize_name(school_naam or "")
+            self.exact.setdefault(name, []).append(afd_id)
+            for segment in name.split(" - ")[1:]:
+                self.by_niveau.setdefault(segment, set()).add(afd_id)
+            for token in name_tokens(name):
+                self.by_token.setdefault(token, set()).add(afd_id)
+
+        # Fuzzy matching compares school names, so the niveau is left out
+        self.ids = list(self.names)
+        self.index = NameIndex([
+            ("afdeling", afd_id, self.names[afd_id].rsplit(" - ", 1)[0], [afd_id]) for afd_id in self.ids
+        ])
 
-    return None
+        self.mapping = {}
+        for (school, niveau), mapped_name in (name_mapping or {}).items():
+            if mapped_name is None:
+                self.mapping[(school, niveau)] = None
+            else:
+                self.mapping[(school, niveau)] = self.exact.get(normalize_name(mapped_name), [])
+
+    def _pick(self, matches, school):
+        """Return the single match, or the one whose school name is school."""
+        if len(matches) == 1:
+            return matches[0]
+        own_school = [afd_id for afd_id in matches if self.school_names[afd_id] == school]
+        if len(own_school) == 1:
+            return own_school[0]
+        return None
+
+    def resolve(self, school: str, niveau: str):
+        """
+        Resolve a school and niveau to an afdeling.
+
+        Returns (afd_id, status, candidates). status is mapped, exact, direct,
+        abbreviated, fuzzy, skipped, ambiguous or not_found; candidates holds
+        the matching afdeling names when ambiguous.
+        """
+        niveau = normalize_niveau(niveau)
+
+        key = (school, niveau)
+        if key in self.mapping:
+            ids = self.mapping[key]
+            if ids is None:
+                return None, "skipped", []
+            if len(ids) == 1:
+                return ids[0], "mapped", []
+            if ids:
+                return None, "ambiguous", sorted(self.names[i] for i in ids)
+            return None, "not_found", []
+
+        school = normalize_name(school)
+        niveau = normalize_name(niveau)
+
+        for status, matches in self._candidates(school, niveau):
+            if not matches:
+                continue
+            afd_id = self._pick(sorted(matches), school)
+            if afd_id is not None:
+                return afd_id, status, []
+            return None, "ambiguous", sorted(self.names[i] for i in matches)
+
+        return None, "not_found", []
+
+    def _candidates(self, school, niveau):
+        """Yield (status, matches) per tier, computed lazily."""
+        yield "exact", self.exact.get(f"{school} - {niveau}", [])
+
+        parts = school.split()
+        candidates = set(self.by_niveau.get(niveau, ()))
+        for token in name_tokens(" ".join(parts[:2])):
+            candidates &= self.by_token.get(token, set())
+        yield "direct", [i for i in candidates if school in self.names[i]]
+
+        if len(parts) >= 2:
+            yield "abbreviated", [
+                i for i in candidates
+                if all(part in self.names[i] for part in parts[:2])
+                and self.names[i].endswith(niveau)
+            ]
+
+        niveau_ids = self.by_niveau.get(niveau, ())
+        scores = self.index.similarity(school)
+        scored = [
+            (scores[entry_id], self.ids[entry_id]) for entry_id in np.flatnonzero(scores >= self.FUZZY_SCORE)
+            if self.ids[entry_id] in niveau_ids
+        ]
+        best = max((score for score, _ in scored), default=0)
+        yield "fuzzy", [i for score, i in scored if score == best]
+
+
+def find_afdeling_id(resolver, school: str, niveau: str):
+    """Find the afdeling ID for a school+niveau combination, or None."""
+    afd_id, _, _ = resolver.resolve(school, niveau)
+    return afd_id
 
 
 def create_name_mapping():
@@ -137,6 +258,16 @@ def create_name_mapping():
         # Fix TASC vmbo-g-t
         ("TASC", "vmbo-g-t"): "TASC - vmbo-g-t",
         ("TASC", "v.a. vmbo-g-t"): "TASC - vmbo-g-t",
+        # Tabel 17 names as extracted by `middelbare extract-pdf`
+        ("Berlage Lyceum - tto", "v.a. vmbo-g-t"): "Berlage Lyceum - Tweetalig - v.a. vmbo-g-t",
+        ("Cartesius Lyceum - Het Lyceum", "v.a. havo"): "Cartesius Amsterdam - Het Lyceum - v.a. havo",
+        ("Cartesius Lyceum - Het Lyceum", "vwo"): "Cartesius Amsterdam - Het Lyceum - vwo",
+        ("Cartesius Lyceum - De Plaats", "v.a. havo"): "Cartesius Amsterdam - De Plaats - v.a. havo",
+        ("Cartesius Lyceum - De Plaats", "vwo"): "Cartesius Amsterdam - De Plaats - vwo",
+        ("College de Meer Havo potentie", "v.a. vmbo-g-t"): "College De Meer - Havo potentie - v.a. vmbo-g-t",
+        ("IVKO DAMU", "v.a. vmbo-g-t"): "IVKO - DAMU - v.a. vmbo-g-t",
+        ("St. Nicolaaslyceum - tto", "v.a. havo"): "St. Nicolaaslyceum - Tweetalig Onderwijs - v.a. havo",
+        ("St. Nicolaaslyceum - tto", "vwo"): "St. Nicolaaslyceum - Tweetalig Onderwijs - vwo",
     }
 
 
@@ -144,9 +275,146 @@ def create_name_mapping():
 # Database Update Functions
 # =============================================================================
 
-def update_database(base_dir: Path):
-    """Update loting_matching.duckdb from JSON files."""
-    json_dir = base_dir / "json" / "matching_en_plaatsing"
+STAGING_TABLES = {
+    "capaciteit": ["definitieve_capaciteit"],
+    "voorkeuren": ["eerste_voorkeur", "tweede_voorkeur", "derde_voorkeur"],
+    "plaatsingen": ["totaal_geplaatst"],
+}
+SAMENVATTING_COLUMNS = ["totaal_deelnemers", "totaal_capaciteit", "percentage_eerste_voorkeur", "percentage_top3"]
+
+# Per-year keys of gedetailleerde_schooldata entries, e.g. voorkeuren_2025
+YEAR_KEY = re.compile(r"^(?:voorkeuren|geplaatst_naar_voorkeur)_(\d{4})$")
+
+
+def create_staging_tables(db):
+    """Create empty temp staging tables with the column types of their targets."""
+    for table, columns in STAGING_TABLES.items():
+        db.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table}_staging AS
+            SELECT afdeling_id, jaar, {", ".join(columns)} FROM {table} LIMIT 0
+        """)
+    db.execute("""
+        CREATE OR REPLACE TEMP TABLE plaatsing_per_voorkeur_staging AS
+        SELECT afdeling_id, jaar, voorkeur_positie, aantal FROM plaatsing_per_voorkeur LIMIT 0
+    """)
+    db.execute(f"""
+        CREATE OR REPLACE TEMP TABLE jaar_samenvatting_staging AS
+        SELECT jaar, {", ".join(SAMENVATTING_COLUMNS)} FROM jaar_samenvatting LIMIT 0
+    """)
+
+
+def merge_staging_tables(db):
+    """
+    Apply the staging tables to their targets, one statement per table.
+
+    Rows are matched on (afdeling_id, jaar); matched rows are updated and the
+    rest inserted. plaatsing_per_voorkeur is replaced per afdeling and year,
+    keeping only positive counts.
+    """
+    for table, columns in STAGING_TABLES.items():
+        all_columns = ["afdeling_id", "jaar"] + columns
+        db.execute(f"""
+            MERGE INTO {table} t
+            USING {table}_staging s
+            ON t.afdeling_id = s.afdeling_id AND t.jaar = s.jaar
+            WHEN MATCHED THEN UPDATE SET {", ".join(f"{c} = s.{c}" for c in columns)}
+            WHEN NOT MATCHED THEN INSERT ({", ".join(all_columns)})
+                VALUES ({", ".join(f"s.{c}" for c in all_columns)})
+        """)
+
+    db.execute("""
+        DELETE FROM plaatsing_per_voorkeur
+        WHERE (afdeling_id, jaar) IN (
+            SELECT DISTINCT afdeling_id, jaar FROM plaatsing_per_voorkeur_staging
+        )
+    """)
+    db.execute("""
+        INSERT INTO plaatsing_per_voorkeur (afdeling_id, jaar, voorkeur_positie, aantal)
+        SELECT afdeling_id, jaar, voorkeur_positie, aantal
+        FROM plaatsing_per_voorkeur_staging
+        WHERE aantal > 0
+        ORDER BY afdeling_id, voorkeur_positie
+    """)
+
+    db.execute(f"""
+        MERGE INTO jaar_samenvatting t
+        USING jaar_samenvatting_staging s
+        ON t.jaar = s.jaar
+        WHEN MATCHED THEN UPDATE SET {", ".join(f"{c} = s.{c}" for c in SAMENVATTING_COLUMNS)}
+        WHEN NOT MATCHED THEN INSERT (jaar, {", ".join(SAMENVATTING_COLUMNS)})
+            VALUES (s.jaar, {", ".join(f"s.{c}" for c in SAMENVATTING_COLUMNS)})
+    """)
+
+
+def discover_years(detailed_data, jaar_samenvatting) -> list[int]:
+    """Return the years with capacities, preferences, placements or totals in the JSON."""
+    years = {int(jaar) for jaar in jaar_samenvatting}
+    for entry in detailed_data:
+        for key in entry:
+            match = YEAR_KEY.match(key)
+            if match:
+                years.add(int(match.group(1)))
+        # capaciteit and geplaatst are keyed by year inside the entry
+        for field in ("capaciteit", "geplaatst"):
+            years.update(int(jaar) for jaar in entry.get(field, {}))
+    return sorted(years)
+
+
+def stage_entry(staged, afd_id, jaar: int, entry: dict):
+    """Stage the rows of one JSON entry for a year, keyed by (afdeling id, jaar)."""
+    key = (afd_id, jaar)
+    capaciteit = entry.get("capaciteit", {}).get(str(jaar))
+    if capaciteit is not None:
+        staged["capaciteit"][key] = {"definitieve_capaciteit": capaciteit}
+
+    vk = entry.get(f"voorkeuren_{jaar}", {})
+    if vk:
+        staged["voorkeuren"][key] = {
+            "eerste_voorkeur": vk.get("eerste"),
+            "tweede_voorkeur": vk.get("tweede"),
+            "derde_voorkeur": vk.get("derde"),
+        }
+
+    geplaatst = entry.get("geplaatst", {}).get(str(jaar))
+    if geplaatst is not None:
+        staged["plaatsingen"][key] = {"totaal_geplaatst": geplaatst}
+
+    gpv = entry.get(f"geplaatst_naar_voorkeur_{jaar}", {})
+    if gpv:
+        staged["plaatsing_per_voorkeur"][key] = [
+            (pos, gpv.get(field))
+            for pos, field in [(1, "eerste"), (2, "tweede"), (3, "derde"), (4, "vierde_plus")]
+        ]
+
+
+def write_staging_tables(db, staged, samenvatting: dict):
+    """Bulk insert the staged rows and the year totals into the temp staging tables."""
+    rows = ColumnBuffers()
+    for table in STAGING_TABLES:
+        for (afd_id, jaar), values in staged[table].items():
+            rows.append(f"{table}_staging", afdeling_id=afd_id, jaar=jaar, **values)
+    for (afd_id, jaar), positions in staged["plaatsing_per_voorkeur"].items():
+        for pos, aantal in positions:
+            rows.append(
+                "plaatsing_per_voorkeur_staging",
+                afdeling_id=afd_id, jaar=jaar, voorkeur_positie=pos, aantal=aantal,
+            )
+    for jaar, totals in samenvatting.items():
+        rows.append(
+            "jaar_samenvatting_staging", jaar=jaar, **{c: totals.get(c) for c in SAMENVATTING_COLUMNS}
+        )
+    rows.flush(db)
+
+
+def update_database(base_dir: Path, jaren=None, json_dirs=None):
+    """
+    Update loting_matching.duckdb from JSON files, for several years at once.
+
+    jaren defaults to the years found in the JSON (see discover_years()).
+    json_dirs defaults to json/matching_en_plaatsing; with several, e.g. one
+    per report, later directories win for the same afdeling and year.
+    """
+    json_dirs = json_dirs or [base_dir / "json" / "matching_en_plaatsing"]
     db_path = base_dir / "loting_matching.duckdb"
 
     if not db_path.exists():
@@ -154,169 +422,103 @@ def update_database(base_dir: Path):
         print("The loting_matching.duckdb contains historical data and must exist.")
         return
 
-    db = duckdb.connect(str(db_path))
+    # Load JSON data, keeping the directory order
+    sources = [load_json(json_dir, "gedetailleerde_schooldata.json") for json_dir in json_dirs]
+    jaar_samenvatting = {}
+    for json_dir in json_dirs:
+        jaar_samenvatting.update(load_json(json_dir, "jaar_samenvatting.json"))
+    jaren = sorted(set(jaren or [])) or discover_years(
+        [entry for detailed_data in sources for entry in detailed_data], jaar_samenvatting
+    )
+    samenvatting = {jaar: jaar_samenvatting[str(jaar)] for jaar in jaren if jaar_samenvatting.get(str(jaar))}
 
-    # Load JSON data
-    detailed_data = load_json(json_dir, "gedetailleerde_schooldata.json")
-    jaar_samenvatting = load_json(json_dir, "jaar_samenvatting.json")
+    db = duckdb.connect(str(db_path))
 
     # Build lookup
-    lookup, all_afdelingen = build_afdeling_lookup(db)
-    name_mapping = create_name_mapping()
-
-    # Create a reverse lookup by afdeling name
-    name_to_id = {afd_naam.lower(): afd_id for afd_id, afd_naam, _ in all_afdelingen}
+    _, all_afdelingen = build_afdeling_lookup(db)
+    resolver = AfdelingResolver(all_afdelingen, create_name_mapping())
 
-    print("Updating loting_matching.duckdb from JSON files...\n")
+    print(f"Updating loting_matching.duckdb for {', '.join(map(str, jaren))} from JSON files...\n")
 
     updated_count = 0
     skipped_count = 0
     not_found = []
-
-    for entry in detailed_data:
-        school = entry["school"]
-        niveau = entry["niveau"]
-        niveau_norm = normalize_niveau(niveau)
-
-        # Check explicit mapping first
-        key = (school, niveau_norm)
-        if key in name_mapping:
-            mapped_name = name_mapping[key]
-            if mapped_name is None:
+    ambiguous = {}
+
+    # Resolve entries first, once per school and niveau; later entries for
+    # the same afdeling and year win
+    staged = {table: {} for table in [*STAGING_TABLES, "plaatsing_per_voorkeur"]}
+    resolved = {}
+
+    for detailed_data in sources:
+        for entry in detailed_data:
+            school = entry["school"]
+            niveau = entry["niveau"]
+            niveau_norm = normalize_niveau(niveau)
+
+            key = (school, niveau)
+            if key not in resolved:
+                resolved[key] = resolver.resolve(school, niveau)
+            afd_id, status, candidates = resolved[key]
+            if status == "skipped":
                 skipped_count += 1
                 continue
-            afd_id = name_to_id.get(mapped_name.lower())
-        else:
-            afd_id = find_afdeling_id(lookup, all_afdelingen, school, niveau)
-
-        if afd_id is None:
-            not_found.append(f"{school} - {niveau_norm}")
-            continue
-
-        # Update capaciteit table for 2025
-        cap_2025 = entry.get("capaciteit", {}).get("2025")
-        if cap_2025 is not None:
-            db.execute("""
-                UPDATE capaciteit
-                SET definitieve_capaciteit = ?
-                WHERE afdeling_id = ? AND jaar = 2025
-            """, [cap_2025, afd_id])
-
-            exists = db.execute("""
-                SELECT 1 FROM capaciteit WHERE afdeling_id = ? AND jaar = 2025
-            """, [afd_id]).fetchone()
-            if not exists:
-                db.execute("""
-                    INSERT INTO capaciteit (afdeling_id, jaar, definitieve_capaciteit)
-                    VALUES (?, 2025, ?)
-                """, [afd_id, cap_2025])
-
-        # Update voorkeuren table for 2025
-        vk = entry.get("voorkeuren_2025", {})
-        if vk:
-            eerste = vk.get("eerste")
-            tweede = vk.get("tweede")
-            derde = vk.get("derde")
-
-            exists = db.execute("""
-                SELECT 1 FROM voorkeuren WHERE afdeling_id = ? AND jaar = 2025
-            """, [afd_id]).fetchone()
-
-            if exists:
-                db.execute("""
-                    UPDATE voorkeuren
-                    SET eerste_voorkeur = ?, tweede_voorkeur = ?, derde_voorkeur = ?
-                    WHERE afdeling_id = ? AND jaar = 2025
-                """, [eerste, tweede, derde, afd_id])
-            else:
-                db.execute("""
-                    INSERT INTO voorkeuren (afdeling_id, jaar, eerste_voorkeur, tweede_voorkeur, derde_voorkeur)
-                    VALUES (?, 2025, ?, ?, ?)
-                """, [afd_id, eerste, tweede, derde])
-
-        # Update plaatsingen table for 2025
-        geplaatst_2025 = entry.get("geplaatst", {}).get("2025")
-        if geplaatst_2025 is not None:
-            exists = db.execute("""
-                SELECT 1 FROM plaatsingen WHERE afdeling_id = ? AND jaar = 2025
-            """, [afd_id]).fetchone()
-
-            if exists:
-                db.execute("""
-                    UPDATE plaatsingen
-                    SET totaal_geplaatst = ?
-                    WHERE afdeling_id = ? AND jaar = 2025
-                """, [geplaatst_2025, afd_id])
+            if status == "ambiguous":
+                ambiguous[f"{school} - {niveau_norm}"] = candidates
+                continue
+            if afd_id is None:
+                not_found.append(f"{school} - {niveau_norm}")
+                continue
+
+            for jaar in jaren:
+                stage_entry(staged, afd_id, jaar, entry)
+            updated_count += 1
+            if status == "fuzzy":
+                print(f"  {school} - {niveau_norm} (fuzzy match: {resolver.names[afd_id]})")
             else:
-                db.execute("""
-                    INSERT INTO plaatsingen (afdeling_id, jaar, totaal_geplaatst)
-                    VALUES (?, 2025, ?)
-                """, [afd_id, geplaatst_2025])
-
-        # Update plaatsing_per_voorkeur table for 2025
-        gpv = entry.get("geplaatst_naar_voorkeur_2025", {})
-        if gpv:
-            db.execute("""
-                DELETE FROM plaatsing_per_voorkeur
-                WHERE afdeling_id = ? AND jaar = 2025
-            """, [afd_id])
-
-            for pos, key in [(1, "eerste"), (2, "tweede"), (3, "derde")]:
-                val = gpv.get(key)
-                if val is not None and val > 0:
-                    db.execute("""
-                        INSERT INTO plaatsing_per_voorkeur (afdeling_id, jaar, voorkeur_positie, aantal)
-                        VALUES (?, 2025, ?, ?)
-                    """, [afd_id, pos, val])
-
-            vierde_plus = gpv.get("vierde_plus")
-            if vierde_plus is not None and vierde_plus > 0:
-                db.execute("""
-                    INSERT INTO plaatsing_per_voorkeur (afdeling_id, jaar, voorkeur_positie, aantal)
-                    VALUES (?, 2025, 4, ?)
-                """, [afd_id, vierde_plus])
-
-        updated_count += 1
-        print(f"  {school} - {niveau_norm}")
-
-    # Update jaar_samenvatting
-    if "2025" in jaar_samenvatting:
-        js = jaar_samenvatting["2025"]
-        db.execute("""
-            UPDATE jaar_samenvatting
-            SET totaal_deelnemers = ?,
-                totaal_capaciteit = ?,
-                percentage_eerste_voorkeur = ?,
-                percentage_top3 = ?
-            WHERE jaar = 2025
-        """, [
-            js.get("totaal_deelnemers"),
-            js.get("totaal_capaciteit"),
-            js.get("percentage_eerste_voorkeur"),
-            js.get("percentage_top3")
-        ])
-        print(f"\n  Updated jaar_samenvatting for 2025")
+                print(f"  {school} - {niveau_norm}")
+
+    # Apply everything as one set-based upsert per table, all or nothing
+    db.begin()
+    try:
+        create_staging_tables(db)
+        write_staging_tables(db, staged, samenvatting)
+        merge_staging_tables(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        db.close()
+        raise
+
+    if samenvatting:
+        print(f"\n  Updated jaar_samenvatting for {', '.join(map(str, samenvatting))}")
 
     db.close()
 
     print(f"\n--- Summary ---")
     print(f"  Updated: {updated_count} entries")
-    print(f"  Skipped (ambiguous): {skipped_count} entries")
+    print(f"  Skipped (mapped to none): {skipped_count} entries")
+    print(f"  Ambiguous: {len(ambiguous)} entries")
     print(f"  Not found in DB: {len(not_found)} entries")
 
+    if ambiguous:
+        print(f"\nAmbiguous entries (not updated):")
+        for name, candidates in sorted(ambiguous.items()):
+            print(f"  - {name}: {', '.join(candidates)}")
+
     if not_found:
         print(f"\nEntries not found in database:")
         for name in sorted(set(not_found)):
             print(f"  - {name}")
 
 
-def build(base_dir: Path):
+def build(base_dir: Path, jaren=None, json_dirs=None):
     """Update loting_matching.duckdb from JSON files."""
     print("=" * 60)
     print("Updating loting_matching.duckdb from JSON files")
     print("=" * 60)
     print()
 
-    update_database(base_dir)
+    update_database(base_dir, jaren, json_dirs)
 
     print("\nDone!")
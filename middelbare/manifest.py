@@ -0,0 +1,64 @@
+"""
+Build manifest for incremental rebuilds.
+
+The manifest (build_manifest.json) records, per source file, its size,
+modification time and content hash, plus the version of the code that
+processed it. A step only has to redo the files whose entry no longer
+matches. The hash is only recomputed when size or mtime changed, so a
+no-op check costs one stat() per file.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+MANIFEST_NAME = "build_manifest.json"
+
+
+def load_manifest(base_dir: Path) -> dict:
+    """Load the build manifest, or an empty one if missing or unreadable."""
+    path = base_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_manifest(base_dir: Path, manifest: dict):
+    """Write the build manifest atomically."""
+    path = base_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def file_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def file_state(path: Path, previous: dict | None = None) -> dict:
+    """
+    Return the size, mtime and hash of a file.
+
+    The hash of previous is reused when size and mtime are unchanged.
+    """
+    stat = path.stat()
+    state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(key) == value for key, value in state.items()):
+        state["hash"] = previous.get("hash")
+    else:
+        state["hash"] = file_hash(path)
+    return state
+
+
+def is_current(previous: dict | None, state: dict, **versions) -> bool:
+    """Check if a manifest entry matches a file state and code versions."""
+    if not previous or previous.get("hash") != state["hash"]:
+        return False
+    return all(previous.get(key) == value for key, value in versions.items())
@@ -0,0 +1,128 @@
+"""
+Deferred-acceptance matching on preference arrays.
+
+Preference lists are int16 arrays of afdeling indices, one row per student
+in order of preference and padded with -1. Lottery numbers are int32,
+lower wins; one per student for single tie-breaking or one per student and
+afdeling for multiple tie-breaking. deferred_acceptance() also takes a
+batch of independent matchings at once (a leading dimension on every
+array), which is how the simulator runs many replications per call.
+"""
+
+import heapq
+
+import numpy as np
+
+
+def deferred_acceptance_reference(prefs, capacity, lottery) -> np.ndarray:
+    """
+    Student-proposing deferred acceptance, one proposal at a time.
+
+    Straightforward version to validate deferred_acceptance() against;
+    takes a single matching. Returns the list position each student is
+    placed at, or -1.
+    """
+    prefs = np.asarray(prefs).tolist()
+    lottery = np.asarray(lottery)
+    single = lottery.ndim == 1
+    next_position = [0] * len(prefs)
+    # Per afdeling a heap of (-priority, student), so the worst held student is on top
+    held = [[] for _ in range(len(capacity))]
+    free = list(range(len(prefs)))
+
+    while free:
+        student = free.pop()
+        row = prefs[student]
+        position = next_position[student]
+        if position >= len(row) or row[position] < 0:
+            continue
+        afdeling = row[position]
+        priority = int(lottery[student] if single else lottery[student, afdeling])
+        heapq.heappush(held[afdeling], (-priority, student))
+        if len(held[afdeling]) > capacity[afdeling]:
+            _, rejected = heapq.heappop(held[afdeling])
+            next_position[rejected] += 1
+            free.append(rejected)
+
+    placed = np.full(len(prefs), -1, dtype=np.int64)
+    for afdeling_heap in held:
+        for _, student in afdeling_heap:
+            placed[student] = next_position[student]
+    return placed
+
+
+def deferred_acceptance(prefs, capacity, lottery) -> np.ndarray:
+    """
+    Student-proposing deferred acceptance, vectorized per round.
+
+    prefs is (students, positions), capacity (afdelingen,) and lottery
+    (students,) or (students, afdelingen). With an extra leading dimension
+    on prefs and lottery (and optionally capacity) the matchings of a batch
+    are solved together. Returns the list position each student is placed
+    at, or -1, shaped like prefs without its last axis.
+
+    Every round the students without a seat propose to their next choice.
+    The held students are kept as one array sorted on (afdeling, lottery
+    number), so the proposals of a round are merged in with a binary search
+    instead of sorting again, and only the afdelingen that received
+    proposals are checked for students past their capacity. A batch is
+    flattened into one matching with afdeling indices offset per matching,
+    so the per-round overhead is shared by the whole batch.
+    """
+    prefs = np.asarray(prefs)
+    lottery = np.asarray(lottery)
+    batched = prefs.ndim == 3
+    if not batched:
+        prefs = prefs[None]
+        lottery = lottery[None]
+    n_matchings, n_students, n_positions = prefs.shape
+    n_afdelingen = np.shape(capacity)[-1]
+
+    prefs = prefs.reshape(-1, n_positions)
+    capacity = np.broadcast_to(capacity, (n_matchings, n_afdelingen)).ravel()
+    single = lottery.ndim == 2
+    lottery = lottery.reshape(-1) if single else lottery.reshape(-1, n_afdelingen)
+    offset = np.repeat(np.arange(n_matchings, dtype=np.int64) * n_afdelingen, n_students)
+
+    position = np.zeros(n_matchings * n_students, dtype=np.int64)
+    # Held students and their (afdeling << 32 | lottery number) keys, sorted
+    keys = np.empty(0, dtype=np.int64)
+    holders = np.empty(0, dtype=np.int64)
+
+    proposers = np.arange(n_matchings * n_students)
+    while True:
+        proposers = proposers[position[proposers] < n_positions]
+        choices = prefs[proposers, position[proposers]]
+        # A -1 ends the list
+        proposers = proposers[choices >= 0]
+        if not len(proposers):
+            break
+        choices = choices[choices >= 0]
+
+        priority = lottery[proposers] if single else lottery[proposers, choices]
+        new_keys = (choices + offset[proposers]) << 32 | priority.astype(np.int64)
+        order = np.argsort(new_keys)
+        new_keys = new_keys[order]
+        at = np.searchsorted(keys, new_keys)
+        keys = np.insert(keys, at, new_keys)
+        holders = np.insert(holders, at, proposers[order])
+
+        # Only afdelingen that received proposals can be over capacity;
+        # everyone past it in their (sorted) segment is rejected
+        targets = new_keys >> 32
+        targets = targets[np.concatenate([[True], targets[1:] != targets[:-1]])]
+        starts = np.searchsorted(keys, targets << 32)
+        counts = np.searchsorted(keys, (targets + 1) << 32) - starts
+        excess = np.maximum(counts - capacity[targets], 0)
+        rejected = np.repeat(starts + counts - excess - (np.cumsum(excess) - excess), excess)
+        rejected += np.arange(len(rejected))
+
+        proposers = holders[rejected]
+        position[proposers] += 1
+        keys = np.delete(keys, rejected)
+        holders = np.delete(holders, rejected)
+
+    placed = np.full(n_matchings * n_students, -1, dtype=np.int64)
+    placed[holders] = position[holders]
+    placed = placed.reshape(n_matchings, n_students)
+    return placed if batched else placed[0]
@@ -0,0 +1,226 @@
+"""
+Compressed, content-addressed store of raw HTML pages.
+
+Layout of pages/:
+    segment-00000.bin   compressed blobs, appended back to back
+    index.json          blob locations, page snapshots and imported files
+
+Every distinct page content is one blob, keyed by its SHA-256 and stored
+once however many pages or snapshots share it. A page (e.g.
+resultaten-barlaeus-gymnasium.html) keeps its history as a list of
+(fetched_at, hash) snapshots, latest last; a snapshot is only added when
+the content changed. Reading a page is one seek and one read in a segment.
+Blobs are zstd-compressed when compression.zstd is available (Python 3.14)
+and zlib-compressed otherwise; the codec is recorded per blob.
+
+Loose html/*.html files are imported by open_store(), so a checkout with
+only html/ works as before; fetch writes to the store directly. Deleting a
+file from html/ takes the versions imported from it out of the store (its
+blobs stay in the segment, unreferenced).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from .manifest import file_state
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+STORE_DIR = "pages"
+INDEX_NAME = "index.json"
+# A new segment is started once the current one reaches this size
+SEGMENT_SIZE = 64 * 1024 * 1024
+CODEC = "zstd" if zstd is not None else "zlib"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Compress a page with codec ("zstd" or "zlib")."""
+    if codec == "zstd":
+        return zstd.compress(data, level=19)
+    return zlib.compress(data, 9)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress a blob stored with codec ("zstd" or "zlib")."""
+    if codec == "zstd":
+        if zstd is None:
+            raise RuntimeError("page was stored with zstd, which needs Python 3.14 (compression.zstd)")
+        return zstd.decompress(data)
+    return zlib.decompress(data)
+
+
+@dataclass(frozen=True)
+class PageRef:
+    """
+    Where one version of a page is stored.
+
+    Picklable, so pool workers can read a page without loading the index.
+    Has name and read_text() like a Path, so parsers take either.
+    """
+
+    name: str
+    hash: str
+    segment: Path
+    offset: int
+    length: int
+    codec: str
+
+    def read_bytes(self) -> bytes:
+        with open(self.segment, "rb") as f:
+            f.seek(self.offset)
+            return decompress(f.read(self.length), self.codec)
+
+    def read_text(self, encoding: str = "utf-8") -> str:
+        return self.read_bytes().decode(encoding)
+
+
+class PageStore:
+    """
+    The page store in a directory.
+
+    put() may be called from several threads; changes are kept in memory
+    until save() writes the index. Blobs are flushed to their segment
+    before the index that points at them is written, so a crash leaves at
+    most some unreferenced bytes at the end of a segment.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.lock = threading.Lock()
+        index = {}
+        if (directory / INDEX_NAME).exists():
+            with open(directory / INDEX_NAME, encoding="utf-8") as f:
+                index = json.load(f)
+        # {hash: [segment number, offset, length, codec]}
+        self.blobs = index.get("blobs", {})
+        # {page name: [[fetched_at, hash], ...]}, oldest first
+        self.pages = index.get("pages", {})
+        # {html file name: file state when it was last imported, plus the
+        # hashes of the versions imported from it}
+        self.imported = index.get("imported", {})
+        self.segment = max((blob[0] for blob in self.blobs.values()), default=0)
+        # Segments appended to since the last save(), to flush before the index
+        self.unsaved_segments = set()
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"segment-{number:05d}.bin"
+
+    def names(self, prefix: str = "") -> list[str]:
+        """Return the names of the stored pages starting with prefix, sorted."""
+        return sorted(name for name in self.pages if name.startswith(prefix))
+
+    def history(self, name: str) -> list:
+        """Return the (fetched_at, hash) snapshots of a page, oldest first."""
+        return [tuple(snapshot) for snapshot in self.pages.get(name, [])]
+
+    def latest(self, name: str) -> PageRef | None:
+        """Return the most recent version of a page, or None if it is not stored."""
+        snapshots = self.pages.get(name)
+        if not snapshots:
+            return None
+        return self.ref(name, snapshots[-1][1])
+
+    def ref(self, name: str, content_hash: str) -> PageRef:
+        """Return where the blob with a hash is stored, for page name."""
+        segment, offset, length, codec = self.blobs[content_hash]
+        return PageRef(name, content_hash, self._segment_path(segment), offset, length, codec)
+
+    def put(self, name: str, content: bytes, fetched_at: float | None = None) -> bool:
+        """
+        Store a version of a page. Returns False if it equals the latest
+        version, in which case nothing is added.
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self.lock:
+            snapshots = self.pages.setdefault(name, [])
+            if snapshots and snapshots[-1][1] == content_hash:
+                return False
+            if content_hash not in self.blobs:
+                self._append_blob(content_hash, content)
+            snapshots.append([round(fetched_at or time.time()), content_hash])
+            return True
+
+    def _append_blob(self, content_hash: str, content: bytes):
+        data = compress(content, CODEC)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._segment_path(self.segment)
+        if path.exists() and path.stat().st_size + len(data) > SEGMENT_SIZE:
+            self.segment += 1
+            path = self._segment_path(self.segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        self.blobs[content_hash] = [self.segment, offset, len(data), CODEC]
+        self.unsaved_segments.add(self.segment)
+
+    def import_files(self, files) -> tuple[int, int]:
+        """
+        Store loose HTML files that changed since they were last imported,
+        and take out the versions imported from files that are gone.
+
+        A file's hash is only recomputed when its size or mtime changed. A
+        page whose file is gone keeps the versions fetched for it, and is
+        removed when there are none. Returns the number of pages that got a
+        new version and the number of pages removed.
+        """
+        count = 0
+        for path in files:
+            previous = self.imported.get(path.name, {})
+            state = file_state(path, previous)
+            if previous.get("hash") == state["hash"]:
+                continue
+            # The versions imported from this file, to take out when it is gone
+            hashes = previous.get("hashes", [previous["hash"]]) if previous else []
+            if self.put(path.name, path.read_bytes(), fetched_at=path.stat().st_mtime):
+                count += 1
+                hashes = hashes + [state["hash"]]
+            self.imported[path.name] = {**state, "hashes": hashes}
+
+        present = {path.name for path in files}
+        removed = 0
+        for name in [name for name in self.imported if name not in present]:
+            entry = self.imported.pop(name)
+            hashes = set(entry.get("hashes", [entry["hash"]]))
+            fetched = [snapshot for snapshot in self.pages.get(name, []) if snapshot[1] not in hashes]
+            if fetched:
+                self.pages[name] = fetched
+            elif self.pages.pop(name, None) is not None:
+                removed += 1
+        return count, removed
+
+    def save(self):
+        """Flush the segments appended to since the last save and write the index atomically."""
+        with self.lock:
+            for segment in sorted(self.unsaved_segments):
+                with open(self._segment_path(segment), "rb+") as f:
+                    os.fsync(f.fileno())
+            self.unsaved_segments.clear()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index_path = self.directory / INDEX_NAME
+            tmp_path = index_path.with_name(index_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"blobs": self.blobs, "pages": self.pages, "imported": self.imported}, f)
+            tmp_path.replace(index_path)
+
+
+def open_store(base_dir: Path) -> PageStore:
+    """Open the page store of base_dir, importing changed html/*.html files first."""
+    store = PageStore(base_dir / STORE_DIR)
+    html_files = sorted((base_dir / "html").glob("*.html"))
+    imported, removed = store.import_files(html_files)
+    if imported or removed:
+        store.save()
+    if imported:
+        print(f"Imported {imported} pages from html/ into {STORE_DIR}/")
+    if removed:
+        print(f"Removed {removed} pages from {STORE_DIR}/ whose file is gone from html/")
+    return store
@@ -0,0 +1,122 @@
+"""
+Query result cache for the dashboard.
+
+Marimo re-runs cells on every tab switch, list edit or hide/unhide, and
+most of them re-run identical queries. QueryCache keeps their results in
+a bounded LRU, keyed on the SQL text and parameters. Every lookup first
+compares a fingerprint of the attached database files (inode, size and
+mtime) with the one the cache was filled from; when `middelbare` has
+swapped in a rebuilt file, the databases are re-attached and the cache
+is cleared.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+
+
+def file_fingerprint(path: Path):
+    """Return (inode, size, mtime_ns) of a file, or None if it is missing."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _hashable(value):
+    """Turn lists, sets and dicts into tuples, so they can be part of a key."""
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted(_hashable(v) for v in value)))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    LRU cache of query results over read-only attached databases.
+
+    databases maps an alias to a database file; they are attached READ_ONLY
+    on db. Results are shared between callers and must not be modified.
+    on_invalidate callbacks run whenever a rebuilt database is detected.
+    """
+
+    def __init__(self, db, databases: dict, max_entries: int = 256):
+        self.db = db
+        self.databases = {alias: Path(path) for alias, path in databases.items()}
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.on_invalidate = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.fingerprint = None
+        self._attach()
+
+    def _current_fingerprint(self):
+        return tuple(file_fingerprint(path) for path in self.databases.values())
+
+    def _attach(self):
+        """(Re)attach all databases and remember their fingerprint."""
+        attached = {row[0] for row in self.db.execute("SELECT database_name FROM duckdb_databases()").fetchall()}
+        for alias, path in self.databases.items():
+            if alias in attached:
+                self.db.execute(f"DETACH {alias}")
+            quoted = str(path).replace("'", "''")
+            self.db.execute(f"ATTACH '{quoted}' AS {alias} (READ_ONLY)")
+        self.fingerprint = self._current_fingerprint()
+
+    def check(self):
+        """Clear the cache and re-attach if a database file was replaced."""
+        if self._current_fingerprint() == self.fingerprint:
+            return
+        self.entries.clear()
+        self.invalidations += 1
+        self._attach()
+        for callback in self.on_invalidate:
+            callback()
+
+    def _cached(self, key, compute):
+        self.check()
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        result = compute()
+        self.entries[key] = result
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return result
+
+    def rows(self, sql: str, params=None) -> list[dict]:
+        """Run a query and return its rows as dicts."""
+        def compute():
+            cursor = self.db.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return self._cached(("rows", sql, _hashable(params)), compute)
+
+    def arrow(self, sql: str, params=None):
+        """Run a query and return its result as an Arrow table."""
+        return self._cached(
+            ("arrow", sql, _hashable(params)),
+            lambda: self.db.execute(sql, params).fetch_arrow_table(),
+        )
+
+    def call(self, func, *args, **kwargs):
+        """Return func(db, *args, **kwargs), cached on the function and arguments."""
+        key = ("call", func.__module__, func.__qualname__, _hashable(args), _hashable(kwargs))
+        return self._cached(key, lambda: func(self.db, *args, **kwargs))
+
+    def stats(self) -> dict:
+        """Return the hit, miss and invalidation counters and the cache size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+        }
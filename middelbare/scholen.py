@@ -1,180 +1,274 @@
 """
 Parse school HTML files from scholenopdekaart.nl and create scholen.duckdb.
 
-Flow: html/*.html -> json/resultaten-*.json + json/tevredenheid-*.json -> scholen.duckdb
+Flow: pages/ (page store, fed by html/*.html and fetch) -> json/resultaten-*.json
+      + json/tevredenheid-*.json -> scholen.duckdb
 """
 
 import json
 import re
 import html
+import shutil
+import time
 import duckdb
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
 from pathlib import Path
 
+from . import identity
+from . import search
+from .manifest import file_state, is_current, load_manifest, save_manifest
+from .pagestore import open_store
+
+
+# Bump when the JSON produced from the HTML (PARSER_VERSION) or the tables
+# loaded from the JSON (LOADER_VERSION) change, to force a rebuild of
+# unchanged source files.
+PARSER_VERSION = 2
+LOADER_VERSION = 4
+
+RESULT_TABLES = [
+    "doorstroom_onderbouw", "doorstroom_bovenbouw", "schooladvies",
+    "slagingspercentage", "examencijfers", "geslaagden_per_profiel",
+    "oordeel_inspectie",
+]
+TEVREDENHEID_TABLES = ["tevredenheid_trend", "tevredenheid_vragen"]
+# Derived from the tables above at the end of every build
+SNAPSHOT_TABLES = ["school_snapshot"]
+# Every table in scholen.duckdb, for the summary and compare_databases
+ALL_TABLES = (["schools"] + RESULT_TABLES + TEVREDENHEID_TABLES + SNAPSHOT_TABLES
+              + identity.IDENTITY_TABLES + search.SEARCH_TABLES)
+
 
 # =============================================================================
 # HTML Parsing Functions
 # =============================================================================
 
+TITLE_PATTERN = re.compile(r"<title>Resultaten - ([^(]+)\s*\(")
+ADRES_PATTERN = re.compile(r"<span class=school-adres>([^<]+)</span>")
+POSTCODE_PATTERN = re.compile(r"<span class=school-postcode-woonplaats>([^<]+)</span>")
+LEERLINGEN_PATTERN = re.compile(r'data-dfn="Het aantal leerlingen op de school\.">(\d+)\s*leerlingen')
+
+DOORSTROOM_PATTERN = re.compile(
+    r'<doorstroom-line-chart[^>]*periodes="([^"]+)"[^>]*chart-title="([^"]+)"'
+)
+SCHOOLADVIES_PATTERN = re.compile(
+    r'<vergelijking-schooladvies-bar-chart[^>]*vergelijkingen="([^"]+)"[^>]*chart-title="([^"]+)"'
+)
+SLAGINGSPERCENTAGE_PATTERN = re.compile(
+    r'<slaagpercentage-trend-line-chart[^>]*slagingspercentages="([^"]+)"[^>]*chart-title="([^"]+)"'
+)
+EXAMENCIJFERS_PATTERN = re.compile(
+    r'<examencijfers-trend-line-chart[^>]*examencijfers="([^"]+)"[^>]*chart-title="([^"]+)"'
+)
+OORDEEL_INSPECTIE_PATTERN = re.compile(
+    r'<oordeel-inspectie-bar-chart[^>]*class="[^"]*chart-([^"]+)"[^>]*json-data="([^"]+)"'
+)
+
+GESLAAGDEN_HEADER_PATTERN = re.compile(
+    r"<tr><th>(havo|vwo|vmbo(?:-\(g\)t)?)</th>", flags=re.IGNORECASE
+)
+GESLAAGDEN_END_PATTERN = re.compile(
+    r"</table>|<tr><th>|(?i:<tr><th>(?:havo|vwo|vmbo(?:-\(g\)t)?)</th>)"
+)
+GESLAAGDEN_ROW_PATTERN = re.compile(
+    r"<tr><td>([^<]+)</td><td[^>]*>([^<]+)</td><td[^>]*>([^<]+)</td>"
+)
+
+
 def decode_json_attr(attr_value):
     """Decode HTML-encoded JSON from attribute value."""
-    decoded = html.unescape(attr_value)
+    # Quotes are by far the most common entity; replace them without the
+    # per-reference callback of html.unescape.
+    decoded = attr_value.replace("&#34;", '"')
+    if "&" in decoded:
+        decoded = html.unescape(decoded)
     return json.loads(decoded)
 
 
+def _level_from_title(title_lower):
+    """Return the onderwijssoort a chart title refers to, if any."""
+    if "havo" in title_lower:
+        return "havo"
+    elif "vwo" in title_lower:
+        return "vwo"
+    elif "vmbo" in title_lower:
+        return "vmbo"
+    return None
+
+
+def _set_postcode_city(info, postcode_city):
+    """Split a 'postcode woonplaats' string into postalCode and city."""
+    postcode_city = postcode_city.strip()
+    pc_match = re.match(r"(\d{4}\s*[A-Z]{2})\s+(.*)", postcode_city)
+    if pc_match:
+        info["postalCode"] = pc_match.group(1)
+        info["city"] = pc_match.group(2)
+    else:
+        info["city"] = postcode_city
+
+
 def extract_school_info(content):
     """Extract basic school information."""
     info = {}
 
     # School name from title
-    match = re.search(r"<title>Resultaten - ([^(]+)\s*\(", content)
+    match = TITLE_PATTERN.search(content)
     if match:
         info["name"] = match.group(1).strip()
 
     # Address info from span elements
-    match = re.search(r"<span class=school-adres>([^<]+)</span>", content)
+    match = ADRES_PATTERN.search(content)
     if match:
         info["address"] = match.group(1).strip()
 
-    match = re.search(r"<span class=school-postcode-woonplaats>([^<]+)</span>", content)
+    match = POSTCODE_PATTERN.search(content)
     if match:
-        postcode_city = match.group(1).strip()
-        pc_match = re.match(r"(\d{4}\s*[A-Z]{2})\s+(.*)", postcode_city)
-        if pc_match:
-            info["postalCode"] = pc_match.group(1)
-            info["city"] = pc_match.group(2)
-        else:
-            info["city"] = postcode_city
+        _set_postcode_city(info, match.group(1))
 
     # Extract number of students (leerlingen)
-    match = re.search(r'data-dfn="Het aantal leerlingen op de school\.">(\d+)\s*leerlingen', content)
+    match = LEERLINGEN_PATTERN.search(content)
     if match:
         info["aantalLeerlingen"] = int(match.group(1))
 
     return info
 
 
+def _add_doorstroom(doorstroom, periodes_encoded, title):
+    """Add one doorstroom chart to the doorstroom dict."""
+    data = decode_json_attr(periodes_encoded)
+    title_lower = title.lower()
+
+    if "onderbouw" in title_lower:
+        doorstroom["onderbouw"]["combined"] = data
+    elif "bovenbouw" in title_lower:
+        level = _level_from_title(title_lower)
+        if level:
+            doorstroom["bovenbouw"][level] = data
+
+
 def extract_doorstroom(content):
     """Extract doorstroom (progression) data."""
     doorstroom = {"onderbouw": {}, "bovenbouw": {}}
 
-    pattern = r'<doorstroom-line-chart[^>]*periodes="([^"]+)"[^>]*chart-title="([^"]+)"'
-    matches = re.findall(pattern, content)
-
-    for periodes_encoded, title in matches:
-        data = decode_json_attr(periodes_encoded)
-        title_lower = title.lower()
-
-        if "onderbouw" in title_lower:
-            doorstroom["onderbouw"]["combined"] = data
-        elif "bovenbouw" in title_lower:
-            if "havo" in title_lower:
-                doorstroom["bovenbouw"]["havo"] = data
-            elif "vwo" in title_lower:
-                doorstroom["bovenbouw"]["vwo"] = data
-            elif "vmbo" in title_lower:
-                doorstroom["bovenbouw"]["vmbo"] = data
+    for periodes_encoded, title in DOORSTROOM_PATTERN.findall(content):
+        _add_doorstroom(doorstroom, periodes_encoded, title)
 
     return doorstroom
 
 
+def _add_schooladvies(schooladvies, vergelijkingen_encoded, title):
+    """Add one schooladvies chart to the schooladvies dict."""
+    data = decode_json_attr(vergelijkingen_encoded)
+
+    cleaned = []
+    for item in data:
+        cleaned.append({
+            "positie": item.get("positieVergelekenMetSchooladvies", ""),
+            "percentage": item.get("percentage", 0),
+            "vergelijking": item.get("percentageVergelijking", 0),
+        })
+
+    level = _level_from_title(title.lower())
+    if level:
+        schooladvies[level] = cleaned
+
+
 def extract_schooladvies(content):
     """Extract schooladvies comparison data."""
     schooladvies = {}
 
-    pattern = r'<vergelijking-schooladvies-bar-chart[^>]*vergelijkingen="([^"]+)"[^>]*chart-title="([^"]+)"'
-    matches = re.findall(pattern, content)
+    for vergelijkingen_encoded, title in SCHOOLADVIES_PATTERN.findall(content):
+        _add_schooladvies(schooladvies, vergelijkingen_encoded, title)
 
-    for vergelijkingen_encoded, title in matches:
-        data = decode_json_attr(vergelijkingen_encoded)
-        title_lower = title.lower()
+    return schooladvies
 
-        cleaned = []
-        for item in data:
-            cleaned.append({
-                "positie": item.get("positieVergelekenMetSchooladvies", ""),
-                "percentage": item.get("percentage", 0),
-                "vergelijking": item.get("percentageVergelijking", 0),
-            })
 
-        if "havo" in title_lower:
-            schooladvies["havo"] = cleaned
-        elif "vwo" in title_lower:
-            schooladvies["vwo"] = cleaned
-        elif "vmbo" in title_lower:
-            schooladvies["vmbo"] = cleaned
+def _add_slagingspercentage(slagingspercentage, data_encoded, title):
+    """Add one pass rate chart to the slagingspercentage dict."""
+    data = decode_json_attr(data_encoded)
 
-    return schooladvies
+    cleaned = []
+    for item in data:
+        cleaned.append({
+            "schooljaar": item.get("schooljaar", ""),
+            "percentage": item.get("percentage", 0),
+            "vergelijking": item.get("vergelijking", 0),
+        })
+
+    level = _level_from_title(title.lower())
+    if level:
+        slagingspercentage[level] = cleaned
 
 
 def extract_slagingspercentage(content):
     """Extract pass rate data over years."""
     slagingspercentage = {}
 
-    pattern = r'<slaagpercentage-trend-line-chart[^>]*slagingspercentages="([^"]+)"[^>]*chart-title="([^"]+)"'
-    matches = re.findall(pattern, content)
+    for data_encoded, title in SLAGINGSPERCENTAGE_PATTERN.findall(content):
+        _add_slagingspercentage(slagingspercentage, data_encoded, title)
 
-    for data_encoded, title in matches:
-        data = decode_json_attr(data_encoded)
-        title_lower = title.lower()
+    return slagingspercentage
 
-        cleaned = []
-        for item in data:
-            cleaned.append({
-                "schooljaar": item.get("schooljaar", ""),
-                "percentage": item.get("percentage", 0),
-                "vergelijking": item.get("vergelijking", 0),
-            })
 
-        if "havo" in title_lower:
-            slagingspercentage["havo"] = cleaned
-        elif "vwo" in title_lower:
-            slagingspercentage["vwo"] = cleaned
-        elif "vmbo" in title_lower:
-            slagingspercentage["vmbo"] = cleaned
+def _add_examencijfers(examencijfers, data_encoded, title):
+    """Add one exam grade chart to the examencijfers dict."""
+    data = decode_json_attr(data_encoded)
 
-    return slagingspercentage
+    cleaned = []
+    for item in data:
+        cleaned.append({
+            "schooljaar": item.get("schooljaar", ""),
+            "centraalExamen": item.get("centraalExamencijfer", 0),
+            "centraalExamenVergelijking": item.get("centraalExamencijferVergelijking", 0),
+            "schoolExamen": item.get("schoolExamencijfer", 0),
+            "eindcijfer": item.get("eindcijfer", 0),
+        })
+
+    level = _level_from_title(title.lower())
+    if level:
+        examencijfers[level] = cleaned
 
 
 def extract_examencijfers(content):
     """Extract exam grade data."""
     examencijfers = {}
 
-    pattern = r'<examencijfers-trend-line-chart[^>]*examencijfers="([^"]+)"[^>]*chart-title="([^"]+)"'
-    matches = re.findall(pattern, content)
-
-    for data_encoded, title in matches:
-        data = decode_json_attr(data_encoded)
-        title_lower = title.lower()
+    for data_encoded, title in EXAMENCIJFERS_PATTERN.findall(content):
+        _add_examencijfers(examencijfers, data_encoded, title)
 
-        cleaned = []
-        for item in data:
-            cleaned.append({
-                "schooljaar": item.get("schooljaar", ""),
-                "centraalExamen": item.get("centraalExamencijfer", 0),
-                "centraalExamenVergelijking": item.get("centraalExamencijferVergelijking", 0),
-                "schoolExamen": item.get("schoolExamencijfer", 0),
-                "eindcijfer": item.get("eindcijfer", 0),
-            })
+    return examencijfers
 
-        if "havo" in title_lower:
-            examencijfers["havo"] = cleaned
-        elif "vwo" in title_lower:
-            examencijfers["vwo"] = cleaned
-        elif "vmbo" in title_lower:
-            examencijfers["vmbo"] = cleaned
 
-    return examencijfers
+def _add_geslaagden(geslaagden, level, section_content):
+    """Add the profiel rows of one level section to the geslaagden dict."""
+    rows = GESLAAGDEN_ROW_PATTERN.findall(section_content)
+    if rows:
+        geslaagden[level] = []
+        for profiel, deelnemers, geslaagd in rows:
+            profiel = profiel.strip()
+            if (
+                profiel
+                and profiel not in ["Profiel", "Totaal", ""]
+                and any(
+                    p in profiel
+                    for p in ["Cultuur", "Economie", "Natuur", "Maatschappij", "Techniek", "Gezondheid"]
+                )
+            ):
+                geslaagden[level].append({
+                    "profiel": profiel,
+                    "deelnemers": html.unescape(deelnemers.strip()),
+                    "geslaagden": html.unescape(geslaagd.strip()),
+                })
 
 
 def extract_geslaagden_per_profiel(content):
     """Extract pass rates per profile from HTML tables."""
     geslaagden = {}
 
-    sections = re.split(
-        r"<tr><th>(havo|vwo|vmbo(?:-\(g\)t)?)</th>", content, flags=re.IGNORECASE
-    )
-
-    row_pattern = r"<tr><td>([^<]+)</td><td[^>]*>([^<]+)</td><td[^>]*>([^<]+)</td>"
+    sections = GESLAAGDEN_HEADER_PATTERN.split(content)
 
     for i in range(1, len(sections), 2):
         level = sections[i].lower()
@@ -184,64 +278,44 @@ def extract_geslaagden_per_profiel(content):
         if end_match:
             section_content = section_content[: end_match.start()]
 
-        rows = re.findall(row_pattern, section_content)
-        if rows:
-            geslaagden[level] = []
-            for profiel, deelnemers, geslaagd in rows:
-                profiel = profiel.strip()
-                if (
-                    profiel
-                    and profiel not in ["Profiel", "Totaal", ""]
-                    and any(
-                        p in profiel
-                        for p in ["Cultuur", "Economie", "Natuur", "Maatschappij", "Techniek", "Gezondheid"]
-                    )
-                ):
-                    geslaagden[level].append({
-                        "profiel": profiel,
-                        "deelnemers": html.unescape(deelnemers.strip()),
-                        "geslaagden": html.unescape(geslaagd.strip()),
-                    })
+        _add_geslaagden(geslaagden, level, section_content)
 
     return geslaagden
 
 
+def _inspectie_item(item):
+    """Return the norm/value/period summary of one inspection data point."""
+    return {
+        "inspectienorm": item.get("inspectienorm", 0),
+        "schoolwaarde": item.get("schoolwaarde", 0),
+        "periode": f"{item.get('schooljaarVan', '')} t/m {item.get('schooljaarTotEnMet', '')}",
+    }
+
+
+def _add_oordeel_inspectie(oordeel, chart_type, data_encoded):
+    """Add one inspection chart to the oordeel dict."""
+    data = decode_json_attr(data_encoded)
+
+    if chart_type == "onderwijspositie":
+        if data:
+            oordeel["onderwijspositie"] = _inspectie_item(data[0])
+    elif chart_type == "onderbouwsnelheid":
+        if data:
+            oordeel["onderbouwsnelheid"] = _inspectie_item(data[0])
+    elif chart_type == "bovenbouwsucces":
+        oordeel["bovenbouwsucces"] = {}
+        for item in data:
+            level = item.get("onderwijssoort", "").lower()
+            if level:
+                oordeel["bovenbouwsucces"][level] = _inspectie_item(item)
+
+
 def extract_oordeel_inspectie(content):
     """Extract inspection judgement data."""
     oordeel = {}
 
-    pattern = r'<oordeel-inspectie-bar-chart[^>]*class="[^"]*chart-([^"]+)"[^>]*json-data="([^"]+)"'
-    matches = re.findall(pattern, content)
-
-    for chart_type, data_encoded in matches:
-        data = decode_json_attr(data_encoded)
-
-        if chart_type == "onderwijspositie":
-            if data:
-                item = data[0]
-                oordeel["onderwijspositie"] = {
-                    "inspectienorm": item.get("inspectienorm", 0),
-                    "schoolwaarde": item.get("schoolwaarde", 0),
-                    "periode": f"{item.get('schooljaarVan', '')} t/m {item.get('schooljaarTotEnMet', '')}",
-                }
-        elif chart_type == "onderbouwsnelheid":
-            if data:
-                item = data[0]
-                oordeel["onderbouwsnelheid"] = {
-                    "inspectienorm": item.get("inspectienorm", 0),
-                    "schoolwaarde": item.get("schoolwaarde", 0),
-                    "periode": f"{item.get('schooljaarVan', '')} t/m {item.get('schooljaarTotEnMet', '')}",
-                }
-        elif chart_type == "bovenbouwsucces":
-            oordeel["bovenbouwsucces"] = {}
-            for item in data:
-                level = item.get("onderwijssoort", "").lower()
-                if level:
-                    oordeel["bovenbouwsucces"][level] = {
-                        "inspectienorm": item.get("inspectienorm", 0),
-                        "schoolwaarde": item.get("schoolwaarde", 0),
-                        "periode": f"{item.get('schooljaarVan', '')} t/m {item.get('schooljaarTotEnMet', '')}",
-                    }
+    for chart_type, data_encoded in OORDEEL_INSPECTIE_PATTERN.findall(content):
+        _add_oordeel_inspectie(oordeel, chart_type, data_encoded)
 
     return oordeel
 
@@ -365,11 +439,168 @@ def extract_tevredenheid_vragen(content):
     return vragen
 
 
-def parse_school_html(filepath):
-    """Parse a school HTML file and return structured data."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+# =============================================================================
+# Single-pass Page Scanner
+# =============================================================================
+
+class PageScanner:
+    """
+    Walk a page once and dispatch the parts we care about to handlers.
+
+    Handlers are registered for the literal text right after a ``<``: a
+    custom element name (``doorstroom-line-chart``) or a marker such as
+    ``title>``. Each handler gets the page and the trigger match, and does
+    its own anchored match at that position. Every token starts with ``<``
+    followed by one of a known set of characters, which keeps the search
+    of the combined regex fast; the encoded JSON attributes never contain
+    a ``<``.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.first_chars = set()
+        self._token_pattern = None
+
+    def _register(self, trigger, first_chars):
+        def register(handler):
+            self.handlers[f"t{len(self.handlers)}"] = (trigger, handler)
+            self.first_chars.update(first_chars)
+            self._token_pattern = None
+            return handler
+        return register
+
+    def marker(self, prefix, ignore_case=False):
+        """Register a handler(result, content, match) for '<' + prefix."""
+        if ignore_case:
+            return self._register(f"(?i:{re.escape(prefix)})", {prefix[0].lower(), prefix[0].upper()})
+        return self._register(re.escape(prefix), {prefix[0]})
+
+    def element(self, name):
+        """Register a handler(result, content, match) for a custom element."""
+        return self._register(re.escape(name) + r"(?![\w-])", {name[0]})
+
+    def token_pattern(self):
+        """Combine all triggers into one regex."""
+        if self._token_pattern is None:
+            first = "".join(re.escape(char) for char in sorted(self.first_chars))
+            alternatives = [f"(?P<{group}>{trigger})" for group, (trigger, _) in self.handlers.items()]
+            self._token_pattern = re.compile(f"<(?=[{first}])(?:" + "|".join(alternatives) + ")")
+        return self._token_pattern
+
+    def scan(self, content, result):
+        """Scan content once, letting the handlers fill in result."""
+        for match in self.token_pattern().finditer(content):
+            _, handler = self.handlers[match.lastgroup]
+            handler(result, content, match)
+        return result
+
+
+school_scanner = PageScanner()
+
+
+@school_scanner.marker("title>")
+def _scan_title(result, content, match):
+    title = TITLE_PATTERN.match(content, match.start())
+    if title and "name" not in result["school"]:
+        result["school"]["name"] = title.group(1).strip()
+
+
+@school_scanner.marker("span class=school-adres>")
+def _scan_adres(result, content, match):
+    adres = ADRES_PATTERN.match(content, match.start())
+    if adres and "address" not in result["school"]:
+        result["school"]["address"] = adres.group(1).strip()
+
+
+@school_scanner.marker("span class=school-postcode-woonplaats>")
+def _scan_postcode(result, content, match):
+    postcode = POSTCODE_PATTERN.match(content, match.start())
+    if postcode and "city" not in result["school"]:
+        _set_postcode_city(result["school"], postcode.group(1))
+
+
+@school_scanner.element("span")
+def _scan_leerlingen(result, content, match):
+    if "aantalLeerlingen" in result["school"]:
+        return
+    # The attribute can be anywhere in the tag; search up to the end of
+    # the text that follows it
+    tag_end = content.find(">", match.end())
+    text_end = content.find("<", tag_end)
+    leerlingen = LEERLINGEN_PATTERN.search(content, match.end(), text_end if text_end >= 0 else len(content))
+    if leerlingen:
+        result["school"]["aantalLeerlingen"] = int(leerlingen.group(1))
+
+
+@school_scanner.marker("tr><th>", ignore_case=True)
+def _scan_geslaagden(result, content, match):
+    header = GESLAAGDEN_HEADER_PATTERN.match(content, match.start())
+    if header:
+        end = GESLAAGDEN_END_PATTERN.search(content, header.end())
+        section_content = content[header.end():end.start() if end else len(content)]
+        _add_geslaagden(result["geslaagdenPerProfiel"], header.group(1).lower(), section_content)
+
+
+@school_scanner.element("doorstroom-line-chart")
+def _scan_doorstroom(result, content, match):
+    chart = DOORSTROOM_PATTERN.match(content, match.start())
+    if chart:
+        _add_doorstroom(result["doorstroom"], *chart.groups())
+
+
+@school_scanner.element("vergelijking-schooladvies-bar-chart")
+def _scan_schooladvies(result, content, match):
+    chart = SCHOOLADVIES_PATTERN.match(content, match.start())
+    if chart:
+        _add_schooladvies(result["schooladvies"], *chart.groups())
+
+
+@school_scanner.element("slaagpercentage-trend-line-chart")
+def _scan_slagingspercentage(result, content, match):
+    chart = SLAGINGSPERCENTAGE_PATTERN.match(content, match.start())
+    if chart:
+        _add_slagingspercentage(result["slagingspercentage"], *chart.groups())
+
+
+@school_scanner.element("examencijfers-trend-line-chart")
+def _scan_examencijfers(result, content, match):
+    chart = EXAMENCIJFERS_PATTERN.match(content, match.start())
+    if chart:
+        _add_examencijfers(result["examencijfers"], *chart.groups())
+
+
+@school_scanner.element("oordeel-inspectie-bar-chart")
+def _scan_oordeel_inspectie(result, content, match):
+    chart = OORDEEL_INSPECTIE_PATTERN.match(content, match.start())
+    if chart:
+        _add_oordeel_inspectie(result["oordeelInspectie"], *chart.groups())
+
+
+SCHOOL_INFO_KEYS = ["name", "address", "postalCode", "city", "aantalLeerlingen"]
 
+
+def parse_school_content(content):
+    """Parse the content of a school results page in a single pass."""
+    result = school_scanner.scan(content, {
+        "school": {},
+        "doorstroom": {"onderbouw": {}, "bovenbouw": {}},
+        "schooladvies": {},
+        "slagingspercentage": {},
+        "examencijfers": {},
+        "geslaagdenPerProfiel": {},
+        "oordeelInspectie": {},
+    })
+    # Keep the key order of extract_school_info, whatever the page order
+    info = result["school"]
+    result["school"] = {key: info[key] for key in SCHOOL_INFO_KEYS if key in info}
+    return result
+
+
+def parse_school_content_multipass(content):
+    """Parse a school results page with one regex scan per extractor.
+
+    Reference implementation for parse_school_content, used by the tests.
+    """
     return {
         "school": extract_school_info(content),
         "doorstroom": extract_doorstroom(content),
@@ -381,10 +612,14 @@ def parse_school_html(filepath):
     }
 
 
-def parse_tevredenheid_html(filepath):
-    """Parse a tevredenheid HTML file and return structured data."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+def parse_school_html(page):
+    """Parse a school HTML page (a Path or a PageRef) and return structured data."""
+    return parse_school_content(page.read_text(encoding="utf-8"))
+
+
+def parse_tevredenheid_html(page):
+    """Parse a tevredenheid HTML page (a Path or a PageRef) and return structured data."""
+    content = page.read_text(encoding="utf-8")
 
     info = {}
     match = re.search(r"<title>Tevredenheid - ([^(]+)\s*\(", content)
@@ -509,129 +744,254 @@ def create_schema(con):
     """)
 
 
-def load_school_data(con, school_id, data):
-    """Load data for one school into the database."""
+def create_school_snapshot(con):
+    """
+    (Re)create school_snapshot: one row per school with its latest quality
+    figures and their national comparison, for the dashboard to scan.
+    """
+    con.execute("""
+        CREATE OR REPLACE TABLE school_snapshot AS
+        SELECT
+            s.id AS school_id,
+            s.name,
+            s.aantal_leerlingen,
+            e.eindcijfer,
+            e.centraal_examen AS ce,
+            e.centraal_examen_vergelijking AS ce_land,
+            sp.percentage AS slaag_pct,
+            sp.vergelijking AS slaag_land,
+            MAX(CASE WHEN t.metric = 'leerlingen' THEN t.cijfer END) AS tevr_leerlingen,
+            MAX(CASE WHEN t.metric = 'ouders' THEN t.cijfer END) AS tevr_ouders,
+            MAX(CASE WHEN t.metric = 'sfeer' THEN t.cijfer END) AS tevr_sfeer,
+            MAX(CASE WHEN t.metric = 'veiligheid' THEN t.cijfer END) AS tevr_veiligheid,
+            MAX(CASE WHEN t.metric = 'leerlingen' THEN t.vergelijking END) AS tevr_leerlingen_land,
+            MAX(CASE WHEN t.metric = 'ouders' THEN t.vergelijking END) AS tevr_ouders_land,
+            MAX(CASE WHEN t.metric = 'sfeer' THEN t.vergelijking END) AS tevr_sfeer_land,
+            MAX(CASE WHEN t.metric = 'veiligheid' THEN t.vergelijking END) AS tevr_veiligheid_land
+        FROM schools s
+        LEFT JOIN (
+            SELECT school_id, eindcijfer, centraal_examen, centraal_examen_vergelijking,
+                   ROW_NUMBER() OVER (PARTITION BY school_id ORDER BY schooljaar DESC) AS rn
+            FROM examencijfers
+        ) e ON s.id = e.school_id AND e.rn = 1
+        LEFT JOIN (
+            SELECT school_id, percentage, vergelijking,
+                   ROW_NUMBER() OVER (PARTITION BY school_id ORDER BY schooljaar DESC) AS rn
+            FROM slagingspercentage
+        ) sp ON s.id = sp.school_id AND sp.rn = 1
+        LEFT JOIN (
+            SELECT school_id, metric, cijfer, vergelijking,
+                   ROW_NUMBER() OVER (PARTITION BY school_id, metric ORDER BY schooljaar DESC) AS rn
+            FROM tevredenheid_trend
+        ) t ON s.id = t.school_id AND t.rn = 1
+        GROUP BY ALL
+        ORDER BY s.id
+    """)
+    return con.execute("SELECT COUNT(*) FROM school_snapshot").fetchone()[0]
+
+
+class ColumnBuffers:
+    """
+    Rows for several tables, gathered as columns for one bulk insert each.
+
+    Rows are appended with keyword arguments per column. flush() turns each
+    table's columns into NumPy arrays typed after the table schema and
+    inserts them with a single INSERT ... SELECT over the registered arrays.
+    """
+
+    NUMPY_TYPES = {"INTEGER": np.int32, "BIGINT": np.int64, "DOUBLE": np.float64}
+
+    def __init__(self):
+        self.tables = {}
+
+    def append(self, table, **row):
+        """Append one row to a table's columns."""
+        columns = self.tables.get(table)
+        if columns is None:
+            columns = self.tables[table] = {name: [] for name in row}
+        for name, value in row.items():
+            columns[name].append(value)
+
+    def _to_arrays(self, name, values, data_type):
+        """
+        Convert one column to NumPy arrays DuckDB can scan quickly.
+
+        Returns {array name: array} and the select expression for the column.
+        Numbers become typed arrays, with NaN for NULL in floats (DuckDB reads
+        NaN back as NULL). Strings become fixed-width unicode arrays, which
+        scan much faster than object arrays; NULLs go in a separate mask.
+        """
+        numpy_type = self.NUMPY_TYPES.get(data_type)
+        if numpy_type is np.float64:
+            return {name: np.array([np.nan if v is None else v for v in values], dtype=np.float64)}, name
+        if None not in values:
+            return {name: np.array(values, dtype=numpy_type or str)}, name
+
+        mask = f"{name}__null"
+        placeholder = 0 if numpy_type is not None else ""
+        arrays = {
+            name: np.array([placeholder if v is None else v for v in values], dtype=numpy_type or str),
+            mask: np.array([v is None for v in values]),
+        }
+        return arrays, f"CASE WHEN {mask} THEN NULL ELSE {name} END"
+
+    def flush(self, con, replace=()):
+        """Insert all gathered rows, one statement per table.
+
+        Tables in replace use INSERT OR REPLACE, to update rows in place by
+        primary key. Returns {table: (row count, seconds)}.
+        """
+        timings = {}
+        for table, columns in self.tables.items():
+            start = time.perf_counter()
+            types = dict(con.execute(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?",
+                [table],
+            ).fetchall())
+            arrays = {}
+            expressions = []
+            for name, values in columns.items():
+                column_arrays, expression = self._to_arrays(name, values, types[name])
+                arrays.update(column_arrays)
+                expressions.append(expression)
+            names = ", ".join(columns)
+
+            insert = "INSERT OR REPLACE" if table in replace else "INSERT"
+            con.register("column_buffer", arrays)
+            try:
+                con.execute(
+                    f"{insert} INTO {table} ({names}) SELECT {', '.join(expressions)} FROM column_buffer"
+                )
+            finally:
+                con.unregister("column_buffer")
+
+            timings[table] = (len(next(iter(columns.values()))), time.perf_counter() - start)
+        self.tables = {}
+        return timings
+
+
+def load_school_data(rows, school_id, data):
+    """Gather the rows of one school into the column buffers."""
 
     school = data.get("school", {})
-    con.execute("""
-        INSERT INTO schools (id, name, address, postal_code, city, aantal_leerlingen)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, [
-        school_id,
-        school.get("name"),
-        school.get("address"),
-        school.get("postalCode"),
-        school.get("city"),
-        school.get("aantalLeerlingen"),
-    ])
+    rows.append(
+        "schools",
+        id=school_id,
+        name=school.get("name"),
+        address=school.get("address"),
+        postal_code=school.get("postalCode"),
+        city=school.get("city"),
+        aantal_leerlingen=school.get("aantalLeerlingen"),
+    )
 
     # Doorstroom onderbouw
     onderbouw = data.get("doorstroom", {}).get("onderbouw", {}).get("combined", [])
     for item in onderbouw:
-        con.execute("""
-            INSERT INTO doorstroom_onderbouw (school_id, schooljaar, percentage)
-            VALUES (?, ?, ?)
-        """, [school_id, item.get("schooljaar"), item.get("percentage")])
+        rows.append(
+            "doorstroom_onderbouw",
+            school_id=school_id, schooljaar=item.get("schooljaar"), percentage=item.get("percentage"),
+        )
 
     # Doorstroom bovenbouw (VWO only)
     bovenbouw = data.get("doorstroom", {}).get("bovenbouw", {}).get("vwo", [])
     for item in bovenbouw:
-        con.execute("""
-            INSERT INTO doorstroom_bovenbouw (school_id, schooljaar, percentage)
-            VALUES (?, ?, ?)
-        """, [school_id, item.get("schooljaar"), item.get("percentage")])
+        rows.append(
+            "doorstroom_bovenbouw",
+            school_id=school_id, schooljaar=item.get("schooljaar"), percentage=item.get("percentage"),
+        )
 
     # Schooladvies (VWO only)
     schooladvies = data.get("schooladvies", {}).get("vwo", [])
     for item in schooladvies:
-        con.execute("""
-            INSERT INTO schooladvies (school_id, positie, percentage, vergelijking)
-            VALUES (?, ?, ?, ?)
-        """, [school_id, item.get("positie"), item.get("percentage"), item.get("vergelijking")])
+        rows.append(
+            "schooladvies",
+            school_id=school_id, positie=item.get("positie"),
+            percentage=item.get("percentage"), vergelijking=item.get("vergelijking"),
+        )
 
     # Slagingspercentage (VWO only)
     slagingspercentage = data.get("slagingspercentage", {}).get("vwo", [])
     for item in slagingspercentage:
-        con.execute("""
-            INSERT INTO slagingspercentage (school_id, schooljaar, percentage, vergelijking)
-            VALUES (?, ?, ?, ?)
-        """, [school_id, item.get("schooljaar"), item.get("percentage"), item.get("vergelijking")])
+        rows.append(
+            "slagingspercentage",
+            school_id=school_id, schooljaar=item.get("schooljaar"),
+            percentage=item.get("percentage"), vergelijking=item.get("vergelijking"),
+        )
 
     # Examencijfers (VWO only)
     examencijfers = data.get("examencijfers", {}).get("vwo", [])
     for item in examencijfers:
-        con.execute("""
-            INSERT INTO examencijfers (school_id, schooljaar, centraal_examen,
-                                       centraal_examen_vergelijking, school_examen, eindcijfer)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, [
-            school_id,
-            item.get("schooljaar"),
-            item.get("centraalExamen"),
-            item.get("centraalExamenVergelijking"),
-            item.get("schoolExamen"),
-            item.get("eindcijfer"),
-        ])
+        rows.append(
+            "examencijfers",
+            school_id=school_id,
+            schooljaar=item.get("schooljaar"),
+            centraal_examen=item.get("centraalExamen"),
+            centraal_examen_vergelijking=item.get("centraalExamenVergelijking"),
+            school_examen=item.get("schoolExamen"),
+            eindcijfer=item.get("eindcijfer"),
+        )
 
     # Geslaagden per profiel (VWO only)
     geslaagden = data.get("geslaagdenPerProfiel", {}).get("vwo", [])
     for item in geslaagden:
-        con.execute("""
-            INSERT INTO geslaagden_per_profiel (school_id, profiel, deelnemers, geslaagden)
-            VALUES (?, ?, ?, ?)
-        """, [school_id, item.get("profiel"), str(item.get("deelnemers", "")), str(item.get("geslaagden", ""))])
+        rows.append(
+            "geslaagden_per_profiel",
+            school_id=school_id, profiel=item.get("profiel"),
+            deelnemers=str(item.get("deelnemers", "")), geslaagden=str(item.get("geslaagden", "")),
+        )
 
     # Oordeel inspectie
     oordeel = data.get("oordeelInspectie", {})
 
     if "onderwijspositie" in oordeel:
         item = oordeel["onderwijspositie"]
-        con.execute("""
-            INSERT INTO oordeel_inspectie (school_id, indicator, inspectienorm, schoolwaarde, periode)
-            VALUES (?, ?, ?, ?, ?)
-        """, [school_id, "onderwijspositie", item.get("inspectienorm"), item.get("schoolwaarde"), item.get("periode")])
+        rows.append(
+            "oordeel_inspectie",
+            school_id=school_id, indicator="onderwijspositie", inspectienorm=item.get("inspectienorm"),
+            schoolwaarde=item.get("schoolwaarde"), periode=item.get("periode"),
+        )
 
     if "onderbouwsnelheid" in oordeel:
         item = oordeel["onderbouwsnelheid"]
-        con.execute("""
-            INSERT INTO oordeel_inspectie (school_id, indicator, inspectienorm, schoolwaarde, periode)
-            VALUES (?, ?, ?, ?, ?)
-        """, [school_id, "onderbouwsnelheid", item.get("inspectienorm"), item.get("schoolwaarde"), item.get("periode")])
+        rows.append(
+            "oordeel_inspectie",
+            school_id=school_id, indicator="onderbouwsnelheid", inspectienorm=item.get("inspectienorm"),
+            schoolwaarde=item.get("schoolwaarde"), periode=item.get("periode"),
+        )
 
     bovenbouwsucces = oordeel.get("bovenbouwsucces", {}).get("vwo")
     if bovenbouwsucces:
-        con.execute("""
-            INSERT INTO oordeel_inspectie (school_id, indicator, inspectienorm, schoolwaarde, periode)
-            VALUES (?, ?, ?, ?, ?)
-        """, [school_id, "bovenbouwsucces", bovenbouwsucces.get("inspectienorm"), bovenbouwsucces.get("schoolwaarde"), bovenbouwsucces.get("periode")])
-
+        rows.append(
+            "oordeel_inspectie",
+            school_id=school_id, indicator="bovenbouwsucces", inspectienorm=bovenbouwsucces.get("inspectienorm"),
+            schoolwaarde=bovenbouwsucces.get("schoolwaarde"), periode=bovenbouwsucces.get("periode"),
+        )
 
-def load_tevredenheid_data(con, school_name_to_id, data):
-    """Load tevredenheid data for one school into the database."""
-    school_name = data.get("school", {}).get("name", "")
 
-    school_id = school_name_to_id.get(school_name)
+def load_tevredenheid_data(rows, school_id, data):
+    """Gather the tevredenheid rows of one school into the column buffers."""
     if not school_id:
-        print(f"  -> Warning: No matching school found for '{school_name}'")
+        print(f"  -> Warning: No matching school found for '{data.get('school', {}).get('name', '')}'")
         return False
 
     # Load trend data
     trends = data.get("trends", {})
     for metric, items in trends.items():
         for item in items:
-            con.execute("""
-                INSERT INTO tevredenheid_trend (school_id, metric, schooljaar, cijfer, vergelijking)
-                VALUES (?, ?, ?, ?, ?)
-            """, [school_id, metric, item.get("schooljaar"), item.get("cijfer"), item.get("vergelijking")])
+            rows.append(
+                "tevredenheid_trend",
+                school_id=school_id, metric=metric, schooljaar=item.get("schooljaar"),
+                cijfer=item.get("cijfer"), vergelijking=item.get("vergelijking"),
+            )
 
     # Load question data
     vragen = data.get("vragen", {})
     for respondent, questions in vragen.items():
         for item in questions:
-            con.execute("""
-                INSERT INTO tevredenheid_vragen (school_id, respondent, vraag, cijfer)
-                VALUES (?, ?, ?, ?)
-            """, [school_id, respondent, item.get("vraag"), item.get("cijfer")])
+            rows.append(
+                "tevredenheid_vragen",
+                school_id=school_id, respondent=respondent, vraag=item.get("vraag"), cijfer=item.get("cijfer"),
+            )
 
     return True
 
@@ -640,108 +1000,598 @@ def load_tevredenheid_data(con, school_name_to_id, data):
 # Main Entry Points
 # =============================================================================
 
-def parse_html_to_json(base_dir: Path):
-    """Parse all HTML files to JSON."""
-    html_dir = base_dir / "html"
+def convert_html_file(parse, html_file, json_dir: Path):
+    """
+    Parse one HTML page (a Path or a PageRef) and write it as JSON.
+
+    Returns (output_name, error, cpu_seconds); runs in pool workers, so
+    errors are returned as strings instead of raised.
+    """
+    start = time.process_time()
+    try:
+        data = parse(html_file)
+        output_name = Path(html_file.name).stem + ".json"
+        output_path = json_dir / output_name
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        return output_name, None, time.process_time() - start
+    except Exception as e:
+        return None, str(e), time.process_time() - start
+
+
+def convert_html_files(parse, html_files, json_dir: Path, pool=None):
+    """Convert HTML files to JSON, in order, optionally on a process pool.
+
+    Returns the CPU time spent parsing, summed over all workers, and the
+    files that were converted without errors.
+    """
+    if pool is None:
+        results = map(convert_html_file, repeat(parse), html_files, repeat(json_dir))
+    else:
+        results = pool.map(
+            convert_html_file, repeat(parse), html_files, repeat(json_dir), chunksize=4
+        )
+
+    cpu_time = 0.0
+    converted = []
+    for html_file, (output_name, error, file_cpu_time) in zip(html_files, results):
+        cpu_time += file_cpu_time
+        if error is None:
+            converted.append(html_file)
+            print(f"  {html_file.name} -> {output_name}")
+        else:
+            print(f"  Error processing {html_file.name}: {error}")
+
+    return cpu_time, converted
+
+
+def stale_files(files, entries, states, **versions):
+    """Return the files whose manifest entry does not match their state."""
+    return [f for f in files if not is_current(entries.get(f.name), states[f.name], **versions)]
+
+
+def parse_html_to_json(base_dir: Path, jobs: int = 1, full: bool = False):
+    """
+    Parse changed HTML pages to JSON, using up to jobs worker processes.
+
+    Pages are read from the page store (latest version of each page).
+    Pages whose hash and PARSER_VERSION match the manifest, and whose
+    JSON still exists, are skipped unless full is set. The JSON of pages
+    no longer in the store is deleted.
+    """
     json_dir = base_dir / "json"
     json_dir.mkdir(exist_ok=True)
 
-    # Process school result files
-    result_html_files = list(html_dir.glob("resultaten-*.html"))
-    print(f"Parsing {len(result_html_files)} result HTML files...")
+    manifest = load_manifest(base_dir)
+    previous = {} if full else manifest.get("html", {})
+
+    store = open_store(base_dir)
+    result_html_files = [store.latest(name) for name in store.names("resultaten-")]
+    tevredenheid_files = [store.latest(name) for name in store.names("tevredenheid-")]
+    html_files = result_html_files + tevredenheid_files
+    states = {page.name: {"hash": page.hash} for page in html_files}
+    # The JSON of pages that left the store goes too, so create_database()
+    # sees the removal
+    gone = [name for name in manifest.get("html", {}) if name not in states]
+    for name in gone:
+        (json_dir / (Path(name).stem + ".json")).unlink(missing_ok=True)
+    if gone:
+        print(f"Removed the JSON of {len(gone)} pages no longer in the page store")
+    # Forget entries whose JSON went missing so they are parsed again
+    current = {
+        name: entry for name, entry in previous.items()
+        if name in states and (json_dir / (Path(name).stem + ".json")).exists()
+    }
 
-    for html_file in result_html_files:
-        try:
-            data = parse_school_html(html_file)
-            output_name = html_file.stem + ".json"
-            output_path = json_dir / output_name
+    stale_results = stale_files(result_html_files, current, states, parser=PARSER_VERSION)
+    stale_tevredenheid = stale_files(tevredenheid_files, current, states, parser=PARSER_VERSION)
+
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and stale_results + stale_tevredenheid else None
+    try:
+        # Process school result files
+        print(f"Parsing {len(stale_results)} result HTML files "
+              f"({len(result_html_files) - len(stale_results)} unchanged)...")
+        cpu_time, converted = convert_html_files(parse_school_html, stale_results, json_dir, pool)
+
+        # Process tevredenheid files
+        print(f"Parsing {len(stale_tevredenheid)} tevredenheid HTML files "
+              f"({len(tevredenheid_files) - len(stale_tevredenheid)} unchanged)...")
+        tevredenheid_cpu_time, tevredenheid_converted = convert_html_files(
+            parse_tevredenheid_html, stale_tevredenheid, json_dir, pool
+        )
+        cpu_time += tevredenheid_cpu_time
+        converted += tevredenheid_converted
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    wall_time = time.perf_counter() - start
+
+    for html_file in stale_results + stale_tevredenheid:
+        current.pop(html_file.name, None)
+    for html_file in converted:
+        current[html_file.name] = {**states[html_file.name], "parser": PARSER_VERSION}
+    for name, entry in current.items():
+        entry.update(states[name])
+    manifest["html"] = current
+    save_manifest(base_dir, manifest)
+
+    print(f"Parsed {len(stale_results) + len(stale_tevredenheid)} files with {jobs} job(s): "
+          f"{wall_time:.2f}s wall, {cpu_time:.2f}s CPU")
+
+
+def load_json_file(json_file: Path):
+    """Load one JSON file."""
+    with open(json_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def delete_school_rows(con, tables, school_ids):
+    """Delete the rows of the given schools from tables."""
+    if not school_ids:
+        return
+    for table in tables:
+        con.execute(
+            f"DELETE FROM {table} WHERE school_id IN (SELECT UNNEST(?::INTEGER[]))",
+            [sorted(school_ids)],
+        )
 
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
 
-            print(f"  {html_file.name} -> {output_name}")
-        except Exception as e:
-            print(f"  Error processing {html_file.name}: {e}")
+def print_load_timings(timings):
+    """Print rows inserted and time taken per table."""
+    print("\n--- Load Timing ---")
+    for table, (count, seconds) in timings.items():
+        print(f"  {table}: {count} rows in {seconds * 1000:.1f}ms")
+    total = sum(seconds for _, seconds in timings.values())
+    print(f"  total: {total * 1000:.1f}ms")
 
-    # Process tevredenheid files
-    tevredenheid_files = list(html_dir.glob("tevredenheid-*.html"))
-    print(f"Parsing {len(tevredenheid_files)} tevredenheid HTML files...")
 
-    for html_file in tevredenheid_files:
-        try:
-            data = parse_tevredenheid_html(html_file)
-            output_name = html_file.stem + ".json"
-            output_path = json_dir / output_name
+def print_database_summary(con):
+    """Print the row count of every table."""
+    print("\n--- Database Summary ---")
+    for table in ALL_TABLES:
+        count = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        print(f"  {table}: {count} rows")
 
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
 
-            print(f"  {html_file.name} -> {output_name}")
-        except Exception as e:
-            print(f"  Error processing {html_file.name}: {e}")
+@contextmanager
+def database_swap(db_path: Path, update: bool = False):
+    """
+    Open a connection that builds db_path in a temporary file.
+
+    The work runs in one transaction on <db>.tmp, a copy of db_path when
+    update is set and a new file otherwise. On success it is committed and
+    checkpointed, and the file is renamed over db_path, so readers only ever
+    see a complete database. On error the temporary file is removed and
+    db_path is left untouched.
+    """
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    wal_path = tmp_path.with_name(tmp_path.name + ".wal")
+    tmp_path.unlink(missing_ok=True)
+    wal_path.unlink(missing_ok=True)
+    if update:
+        shutil.copyfile(db_path, tmp_path)
+
+    con = duckdb.connect(str(tmp_path))
+    try:
+        con.begin()
+        yield con
+        con.commit()
+        con.execute("CHECKPOINT")
+    except BaseException:
+        con.close()
+        tmp_path.unlink(missing_ok=True)
+        wal_path.unlink(missing_ok=True)
+        raise
+    con.close()
+    tmp_path.replace(db_path)
+
 
+def create_database(base_dir: Path, full: bool = False):
+    """
+    Create or update scholen.duckdb from JSON files.
 
-def create_database(base_dir: Path):
-    """Create scholen.duckdb from JSON files."""
+    Only the schools whose resultaten or tevredenheid JSON changed since the
+    last build (according to the manifest) are deleted and reloaded. The
+    database is rebuilt from scratch when it is missing, LOADER_VERSION
+    changed, a resultaten file was removed, or full is set.
+    """
     db_path = base_dir / "scholen.duckdb"
     json_dir = base_dir / "json"
 
-    # Remove existing database
-    if db_path.exists():
-        db_path.unlink()
-
-    con = duckdb.connect(str(db_path))
-    create_schema(con)
+    manifest = load_manifest(base_dir)
+    previous = manifest.get("json", {})
 
-    # Find all school result JSON files
     json_files = sorted(json_dir.glob("resultaten-*.json"))
-    print(f"Loading {len(json_files)} schools into database...")
+    tevredenheid_files = sorted(json_dir.glob("tevredenheid-*.json"))
+    states = {f.name: file_state(f, previous.get(f.name)) for f in json_files + tevredenheid_files}
+
+    names = {f.name for f in json_files}
+    removed = [name for name in previous if name.startswith("resultaten-") and name not in names]
+    if full or not db_path.exists() or manifest.get("loader") != LOADER_VERSION or removed:
+        previous = {}
+
+    stale_results = stale_files(json_files, previous, states)
+    stale_tevredenheid = stale_files(tevredenheid_files, previous, states)
+    identity_sources = identity.read_identity_sources(base_dir)
+    identity_fingerprint = identity.sources_fingerprint(identity_sources)
+
+    if (previous and not stale_results and not stale_tevredenheid and len(previous) == len(states)
+            and manifest.get("identity") == identity_fingerprint):
+        print(f"All {len(states)} JSON files unchanged, {db_path} is up to date")
+        return
+
+    with database_swap(db_path, update=bool(previous)) as con:
+        if not previous:
+            create_schema(con)
+        entries, timings = load_changed_files(con, previous, states, json_files, tevredenheid_files,
+                                              stale_results, stale_tevredenheid)
+
+        start = time.perf_counter()
+        count = create_school_snapshot(con)
+        timings["school_snapshot"] = (count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        file_ids = {name: entry["school_id"] for name, entry in entries.items()}
+        count = identity.create_identity_tables(con, file_ids, identity_sources)
+        timings["school_identity"] = (count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        count = search.create_search_tables(con, identity_sources)
+        timings["search_name"] = (count, time.perf_counter() - start)
+
+        # Show summary
+        print_load_timings(timings)
+        print_database_summary(con)
+
+    manifest["json"] = entries
+    manifest["loader"] = LOADER_VERSION
+    manifest["identity"] = identity_fingerprint
+    save_manifest(base_dir, manifest)
+    print(f"\nDatabase saved to: {db_path}")
+
+
+def load_changed_files(con, previous, states, json_files, tevredenheid_files,
+                       stale_results, stale_tevredenheid):
+    """
+    Reload the stale JSON files into an open database.
+
+    Returns the new manifest entries for all JSON files and the load
+    timings.
+    """
+
+    # Keep the ids of known schools, number new ones after them
+    entries = {name: entry for name, entry in previous.items() if name in states}
+    next_id = max((e["school_id"] for n, e in entries.items() if n.startswith("resultaten-")), default=0) + 1
 
-    school_name_to_id = {}
+    print(f"Loading {len(stale_results)} schools into database "
+          f"({len(json_files) - len(stale_results)} unchanged)...")
 
-    for school_id, json_file in enumerate(json_files, start=1):
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    rows = ColumnBuffers()
+    affected_ids = set()
+    for json_file in stale_results:
+        entry = entries.get(json_file.name)
+        if entry is None:
+            school_id = next_id
+            next_id += 1
+        else:
+            school_id = entry["school_id"]
+
+        data = load_json_file(json_file)
+        load_school_data(rows, school_id, data)
+        affected_ids.add(school_id)
+        entries[json_file.name] = {**states[json_file.name], "school_id": school_id}
+        print(f"  {data.get('school', {}).get('name', 'Unknown')}")
+
+    delete_school_rows(con, RESULT_TABLES, affected_ids)
+    timings = rows.flush(con, replace=("schools",))
+
+    # Reload tevredenheid for changed files, for schools that were reloaded
+    # and for files that did not match a school before
+    removed_tevredenheid = [
+        entry for name, entry in previous.items()
+        if name.startswith("tevredenheid-") and name not in states
+    ]
+    reset_ids = affected_ids | {
+        entries[f.name]["school_id"] for f in stale_tevredenheid if f.name in entries
+    } | {entry["school_id"] for entry in removed_tevredenheid}
+    reset_ids.discard(None)
+    delete_school_rows(con, TEVREDENHEID_TABLES, reset_ids)
+
+    reload_tevredenheid = [
+        f for f in tevredenheid_files
+        if f in stale_tevredenheid
+        or entries[f.name]["school_id"] is None
+        or entries[f.name]["school_id"] in reset_ids
+    ]
+    print(f"Loading {len(reload_tevredenheid)} tevredenheid records "
+          f"({len(tevredenheid_files) - len(reload_tevredenheid)} unchanged)...")
+
+    # A tevredenheid page belongs to the resultaten page with the same slug
+    for json_file in reload_tevredenheid:
+        data = load_json_file(json_file)
+        resultaten = entries.get(json_file.name.replace("tevredenheid-", "resultaten-", 1), {})
+        loaded = load_tevredenheid_data(rows, resultaten.get("school_id"), data)
+        school_id = resultaten.get("school_id") if loaded else None
+        entries[json_file.name] = {**states[json_file.name], "school_id": school_id}
+
+    timings.update(rows.flush(con))
+
+    for name, entry in entries.items():
+        entry.update(states[name])
+
+    return entries, timings
+
+
+# =============================================================================
+# SQL Build Mode
+# =============================================================================
 
-        load_school_data(con, school_id, data)
-        school_name = data.get("school", {}).get("name", "Unknown")
-        school_name_to_id[school_name] = school_id
-        print(f"  {school_name}")
+# Staging schemas for read_json: only the parts of the JSON that are loaded.
+# Missing keys read as NULL, keys not listed here are ignored.
+_CHART_ROWS = "STRUCT(schooljaar VARCHAR, percentage DOUBLE, vergelijking DOUBLE)[]"
+_INSPECTIE = "STRUCT(inspectienorm DOUBLE, schoolwaarde DOUBLE, periode VARCHAR)"
+
+RESULTATEN_JSON_COLUMNS = {
+    "school": "STRUCT(name VARCHAR, address VARCHAR, postalCode VARCHAR, city VARCHAR, aantalLeerlingen INTEGER)",
+    "doorstroom": (
+        "STRUCT(onderbouw STRUCT(combined STRUCT(schooljaar VARCHAR, percentage DOUBLE)[]), "
+        "bovenbouw STRUCT(vwo STRUCT(schooljaar VARCHAR, percentage DOUBLE)[]))"
+    ),
+    "schooladvies": "STRUCT(vwo STRUCT(positie VARCHAR, percentage DOUBLE, vergelijking DOUBLE)[])",
+    "slagingspercentage": f"STRUCT(vwo {_CHART_ROWS})",
+    "examencijfers": (
+        "STRUCT(vwo STRUCT(schooljaar VARCHAR, centraalExamen DOUBLE, centraalExamenVergelijking DOUBLE, "
+        "schoolExamen DOUBLE, eindcijfer DOUBLE)[])"
+    ),
+    "geslaagdenPerProfiel": "STRUCT(vwo STRUCT(profiel VARCHAR, deelnemers VARCHAR, geslaagden VARCHAR)[])",
+    "oordeelInspectie": (
+        f"STRUCT(onderwijspositie {_INSPECTIE}, onderbouwsnelheid {_INSPECTIE}, "
+        f"bovenbouwsucces STRUCT(vwo {_INSPECTIE}))"
+    ),
+}
+
+TEVREDENHEID_JSON_COLUMNS = {
+    "school": "STRUCT(name VARCHAR)",
+    "trends": "MAP(VARCHAR, STRUCT(schooljaar VARCHAR, cijfer DOUBLE, vergelijking DOUBLE)[])",
+    "vragen": "MAP(VARCHAR, STRUCT(vraag VARCHAR, cijfer DOUBLE)[])",
+}
+
+# INSERT ... SELECT per table, from the resultaten_staging and
+# tevredenheid_staging tables. Mirrors load_school_data and
+# load_tevredenheid_data.
+SQL_LOAD_STATEMENTS = {
+    "schools": """
+        INSERT INTO schools (id, name, address, postal_code, city, aantal_leerlingen)
+        SELECT school_id, school.name, school.address, school.postalCode, school.city,
+               school.aantalLeerlingen
+        FROM resultaten_staging
+        ORDER BY school_id
+    """,
+    "doorstroom_onderbouw": """
+        INSERT INTO doorstroom_onderbouw (school_id, schooljaar, percentage)
+        SELECT school_id, item.schooljaar, item.percentage
+        FROM (SELECT school_id, UNNEST(doorstroom.onderbouw.combined) AS item FROM resultaten_staging)
+    """,
+    "doorstroom_bovenbouw": """
+        INSERT INTO doorstroom_bovenbouw (school_id, schooljaar, percentage)
+        SELECT school_id, item.schooljaar, item.percentage
+        FROM (SELECT school_id, UNNEST(doorstroom.bovenbouw.vwo) AS item FROM resultaten_staging)
+    """,
+    "schooladvies": """
+        INSERT INTO schooladvies (school_id, positie, percentage, vergelijking)
+        SELECT school_id, item.positie, item.percentage, item.vergelijking
+        FROM (SELECT school_id, UNNEST(schooladvies.vwo) AS item FROM resultaten_staging)
+    """,
+    "slagingspercentage": """
+        INSERT INTO slagingspercentage (school_id, schooljaar, percentage, vergelijking)
+        SELECT school_id, item.schooljaar, item.percentage, item.vergelijking
+        FROM (SELECT school_id, UNNEST(slagingspercentage.vwo) AS item FROM resultaten_staging)
+    """,
+    "examencijfers": """
+        INSERT INTO examencijfers (school_id, schooljaar, centraal_examen,
+                                   centraal_examen_vergelijking, school_examen, eindcijfer)
+        SELECT school_id, item.schooljaar, item.centraalExamen, item.centraalExamenVergelijking,
+               item.schoolExamen, item.eindcijfer
+        FROM (SELECT school_id, UNNEST(examencijfers.vwo) AS item FROM resultaten_staging)
+    """,
+    "geslaagden_per_profiel": """
+        INSERT INTO geslaagden_per_profiel (school_id, profiel, deelnemers, geslaagden)
+        SELECT school_id, item.profiel, COALESCE(item.deelnemers, ''), COALESCE(item.geslaagden, '')
+        FROM (SELECT school_id, UNNEST(geslaagdenPerProfiel.vwo) AS item FROM resultaten_staging)
+    """,
+    "oordeel_inspectie": """
+        INSERT INTO oordeel_inspectie (school_id, indicator, inspectienorm, schoolwaarde, periode)
+        SELECT school_id, indicator, item.inspectienorm, item.schoolwaarde, item.periode
+        FROM (
+            SELECT school_id, 1 AS pos, 'onderwijspositie' AS indicator,
+                   oordeelInspectie.onderwijspositie AS item
+            FROM resultaten_staging
+            UNION ALL
+            SELECT school_id, 2, 'onderbouwsnelheid', oordeelInspectie.onderbouwsnelheid
+            FROM resultaten_staging
+            UNION ALL
+            SELECT school_id, 3, 'bovenbouwsucces', oordeelInspectie.bovenbouwsucces.vwo
+            FROM resultaten_staging
+        )
+        WHERE item IS NOT NULL
+        ORDER BY school_id, pos
+    """,
+    "tevredenheid_trend": """
+        INSERT INTO tevredenheid_trend (school_id, metric, schooljaar, cijfer, vergelijking)
+        SELECT school_id, metric, item.schooljaar, item.cijfer, item.vergelijking
+        FROM (
+            SELECT school_id, entry.key AS metric, UNNEST(entry.value) AS item
+            FROM (
+                SELECT school_id, UNNEST(map_entries(trends)) AS entry
+                FROM tevredenheid_staging
+                WHERE school_id IS NOT NULL
+            )
+        )
+    """,
+    "tevredenheid_vragen": """
+        INSERT INTO tevredenheid_vragen (school_id, respondent, vraag, cijfer)
+        SELECT school_id, respondent, item.vraag, item.cijfer
+        FROM (
+            SELECT school_id, entry.key AS respondent, UNNEST(entry.value) AS item
+            FROM (
+                SELECT school_id, UNNEST(map_entries(vragen)) AS entry
+                FROM tevredenheid_staging
+                WHERE school_id IS NOT NULL
+            )
+        )
+    """,
+}
 
-    # Load tevredenheid data
+
+def _sql_string(value) -> str:
+    """Quote a value as an SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _read_json_sql(pattern: Path, columns: dict) -> str:
+    """Return a read_json() call for a glob with an explicit column schema."""
+    column_spec = ", ".join(f"{_sql_string(name)}: {_sql_string(type_)}" for name, type_ in columns.items())
+    return f"read_json({_sql_string(pattern)}, columns = {{{column_spec}}}, filename = true)"
+
+
+def create_database_sql(base_dir: Path):
+    """
+    Create scholen.duckdb from JSON files without loading them in Python.
+
+    DuckDB's read_json loads json/resultaten-*.json and tevredenheid-*.json
+    into staging tables, and every table is filled with one set-based
+    INSERT ... SELECT. Produces the same tables as create_database (see
+    compare_databases); always rebuilds from scratch, and records the
+    loaded files in the manifest so later incremental builds can continue.
+    """
+    db_path = base_dir / "scholen.duckdb"
+    json_dir = base_dir / "json"
+
+    json_files = sorted(json_dir.glob("resultaten-*.json"))
     tevredenheid_files = sorted(json_dir.glob("tevredenheid-*.json"))
-    print(f"Loading {len(tevredenheid_files)} tevredenheid records...")
 
-    for json_file in tevredenheid_files:
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    with database_swap(db_path) as con:
+        create_schema(con)
+
+        print(f"Loading {len(json_files)} schools and {len(tevredenheid_files)} tevredenheid records "
+              f"with read_json...")
+
+        timings = {}
+        start = time.perf_counter()
+        # School ids follow the sorted file names, like create_database
+        source = _read_json_sql(json_dir / "resultaten-*.json", RESULTATEN_JSON_COLUMNS) if json_files else None
+        con.execute(f"""
+            CREATE TEMP TABLE resultaten_staging AS
+            SELECT ROW_NUMBER() OVER (ORDER BY filename)::INTEGER AS school_id, *
+            FROM {source or "(SELECT NULL AS filename) WHERE false"}
+        """)
+        timings["resultaten_staging"] = (len(json_files), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        # Match tevredenheid to the resultaten page with the same slug, like create_database
+        source = _read_json_sql(json_dir / "tevredenheid-*.json", TEVREDENHEID_JSON_COLUMNS) if tevredenheid_files else None
+        con.execute(f"""
+            CREATE TEMP TABLE tevredenheid_staging AS
+            SELECT ids.school_id, t.*
+            FROM {source or "(SELECT NULL AS filename, NULL AS school) WHERE false"} t
+            LEFT JOIN (
+                SELECT parse_filename(filename) AS file, school_id FROM resultaten_staging
+            ) ids ON replace(parse_filename(t.filename), 'tevredenheid-', 'resultaten-') = ids.file
+        """)
+        timings["tevredenheid_staging"] = (len(tevredenheid_files), time.perf_counter() - start)
+
+        for (school_name,) in con.execute("""
+            SELECT COALESCE(school.name, '') FROM tevredenheid_staging
+            WHERE school_id IS NULL ORDER BY filename
+        """).fetchall():
+            print(f"  -> Warning: No matching school found for '{school_name}'")
+
+        for table, statement in SQL_LOAD_STATEMENTS.items():
+            start = time.perf_counter()
+            count = con.execute(statement).fetchone()[0]
+            timings[table] = (count, time.perf_counter() - start)
+
+        # Record the files like create_database, for later incremental builds
+        file_ids = dict(con.execute("""
+            SELECT parse_filename(filename), school_id FROM resultaten_staging
+            UNION ALL
+            SELECT parse_filename(filename), school_id FROM tevredenheid_staging
+        """).fetchall())
+
+        start = time.perf_counter()
+        count = create_school_snapshot(con)
+        timings["school_snapshot"] = (count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        identity_sources = identity.read_identity_sources(base_dir)
+        count = identity.create_identity_tables(con, file_ids, identity_sources)
+        timings["school_identity"] = (count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        count = search.create_search_tables(con, identity_sources)
+        timings["search_name"] = (count, time.perf_counter() - start)
+
+        # Show summary
+        print_load_timings(timings)
+        print_database_summary(con)
+
+    manifest = load_manifest(base_dir)
+    manifest["json"] = {
+        f.name: {**file_state(f), "school_id": file_ids.get(f.name)}
+        for f in json_files + tevredenheid_files
+    }
+    manifest["loader"] = LOADER_VERSION
+    manifest["identity"] = identity.sources_fingerprint(identity_sources)
+    save_manifest(base_dir, manifest)
+    print(f"\nDatabase saved to: {db_path}")
 
-        load_tevredenheid_data(con, school_name_to_id, data)
 
-    # Show summary
-    print("\n--- Database Summary ---")
-    for table in [
-        "schools", "doorstroom_onderbouw", "doorstroom_bovenbouw", "schooladvies",
-        "slagingspercentage", "examencijfers", "geslaagden_per_profiel",
-        "oordeel_inspectie", "tevredenheid_trend", "tevredenheid_vragen",
-    ]:
-        count = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-        print(f"  {table}: {count} rows")
+def compare_databases(path_a: Path, path_b: Path):
+    """
+    Compare the tables of two scholen.duckdb files row for row.
+
+    Returns a list of difference descriptions, empty if the databases hold
+    the same rows (as multisets) in every table.
+    """
+    con = duckdb.connect()
+    con.execute(f"ATTACH {_sql_string(path_a)} AS db_a (READ_ONLY)")
+    con.execute(f"ATTACH {_sql_string(path_b)} AS db_b (READ_ONLY)")
+
+    differences = []
+    for table in ALL_TABLES:
+        only_a = con.execute(
+            f"SELECT COUNT(*) FROM (SELECT * FROM db_a.{table} EXCEPT ALL SELECT * FROM db_b.{table})"
+        ).fetchone()[0]
+        only_b = con.execute(
+            f"SELECT COUNT(*) FROM (SELECT * FROM db_b.{table} EXCEPT ALL SELECT * FROM db_a.{table})"
+        ).fetchone()[0]
+        if only_a or only_b:
+            differences.append(f"{table}: {only_a} rows only in {path_a}, {only_b} rows only in {path_b}")
 
     con.close()
-    print(f"\nDatabase saved to: {db_path}")
+    return differences
+
 
+def build(base_dir: Path, jobs: int = 1, full: bool = False, load: str = "python"):
+    """
+    Full pipeline: HTML -> JSON -> scholen.duckdb, skipping unchanged files.
 
-def build(base_dir: Path):
-    """Full pipeline: HTML -> JSON -> scholen.duckdb"""
+    With load="sql" the database is built by create_database_sql instead.
+    """
     print("=" * 60)
     print("Building scholen.duckdb from HTML files")
     print("=" * 60)
 
     print("\n[1/2] Parsing HTML to JSON...")
-    parse_html_to_json(base_dir)
+    parse_html_to_json(base_dir, jobs=jobs, full=full)
 
     print("\n[2/2] Creating database from JSON...")
-    create_database(base_dir)
+    if load == "sql":
+        create_database_sql(base_dir)
+    else:
+        create_database(base_dir, full=full)
 
     print("\nDone!")
@@ -0,0 +1,232 @@
+"""
+Trigram index for fuzzy search over school and afdeling names.
+
+Flow: loting_school.naam + afdeling.naam/variant (loting_matching.duckdb) + schools.name
+      -> search_name + search_name_afdeling + search_trigram (scholen.duckdb) -> NameIndex
+
+Names are lowercased, stripped of accents and split into words. Every
+word is padded with two spaces in front and one behind, like PostgreSQL's
+pg_trgm, and cut into trigrams ("  c", " ca", "car", ..., "us "). A query
+scores against a name by the share of its trigrams found in the name, so
+a word prefix or a typo still matches ("ignatuis" finds "Sint
+Ignatiusgymnasium"); a name that contains the query literally scores 1.
+The postings of every trigram are built at ingest and loaded as numpy
+arrays, so a search is one bincount over the postings of the query's
+trigrams.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+
+SEARCH_TABLES = ["search_name", "search_name_afdeling", "search_trigram"]
+
+# Share of the query's trigrams a name must contain to match
+MIN_SCORE = 0.5
+
+
+def normalize(text: str) -> str:
+    """Lowercase text, strip accents and keep only its words, space-separated."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def trigrams(normalized: str) -> set:
+    """Return the trigrams of the padded words of a normalized name."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def name_entries(schools, afdelingen, school_names=(), school_afdelingen=None) -> list:
+    """
+    Return the names to index as (kind, ref_id, naam, afdeling ids).
+
+    schools are (id, naam) loting schools, afdelingen (id, school_id, naam,
+    variant) loting afdelingen and school_names (id, name) scholenopdekaart
+    schools, whose afdelingen are looked up in school_afdelingen. Every
+    name carries the afdelingen it stands for, so a match on a school name
+    finds all of the school's afdelingen.
+    """
+    by_school = {}
+    for afdeling_id, school_id, _, _ in afdelingen:
+        by_school.setdefault(school_id, []).append(afdeling_id)
+
+    entries = []
+    for school_id, naam in schools:
+        if naam:
+            entries.append(("loting_school", school_id, naam, sorted(by_school.get(school_id, []))))
+    for afdeling_id, _, naam, variant in afdelingen:
+        if naam:
+            entries.append(("afdeling", afdeling_id, naam, [afdeling_id]))
+        if variant:
+            entries.append(("variant", afdeling_id, variant, [afdeling_id]))
+    for school_id, name in school_names:
+        if name:
+            entries.append(("school", school_id, name, sorted((school_afdelingen or {}).get(school_id, []))))
+    return entries
+
+
+class NameIndex:
+    """
+    Trigram postings over a list of names, see name_entries().
+
+    Built once, from name_entries() or from the tables in scholen.duckdb,
+    and then only read; search() does not touch the database.
+    """
+
+    def __init__(self, entries, postings=None):
+        self.kinds = [entry[0] for entry in entries]
+        self.ref_ids = [entry[1] for entry in entries]
+        self.names = [entry[2] for entry in entries]
+        self.afdeling_ids = [list(entry[3] or []) for entry in entries]
+        self.normalized = [normalize(name) for name in self.names]
+        grams = [trigrams(name) for name in self.normalized]
+        self.sizes = np.array([len(g) for g in grams], dtype=np.float64)
+
+        if postings is None:
+            postings = {}
+            for entry_id, entry_grams in enumerate(grams):
+                for gram in entry_grams:
+                    postings.setdefault(gram, []).append(entry_id)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @classmethod
+    def load(cls, db, schema: str = ""):
+        """Load the index from the search tables, e.g. schema='scholen_db.'."""
+        entries = db.execute(f"""
+            SELECT n.kind, n.ref_id, n.naam, list(a.afdeling_id ORDER BY a.afdeling_id)
+                FILTER (WHERE a.afdeling_id IS NOT NULL)
+            FROM {schema}search_name n
+            LEFT JOIN {schema}search_name_afdeling a ON a.entry_id = n.entry_id
+            GROUP BY n.entry_id, n.kind, n.ref_id, n.naam
+            ORDER BY n.entry_id
+        """).fetchall()
+        postings = dict(db.execute(f"""
+            SELECT trigram, list(entry_id ORDER BY entry_id) FROM {schema}search_trigram GROUP BY trigram
+        """).fetchall())
+        return cls(entries, postings)
+
+    def __len__(self):
+        return len(self.names)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the score of every name for a query, 0 where it does not match."""
+        query = normalize(query)
+        grams = trigrams(query)
+        scores = np.zeros(len(self.names))
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return scores
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        candidates = np.flatnonzero(counts)
+        scores[candidates] = counts[candidates] / len(grams)
+        for entry_id in candidates:
+            if query in self.normalized[entry_id]:
+                scores[entry_id] = 1.0
+        scores[scores < MIN_SCORE] = 0
+        return scores
+
+    def similarity(self, query: str) -> np.ndarray:
+        """
+        Return the Dice similarity of the trigrams of a query and of every
+        name: unlike scores(), a name much longer than the query scores low.
+        """
+        grams = trigrams(normalize(query))
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return np.zeros(len(self.names))
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        return 2 * counts / (len(grams) + self.sizes)
+
+    def search(self, query: str, limit: int = 20, kinds=None) -> list[dict]:
+        """
+        Return the best matching names for a query, best first.
+
+        Names with the same score are ranked by trigram similarity to the
+        whole query, so "cartesius" puts "Cartesius Lyceum" before
+        "Cartesius Amsterdam - Het Lyceum". kinds limits the names searched.
+        """
+        scores = self.scores(query)
+        matches = np.flatnonzero(scores)
+        if kinds is not None:
+            matches = np.array([i for i in matches if self.kinds[i] in kinds], dtype=np.int64)
+        if not len(matches):
+            return []
+        similarity = scores[matches] / np.maximum(self.sizes[matches], 1)
+        order = matches[np.lexsort((matches, -similarity, -scores[matches]))][:limit]
+        return [
+            {
+                "kind": self.kinds[i], "id": self.ref_ids[i], "naam": self.names[i],
+                "score": float(scores[i]), "afdeling_ids": self.afdeling_ids[i],
+            }
+            for i in order
+        ]
+
+    def afdeling_scores(self, query: str) -> dict:
+        """Return {afdeling id: best score} for the afdelingen whose names match a query."""
+        scores = self.scores(query)
+        result = {}
+        for entry_id in np.flatnonzero(scores):
+            score = float(scores[entry_id])
+            for afdeling_id in self.afdeling_ids[entry_id]:
+                if score > result.get(afdeling_id, 0):
+                    result[afdeling_id] = score
+        return result
+
+
+def create_search_tables(con, sources: dict) -> int:
+    """
+    (Re)create the search tables in an open scholen.duckdb.
+
+    sources come from identity.read_identity_sources(); scholenopdekaart
+    schools are linked to loting afdelingen by the identity tables, which
+    must exist. Returns the number of names indexed.
+    """
+    # scholen imports this module
+    from .scholen import ColumnBuffers
+
+    schools, afdelingen = sources["loting"] or ([], [])
+    school_names = con.execute("SELECT id, name FROM schools ORDER BY id").fetchall()
+    school_afdelingen = {}
+    for school_id, afdeling_id in con.execute("""
+        SELECT i.school_id, ai.afdeling_id
+        FROM afdeling_identity ai
+        JOIN school_identity i ON i.school_key = ai.school_key
+        WHERE i.school_id IS NOT NULL
+        ORDER BY ai.afdeling_id
+    """).fetchall():
+        school_afdelingen.setdefault(school_id, []).append(afdeling_id)
+
+    index = NameIndex(name_entries(schools, afdelingen, school_names, school_afdelingen))
+    con.execute("""
+        CREATE OR REPLACE TABLE search_name (
+            entry_id INTEGER PRIMARY KEY,
+            kind VARCHAR NOT NULL,
+            ref_id INTEGER NOT NULL,
+            naam VARCHAR NOT NULL
+        )
+    """)
+    con.execute("CREATE OR REPLACE TABLE search_name_afdeling (entry_id INTEGER NOT NULL, afdeling_id INTEGER NOT NULL)")
+    con.execute("CREATE OR REPLACE TABLE search_trigram (trigram VARCHAR NOT NULL, entry_id INTEGER NOT NULL)")
+
+    rows = ColumnBuffers()
+    for entry_id in range(len(index)):
+        rows.append("search_name", entry_id=entry_id, kind=index.kinds[entry_id],
+                    ref_id=index.ref_ids[entry_id], naam=index.names[entry_id])
+        for afdeling_id in index.afdeling_ids[entry_id]:
+            rows.append("search_name_afdeling", entry_id=entry_id, afdeling_id=afdeling_id)
+    for gram, entry_ids in sorted(index.postings.items()):
+        for entry_id in entry_ids.tolist():
+            rows.append("search_trigram", trigram=gram, entry_id=entry_id)
+    rows.flush(con)
+    return len(index)
+
+
+def load_name_index(db) -> NameIndex:
+    """Load the index from scholen.duckdb attached as scholen_db, like the notebook."""
+    return NameIndex.load(db, "scholen_db.")
@@ -0,0 +1,533 @@
+"""
+Monte Carlo simulation of the lottery and matching.
+
+Estimates the chance of being placed at each afdeling of a ranked list
+(my_list). Every replication draws synthetic preference lists for all
+participants plus a lottery number per student, and runs student-proposing
+deferred acceptance with random tie-breaking, like the Amsterdam procedure.
+Voorrang and the hardheidsclausule are not modelled, and students left
+unplaced would go to the second round.
+
+The synthetic preference lists are calibrated on loting_matching.duckdb:
+
+- first choices follow voorkeuren.eerste_voorkeur exactly
+- later choices are drawn in proportion to tweede_voorkeur + derde_voorkeur
+- students whose first choice is a popular afdeling (more first choices
+  than capacity) pick another popular afdeling at position k with the share
+  from clustering_voorkeuren.json; popular afdelingen missing there use the
+  average of the table, everyone else the overall share of popular picks
+
+Placements per preference position are reported next to
+plaatsing_per_voorkeur, to check the calibration. Replications run in
+batches with their own seed from one SeedSequence, so a seed gives the same
+result for any number of worker processes. ListSimulation serves the Mijn
+Lijst tab: it simulates in the background and scores any list on the same
+replications.
+"""
+
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+from .loting import AfdelingResolver, create_name_mapping
+from .matching import deferred_acceptance
+
+# Positions on a preference list (the dashboard allows 12 entries)
+LIST_LENGTH = 12
+
+# Replications per batch handed to a worker process
+BATCH_SIZE = 250
+
+# Replications matched together in one deferred_acceptance() call
+MATCHINGS_PER_CALL = 20
+
+
+@dataclass
+class Market:
+    """Calibrated afdelingen of one matching, as parallel arrays."""
+
+    afdeling_ids: np.ndarray
+    names: list
+    capaciteit: np.ndarray
+    eerste_voorkeur: np.ndarray
+    # Weight of each afdeling at positions 2 and later
+    later_weights: np.ndarray
+    popular: np.ndarray
+    # Chance to pick a popular afdeling at positions 2.., per first choice
+    clustering: np.ndarray
+    # Observed placements per voorkeur_positie (4 = fourth or later)
+    observed: dict
+
+
+@dataclass
+class SimulationResult:
+    """Placement probabilities for one ranked list."""
+
+    my_list: list
+    # Chance to be placed at each entry of my_list
+    placed: np.ndarray
+    unplaced: float
+    replications: int
+    seed: int
+    # Share of all simulated students placed per position, unplaced last
+    position_shares: np.ndarray
+
+    def standard_error(self, probability: float) -> float:
+        """Return the Monte Carlo standard error of a probability."""
+        return float(np.sqrt(probability * (1 - probability) / self.replications))
+
+
+# =============================================================================
+# Calibration
+# =============================================================================
+
+MARKET_SQL = """
+    SELECT a.id, a.naam, c.definitieve_capaciteit,
+           COALESCE(v.eerste_voorkeur, 0), COALESCE(v.tweede_voorkeur, 0), COALESCE(v.derde_voorkeur, 0)
+    FROM loting_db.afdeling a
+    JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = $jaar
+    LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = $jaar
+    WHERE list_contains($niveaus, a.onderwijsniveau_id) AND c.definitieve_capaciteit > 0
+    ORDER BY a.id
+"""
+
+
+def load_clustering(base_dir: Path, resolver) -> dict:
+    """Load clustering_voorkeuren.json as {afdeling_id: [share at position 2, 3, ...]}."""
+    path = base_dir / "json" / "matching_en_plaatsing" / "clustering_voorkeuren.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        entries = json.load(f)
+
+    clustering = {}
+    for entry in entries:
+        school, _, niveau = entry["afdeling"].rpartition(" - ")
+        afd_id, _, _ = resolver.resolve(school, niveau)
+        if afd_id is None:
+            continue
+        shares = entry["clustering_pct"]
+        clustering[afd_id] = [shares[key] / 100 for key in sorted(shares, key=int)]
+    return clustering
+
+
+def load_market(db, base_dir: Path, jaar: int = 2025, niveaus=(1,),
+                list_length: int = LIST_LENGTH) -> Market:
+    """
+    Calibrate a market from loting_db and clustering_voorkeuren.json.
+
+    Expects loting_matching.duckdb attached as loting_db, like the notebook.
+    niveaus are the onderwijsniveau ids of the afdelingen that take part
+    (vwo by default). Afdelingen without capacity in jaar are left out.
+    """
+    rows = db.execute(MARKET_SQL, {"jaar": jaar, "niveaus": list(niveaus)}).fetchall()
+    if not rows:
+        raise ValueError(f"No afdelingen with capacity in {jaar} for onderwijsniveau {list(niveaus)}")
+
+    afdeling_ids = np.array([row[0] for row in rows], dtype=np.int32)
+    capaciteit = np.array([row[2] for row in rows], dtype=np.int32)
+    eerste = np.array([row[3] for row in rows], dtype=np.int32)
+    # One pseudo-count, so every afdeling can show up later on a list
+    later_weights = np.array([row[4] + row[5] + 1 for row in rows], dtype=np.float64)
+    popular = eerste > capaciteit
+
+    all_afdelingen = db.execute("""
+        SELECT a.id, a.naam, s.naam FROM loting_db.afdeling a
+        JOIN loting_db.loting_school s ON a.school_id = s.id
+    """).fetchall()
+    table = load_clustering(base_dir, AfdelingResolver(all_afdelingen, create_name_mapping()))
+
+    # Shares per position 2..list_length; the last known position repeats
+    def padded(shares):
+        shares = list(shares)[:list_length - 1]
+        return shares + shares[-1:] * (list_length - 1 - len(shares))
+
+    popular_share = later_weights[popular].sum() / later_weights.sum()
+    known = [padded(shares) for shares in table.values() if shares]
+    default_popular = np.mean(known, axis=0) if known else np.full(list_length - 1, popular_share)
+
+    clustering = np.full((len(rows), list_length - 1), popular_share)
+    for i, afd_id in enumerate(afdeling_ids):
+        if not popular[i]:
+            continue
+        shares = table.get(int(afd_id))
+        clustering[i] = padded(shares) if shares else default_popular
+
+    observed = dict(db.execute("""
+        SELECT voorkeur_positie, SUM(aantal)::INTEGER FROM loting_db.plaatsing_per_voorkeur
+        WHERE jaar = $jaar AND list_contains($ids, afdeling_id)
+        GROUP BY ALL ORDER BY ALL
+    """, {"jaar": jaar, "ids": afdeling_ids.tolist()}).fetchall())
+
+    return Market(
+        afdeling_ids=afdeling_ids,
+        names=[row[1] for row in rows],
+        capaciteit=capaciteit,
+        eerste_voorkeur=eerste,
+        later_weights=later_weights,
+        popular=popular,
+        clustering=clustering,
+        observed=observed,
+    )
+
+
+# =============================================================================
+# Simulation
+# =============================================================================
+
+def draw_preferences(market: Market, rng, list_length: int = LIST_LENGTH) -> np.ndarray:
+    """
+    Draw a preference list for every participant.
+
+    Returns a (students, list_length) array of afdeling indices into market,
+    padded with -1 when there are fewer afdelingen than positions.
+    """
+    n_afdelingen = len(market.afdeling_ids)
+    first = rng.permutation(np.repeat(np.arange(n_afdelingen), market.eerste_voorkeur))
+    n_students = len(first)
+    students = np.arange(n_students)
+
+    # Weighted random order of the popular and the other afdelingen per
+    # student: ascending exponential / weight keys (equivalent to Gumbel
+    # top-k, without the logarithm), with the first choice sorted last
+    keys = rng.standard_exponential((n_students, n_afdelingen), dtype=np.float32)
+    keys /= market.later_weights.astype(np.float32)
+    keys[students, first] = np.inf
+    groups = []
+    for members in (np.flatnonzero(market.popular), np.flatnonzero(~market.popular)):
+        order = members[keys[:, members].argsort(axis=1)[:, :list_length - 1]]
+        # Extra column so an exhausted group can still be indexed
+        groups.append(np.hstack([order, np.full((n_students, 1), -1)]))
+    popular_order, other_order = groups
+
+    first_popular = market.popular[first]
+    available_popular = market.popular.sum() - first_popular
+    available_other = (~market.popular).sum() - ~first_popular
+
+    prefs = np.full((n_students, list_length), -1, dtype=np.int16)
+    prefs[:, 0] = first
+    next_popular = np.zeros(n_students, dtype=np.int64)
+    next_other = np.zeros(n_students, dtype=np.int64)
+    wants_popular = rng.random((n_students, list_length - 1)) < market.clustering[first]
+    for k in range(1, list_length):
+        take_popular = (
+            wants_popular[:, k - 1] & (next_popular < available_popular)
+        ) | (next_other >= available_other)
+        prefs[:, k] = np.where(
+            take_popular,
+            popular_order[students, next_popular],
+            other_order[students, next_other],
+        )
+        next_popular += take_popular
+        next_other += ~take_popular
+    return prefs
+
+
+def draw_lottery(rng, n_students: int, n_afdelingen: int, tie_breaking: str = "single") -> np.ndarray:
+    """Draw lottery numbers: one per student, or one per student and afdeling."""
+    if tie_breaking == "single":
+        return rng.permutation(n_students).astype(np.int32)
+    if tie_breaking == "multiple":
+        return rng.random((n_students, n_afdelingen)).argsort(axis=0).argsort(axis=0).astype(np.int32)
+    raise ValueError(f"Unknown tie_breaking {tie_breaking!r}, expected 'single' or 'multiple'")
+
+
+def split_batches(replications: int, seed: int):
+    """Split replications in batches of BATCH_SIZE, each with its own child seed."""
+    sizes = [BATCH_SIZE] * (replications // BATCH_SIZE)
+    if replications % BATCH_SIZE:
+        sizes.append(replications % BATCH_SIZE)
+    return sizes, np.random.SeedSequence(seed).spawn(len(sizes))
+
+
+def simulate_batch(market: Market, my_list, replications: int, seed,
+                   list_length: int = LIST_LENGTH, tie_breaking: str = "single"):
+    """
+    Run replications with their own seed.
+
+    my_list holds afdeling indices into market; its owner joins the
+    matching as one extra student. Returns (counts per my_list entry plus
+    unplaced, counts per position for the other students plus unplaced).
+    """
+    rng = np.random.default_rng(seed)
+    my_row = np.full((1, list_length), -1, dtype=np.int16)
+    my_row[0, :len(my_list)] = my_list
+    n_afdelingen = len(market.afdeling_ids)
+
+    my_counts = np.zeros(len(my_list) + 1, dtype=np.int64)
+    position_counts = np.zeros(list_length + 1, dtype=np.int64)
+    for start in range(0, replications, MATCHINGS_PER_CALL):
+        n_matchings = min(MATCHINGS_PER_CALL, replications - start)
+        prefs = np.stack([
+            np.vstack([draw_preferences(market, rng, list_length), my_row]) for _ in range(n_matchings)
+        ])
+        lottery = np.stack([
+            draw_lottery(rng, prefs.shape[1], n_afdelingen, tie_breaking) for _ in range(n_matchings)
+        ])
+        placed = deferred_acceptance(prefs, market.capaciteit, lottery)
+
+        mine = placed[:, -1]
+        my_counts += np.bincount(np.where(mine >= 0, mine, len(my_list)), minlength=len(my_list) + 1)
+        others = placed[:, :-1]
+        position_counts += np.bincount(
+            np.where(others >= 0, others, list_length).ravel(), minlength=list_length + 1
+        )
+    return my_counts, position_counts
+
+
+def placement_probabilities(market: Market, my_list, replications: int = 20000, seed: int = 0,
+                            jobs: int = 1, list_length: int = LIST_LENGTH,
+                            tie_breaking: str = "single") -> SimulationResult:
+    """
+    Estimate the chance of being placed at each afdeling of my_list.
+
+    my_list holds afdeling ids in order of preference. Replications are
+    split in batches of BATCH_SIZE over up to jobs worker processes.
+    """
+    index = {int(afd_id): i for i, afd_id in enumerate(market.afdeling_ids)}
+    missing = [afd_id for afd_id in my_list if afd_id not in index]
+    if missing:
+        raise ValueError(f"Afdelingen not in the simulated matching: {missing}")
+    my_indices = [index[afd_id] for afd_id in my_list]
+    list_length = max(list_length, len(my_indices))
+
+    sizes, seeds = split_batches(replications, seed)
+    args = (repeat(market), repeat(my_indices), sizes, seeds, repeat(list_length), repeat(tie_breaking))
+
+    if jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sizes))) as pool:
+            results = list(pool.map(simulate_batch, *args))
+    else:
+        results = list(map(simulate_batch, *args))
+
+    my_counts = sum(result[0] for result in results)
+    position_counts = sum(result[1] for result in results)
+    return SimulationResult(
+        my_list=list(my_list),
+        placed=my_counts[:-1] / replications,
+        unplaced=float(my_counts[-1] / replications),
+        replications=replications,
+        seed=seed,
+        position_shares=position_counts / position_counts.sum(),
+    )
+
+
+# =============================================================================
+# List Simulation
+# =============================================================================
+#
+# With single tie-breaking and no voorrang, deferred acceptance places
+# everyone as if students picked in lottery order (serial dictatorship). The
+# list owner then gets the first entry that still has a seat when their turn
+# comes, and who picked before them does not depend on their list. So one
+# matching without the owner, summarized as a lottery cutoff per afdeling,
+# scores every list and every ordering of it: a replication is simulated
+# once and reused whenever entries are added, removed or moved.
+
+def lottery_cutoffs(prefs, placed, lottery, capaciteit) -> np.ndarray:
+    """
+    Return the lottery cutoff of every afdeling per matching of a batch.
+
+    The cutoff is the share of lottery draws that would still find a seat:
+    1.0 for an afdeling with seats left, otherwise the lottery rank of the
+    last student admitted, scaled to the (students + 1) possible ranks.
+    """
+    n_matchings, n_students = placed.shape
+    n_afdelingen = len(capaciteit)
+    matching, student = np.nonzero(placed >= 0)
+    afdelingen = prefs[matching, student, placed[matching, student]] + matching * n_afdelingen
+
+    last = np.full(n_matchings * n_afdelingen, -1, dtype=np.int64)
+    np.maximum.at(last, afdelingen, lottery[matching, student])
+    full = np.bincount(afdelingen, minlength=len(last)) >= np.tile(capaciteit, n_matchings)
+    return np.where(full, (last + 1) / (n_students + 1), 1.0).reshape(n_matchings, n_afdelingen)
+
+
+def simulate_cutoffs(market: Market, replications: int, seed, list_length: int = LIST_LENGTH) -> np.ndarray:
+    """Run replications without a list owner; returns their (replications, afdelingen) cutoffs."""
+    rng = np.random.default_rng(seed)
+    n_afdelingen = len(market.afdeling_ids)
+    cutoffs = np.empty((replications, n_afdelingen))
+    for start in range(0, replications, MATCHINGS_PER_CALL):
+        n_matchings = min(MATCHINGS_PER_CALL, replications - start)
+        prefs = np.stack([draw_preferences(market, rng, list_length) for _ in range(n_matchings)])
+        lottery = np.stack([draw_lottery(rng, prefs.shape[1], n_afdelingen) for _ in range(n_matchings)])
+        placed = deferred_acceptance(prefs, market.capaciteit, lottery)
+        cutoffs[start:start + n_matchings] = lottery_cutoffs(prefs, placed, lottery, market.capaciteit)
+    return cutoffs
+
+
+def list_probabilities(cutoffs: np.ndarray) -> np.ndarray:
+    """
+    Return the chance of each list entry per replication.
+
+    cutoffs holds the entries' columns in list order. Entry k is the first
+    with a seat left for lottery draws between the highest cutoff of the
+    entries before it and its own cutoff, so its chance is that difference.
+    """
+    before = np.maximum.accumulate(cutoffs, axis=1)
+    before = np.hstack([np.zeros((len(cutoffs), 1)), before[:, :-1]])
+    return np.maximum(cutoffs - before, 0)
+
+
+@dataclass
+class ListEstimate:
+    """Placement probabilities for one ordering of a list, so far."""
+
+    my_list: list
+    # Chance to be placed at each entry, and its standard error
+    placed: np.ndarray
+    placed_se: np.ndarray
+    # Chance to be placed at any entry, and its standard error
+    total: float
+    total_se: float
+    replications: int
+    target: int
+
+    @property
+    def complete(self) -> bool:
+        return self.replications >= self.target
+
+
+class ListSimulation:
+    """
+    Placement probabilities for Mijn Lijst, refined in the background.
+
+    A worker thread simulates batches of matchings (on jobs processes when
+    jobs > 1) until target replications are done. estimate() scores a list
+    on the batches finished so far; sums are cached per list ordering, so a
+    repeated or reordered list only adds the batches that came in since.
+    Entries outside the simulated matching never get a seat.
+    """
+
+    def __init__(self, market: Market, target: int = 5000, seed: int = 0, jobs: int = 1):
+        self.target = target
+        self.seed = seed
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.generation = 0
+        self.restart(market)
+
+    def restart(self, market: Market):
+        """Drop all results and start simulating market, e.g. after a rebuild."""
+        with self.lock:
+            self.generation += 1
+            self.market = market
+            self.index = {int(afd_id): i for i, afd_id in enumerate(market.afdeling_ids)}
+            self.batches = []
+            self.replications = 0
+            self.estimates = {}
+            generation = self.generation
+        self.executor.submit(self._run, market, generation)
+
+    def _run(self, market: Market, generation: int):
+        sizes, seeds = split_batches(self.target, self.seed)
+        pool = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            step = max(self.jobs, 1)
+            for start in range(0, len(sizes), step):
+                args = (repeat(market), sizes[start:start + step], seeds[start:start + step])
+                results = list(pool.map(simulate_cutoffs, *args) if pool else map(simulate_cutoffs, *args))
+                with self.lock:
+                    if generation != self.generation:
+                        return
+                    self.batches.extend(results)
+                    self.replications += sum(len(cutoffs) for cutoffs in results)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    def estimate(self, my_list) -> ListEstimate:
+        """Return the placement probabilities of my_list (afdeling ids, in order)."""
+        ordering = tuple(my_list)
+        columns = [self.index.get(afd_id, -1) for afd_id in ordering]
+        known = np.array([column >= 0 for column in columns])
+        empty = np.zeros(len(ordering) + 1)
+        with self.lock:
+            batches = list(self.batches)
+            generation = self.generation
+            counted, sums, squares = self.estimates.get(ordering, (0, empty, empty))
+
+        for cutoffs in batches[counted:]:
+            entry_cutoffs = np.where(known, cutoffs[:, np.maximum(columns, 0)], 0.0)
+            chances = list_probabilities(entry_cutoffs)
+            # Per replication: each entry, then the list as a whole
+            chances = np.hstack([chances, chances.sum(axis=1, keepdims=True)])
+            sums = sums + chances.sum(axis=0)
+            squares = squares + (chances ** 2).sum(axis=0)
+
+        replications = sum(len(cutoffs) for cutoffs in batches)
+        with self.lock:
+            if generation == self.generation:
+                self.estimates[ordering] = (len(batches), sums, squares)
+
+        if replications:
+            mean = sums / replications
+            se = np.sqrt(np.maximum(squares / replications - mean ** 2, 0) / replications)
+        else:
+            mean = se = np.full(len(ordering) + 1, np.nan)
+        return ListEstimate(
+            my_list=list(ordering),
+            placed=mean[:-1],
+            placed_se=se[:-1],
+            total=float(mean[-1]),
+            total_se=float(se[-1]),
+            replications=replications,
+            target=self.target,
+        )
+
+
+def simulate(base_dir: Path, my_list, replications: int = 20000, seed: int = 0, jobs: int = 1,
+             jaar: int = 2025, niveaus=(1,), tie_breaking: str = "single"):
+    """Simulate the matching for my_list and print the placement probabilities."""
+    db_path = base_dir / "loting_matching.duckdb"
+    if not db_path.exists():
+        print(f"Error: Database not found at {db_path}")
+        return False
+
+    db = duckdb.connect()
+    db.execute(f"ATTACH '{db_path}' AS loting_db (READ_ONLY)")
+    market = load_market(db, base_dir, jaar=jaar, niveaus=niveaus)
+    names = dict(zip(market.afdeling_ids.tolist(), market.names))
+    n_students = int(market.eerste_voorkeur.sum())
+
+    print(f"Simulating {replications} matchings of {n_students} students over "
+          f"{len(market.afdeling_ids)} afdelingen ({market.popular.sum()} popular), seed {seed}...")
+    try:
+        result = placement_probabilities(
+            market, my_list, replications=replications, seed=seed, jobs=jobs, tie_breaking=tie_breaking
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+
+    print()
+    print(f"{'#':>3}  {'Afdeling':<55} {'Kans':>7} {'± se':>6} {'Cumulatief':>11}")
+    print("-" * 86)
+    cumulative = 0.0
+    for position, (afd_id, probability) in enumerate(zip(result.my_list, result.placed), 1):
+        cumulative += probability
+        print(f"{position:>3}  {names[afd_id][:55]:<55} {probability:>6.1%} "
+              f"{result.standard_error(probability):>6.1%} {cumulative:>10.1%}")
+    print(f"{'':>3}  {'Niet geplaatst':<55} {result.unplaced:>6.1%}")
+
+    # Simulated against observed placements per position (4 = fourth or later)
+    observed_total = sum(market.observed.values())
+    shares = result.position_shares
+    simulated = [*shares[:3], shares[3:-1].sum()]
+    print()
+    print("Calibration, share of students placed per preference position:")
+    print(f"  {'Positie':<10} {'Simulatie':>10} {'Waargenomen':>12}")
+    for position, share in enumerate(simulated, 1):
+        label = f"{position}+" if position == 4 else str(position)
+        observed = f"{market.observed.get(position, 0) / observed_total:.1%}" if observed_total else "-"
+        print(f"  {label:<10} {share:>9.1%} {observed:>12}")
+    print(f"  {'geen':<10} {shares[-1]:>9.1%}")
+    return True
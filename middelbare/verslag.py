@@ -0,0 +1,678 @@
+"""
+Extract the tables of a Loting en Matching verslag (PDF) to JSON.
+
+Flow: Loting-en-Matching-<jaar>-Verslag.pdf -> json/matching_en_plaatsing/*.json
+
+Pages are only laid out when a table needs them: the table of contents
+(page 3) says where each table starts, and a table runs until the page
+before the next one. Pages are laid out on worker processes, as their text
+plus the positioned text items, and cached in pdf_cache/ by the PDF's file
+hash and page number, so re-running after a parser fix skips the slow text
+extraction. The parsers read pages as a stream, one layout at a time, so
+memory does not grow with the size of the report. Most tables are parsed
+from the text lines; Tabel 17 has blank cells and school names spanning
+several rows, so it is parsed from the item positions.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pypdf import PdfReader
+
+from .manifest import file_state, load_manifest, save_manifest
+
+CACHE_DIR = "pdf_cache"
+# Bump when layout_page() changes, so cached pages are laid out again
+LAYOUT_VERSION = 1
+TOC_PAGE = 3
+
+# A number as printed in the report: 9.887, -48, 85,0% or 500%
+NUMBER = r"-?\d[\d.]*(?:,\d+)?%?"
+NIVEAU_START = re.compile(r"^(v\.a\.|vwo|vmbo|havo)")
+
+
+# =============================================================================
+# Page Layout
+# =============================================================================
+
+def layout_page(page) -> dict:
+    """Return the text of a page and its text items as [x, y, size, text]."""
+    items = []
+
+    def visit(text, cm, tm, font, size):
+        if text.strip():
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            items.append([round(x, 1), round(y, 1), round(size * tm[0] * cm[0], 2), text])
+
+    text = page.extract_text(visitor_text=visit)
+    return {"text": text, "items": items}
+
+
+# Pages laid out per reader before it is opened again: pypdf keeps every
+# object it resolved, so a reader grows with the pages it has seen
+READER_PAGES = 32
+
+# Readers opened by pool workers, as {pdf_path: [reader, pages laid out]}
+_worker_readers = {}
+
+
+def _reader(readers: dict, pdf_path: Path) -> PdfReader:
+    """Return the reader of a PDF from readers, reopened every READER_PAGES pages."""
+    entry = readers.get(pdf_path)
+    if entry is None or entry[1] >= READER_PAGES:
+        entry = readers[pdf_path] = [PdfReader(pdf_path), 0]
+    entry[1] += 1
+    return entry[0]
+
+
+def cache_page_layout(pdf_path: Path, number: int, path: Path):
+    """
+    Lay out one page (1-based) of a PDF into the cache; runs in pool workers.
+
+    The layout is written to path rather than returned, so queued pages
+    do not pile up in the parent process.
+    """
+    write_json(path, layout_page(_reader(_worker_readers, pdf_path).pages[number - 1]), indent=None)
+
+
+def read_cached(path: Path):
+    """Return a cached JSON file, or None if missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return None
+
+
+class PageCache:
+    """
+    Page layouts of one PDF, cached on disk by file hash and page number.
+
+    Each PDF gets pdf_cache/<file hash>-v<LAYOUT_VERSION>/ with a JSON file
+    per page and the page count in document.json, so a run on cached pages
+    never opens the PDF. request() queues pages on the pool (if any);
+    pages() streams layouts one at a time, from the cache, a queued job, or
+    by laying the page out in this process.
+    """
+
+    def __init__(self, pdf_path: Path, cache_dir: Path, file_hash: str, pool=None):
+        self.pdf_path = pdf_path
+        self.directory = cache_dir / f"{file_hash}-v{LAYOUT_VERSION}"
+        self.pool = pool
+        self.readers = {}
+        self.pending = {}
+        self.cached = set()
+        self.laid_out = set()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        document = read_cached(self.directory / "document.json")
+        if document is None:
+            document = {"source": pdf_path.name, "pages": len(_reader(self.readers, pdf_path).pages)}
+            write_json(self.directory / "document.json", document)
+        self.page_count = document["pages"]
+
+    def __len__(self):
+        return self.page_count
+
+    def _path(self, number: int) -> Path:
+        return self.directory / f"{number:04d}.json"
+
+    def request(self, numbers):
+        """Start laying out pages that are neither cached nor queued."""
+        if self.pool is None:
+            return
+        for number in numbers:
+            if number not in self.pending and not self._path(number).exists():
+                self.pending[number] = self.pool.submit(cache_page_layout, self.pdf_path, number, self._path(number))
+
+    def get(self, number: int) -> dict:
+        """Return the layout of a page (1-based)."""
+        path = self._path(number)
+        future = self.pending.pop(number, None)
+        if future is not None:
+            future.result()
+        layout = read_cached(path)
+        if layout is not None:
+            (self.laid_out if future is not None else self.cached).add(number)
+            return layout
+
+        layout = layout_page(_reader(self.readers, self.pdf_path).pages[number - 1])
+        write_json(path, layout, indent=None)
+        self.laid_out.add(number)
+        return layout
+
+    def pages(self, numbers):
+        """Yield the layouts of pages one at a time, in the given order."""
+        for number in numbers:
+            yield self.get(number)
+
+
+# =============================================================================
+# Text Helpers
+# =============================================================================
+
+def parse_number(text: str):
+    """Parse a Dutch formatted number: 9.887 -> 9887, 85,0% -> 85.0."""
+    text = text.rstrip("%").replace(".", "")
+    if "," in text:
+        return float(text.replace(",", "."))
+    return int(text)
+
+
+def text_lines(text: str) -> list[str]:
+    """Return the non-empty lines of a page, whitespace collapsed."""
+    return [line for line in (" ".join(raw.split()) for raw in text.splitlines()) if line]
+
+
+def table_lines(layouts, number: int) -> list[str]:
+    """
+    Return the lines of a table from a stream of page layouts, from its
+    TABEL heading on its first page up to the next TABEL heading. Page
+    numbers are left out; pages after the table are not read.
+    """
+    lines = []
+    heading = re.compile(r"^TABEL (\d+)\b")
+    started = False
+    for layout in layouts:
+        for line in text_lines(layout["text"]):
+            match = heading.match(line)
+            if match:
+                if started and int(match.group(1)) != number:
+                    return lines
+                started = started or int(match.group(1)) == number
+                continue
+            if started and not re.fullmatch(r"\d+", line):
+                lines.append(line)
+    return lines
+
+
+def table_rows(lines, count: int):
+    """Yield (label, numbers) for the lines ending in exactly count numbers."""
+    pattern = re.compile(rf"^(.*?)\s*((?:{NUMBER}\s+){{{count - 1}}}{NUMBER})$")
+    for line in lines:
+        match = pattern.match(line)
+        if not match or not match.group(1) or re.search(rf"(^|\s){NUMBER}$", match.group(1)):
+            continue
+        yield match.group(1), [parse_number(value) for value in match.group(2).split()]
+
+
+def split_afdeling(afdeling: str):
+    """Split 'School - Variant - niveau' into ('School - Variant', 'niveau')."""
+    school, _, niveau = afdeling.rpartition(" - ")
+    return school, niveau
+
+
+def read_toc(layout) -> dict:
+    """Return {table number: first page} from the table of contents page."""
+    starts = {}
+    entry = re.compile(r"^Tabel (\d+)\b")
+    pending = None
+    for line in text_lines(layout["text"]):
+        match = entry.match(line)
+        if match:
+            pending = int(match.group(1))
+        page = re.search(r"\.{3,}\s*(\d+)$", line)
+        if pending is not None and page:
+            starts[pending] = int(page.group(1))
+            pending = None
+    return starts
+
+
+def table_pages(starts: dict, number: int, page_count: int) -> list[int]:
+    """Return the pages a table can be on: its first page up to the next table."""
+    first = starts[number]
+    later = [page for page in starts.values() if page > first]
+    last = min(later) - 1 if later else page_count
+    return list(range(first, max(first, last) + 1))
+
+
+def table_layouts(cache, starts: dict, number: int):
+    """Stream the layouts of the pages a table can be on."""
+    return cache.pages(table_pages(starts, number, len(cache)))
+
+
+# =============================================================================
+# Text Tables
+# =============================================================================
+
+def parse_voorlopige_capaciteit(lines, jaar: int):
+    """Tabel 2: preliminary capacity per afdeling, previous year and this year."""
+    rows = []
+    for afdeling, (vorig, huidig, verschil) in table_rows(lines, 3):
+        school, niveau = split_afdeling(afdeling)
+        rows.append({
+            "school": school, "niveau": niveau,
+            f"capaciteit_{jaar - 1}": vorig, f"capaciteit_{jaar}": huidig, "verschil": verschil,
+        })
+    return rows
+
+
+def parse_capaciteit_aanpassingen(lines, jaar: int):
+    """Tabel 3: capacity changes after the test round."""
+    rows = []
+    for afdeling, (voorlopig, definitief) in table_rows(lines, 2):
+        school, niveau = split_afdeling(afdeling)
+        rows.append({
+            "school": school, "niveau": niveau,
+            "voorlopige_capaciteit": voorlopig, "definitieve_capaciteit": definitief,
+        })
+    return rows
+
+
+def parse_eerste_voorkeur_vs_capaciteit(lines, jaar: int):
+    """Tabel 5: first preferences per school against its capacity."""
+    return [
+        {"school": school, "capaciteit": capaciteit, "eerste_voorkeur": eerste, "percentage": percentage}
+        for school, (capaciteit, eerste, percentage) in table_rows(lines, 3)
+    ]
+
+
+def parse_voorkeuren_type_stadsdeel(lines, jaar: int):
+    """Tabel 6: first preferences per school type and stadsdeel, two years."""
+    sections = {"type": {}, "stadsdeel": {}}
+    section = None
+    for line in lines:
+        if line.lower() in sections:
+            section = sections[line.lower()]
+            continue
+        if section is None:
+            continue
+        for label, (vorig, vorig_pct, huidig, huidig_pct) in table_rows([line], 4):
+            name = label.lower().replace("zuid-oost", "zuidoost").replace("-", "_")
+            section[name] = {
+                str(jaar - 1): vorig, f"{jaar - 1}_pct": vorig_pct,
+                str(jaar): huidig, f"{jaar}_pct": huidig_pct,
+            }
+    return sections
+
+
+def parse_eerste_voorkeuren_vergelijking(lines, jaar: int):
+    """Tabel 7: first preferences per afdeling, previous year and this year."""
+    return [
+        {"afdeling": afdeling, f"eerste_voorkeur_{jaar - 1}": vorig,
+         f"eerste_voorkeur_{jaar}": huidig, "verschil_percentage": verschil}
+        for afdeling, (vorig, huidig, verschil) in table_rows(lines, 3)
+    ]
+
+
+def parse_hardheidsclausule(lines, jaar: int):
+    """
+    Tabel 8: placements under the hardship clause per afdeling.
+
+    The table is printed in two columns; the left column comes first.
+    """
+    entry = re.compile(rf"(.+?) (\d+) ({NUMBER})(?:\s+|$)")
+    columns = {}
+    for line in lines:
+        if not line.endswith("%"):
+            continue
+        for column, match in enumerate(entry.finditer(line)):
+            columns.setdefault(column, []).append({
+                "afdeling": match.group(1).strip(),
+                "aantal": int(match.group(2)),
+                "percentage_capaciteit": parse_number(match.group(3)),
+            })
+    return [row for column in sorted(columns) for row in columns[column]]
+
+
+def parse_clustering_voorkeuren(lines, jaar: int):
+    """
+    Tabel 14: for popular afdelingen, the share of their first-preference
+    students with another popular afdeling at each later position.
+
+    Long afdeling names wrap onto the next line; a line without numbers
+    after a row is the start of the next afdeling's name.
+    """
+    headers = [line for line in lines if re.fullmatch(r"(\d+e ?)+", line)]
+    if not headers:
+        return []
+    header = max(headers, key=len)
+    positions = [position.rstrip("e") for position in header.split()]
+    pattern = re.compile(rf"^(.*?)\s*((?:{NUMBER}\s+){{{len(positions) + 1}}}{NUMBER})$")
+
+    rows = []
+    name = ""
+    for line in lines[lines.index(header) + 1:]:
+        match = pattern.match(line)
+        if not match:
+            name = f"{name} {line}".strip()
+            continue
+        capaciteit, eerste, *shares = [parse_number(value) for value in match.group(2).split()]
+        rows.append({
+            "afdeling": f"{name} {match.group(1)}".strip(),
+            "capaciteit": capaciteit,
+            "eerste_voorkeur": eerste,
+            "clustering_pct": dict(zip(positions, shares)),
+        })
+        name = ""
+    return rows
+
+
+def parse_jaar_samenvatting(cache, starts, jaar: int) -> dict:
+    """
+    Year totals: participants (Tabel 9), final capacity (text with Tabel 3)
+    and the share placed at their first and top-3 preference (Tabel 10).
+    """
+    summary = {}
+    for _, (deelnemers,) in table_rows(table_lines(table_layouts(cache, starts, 9), 9), 1):
+        summary["totaal_deelnemers"] = deelnemers
+        break
+
+    text = " ".join(text_lines(cache.get(starts[3])["text"]))
+    match = re.search(r"definitieve capaciteit aan brugklasplaatsen was uiteindelijk ([\d.]+\d)", text)
+    summary["totaal_capaciteit"] = parse_number(match.group(1)) if match else None
+
+    # Tabel 10 has one row, labelled with the year: top-3, 1e, 2e, ...
+    for line in table_lines(table_layouts(cache, starts, 10), 10):
+        values = line.split()
+        if values[0] == str(jaar) and len(values) >= 3:
+            summary["percentage_eerste_voorkeur"] = parse_number(values[2])
+            summary["percentage_top3"] = parse_number(values[1])
+    return {str(jaar): summary}
+
+
+# =============================================================================
+# Tabel 17 (positioned items)
+# =============================================================================
+
+# Width of a digit relative to the font size; numbers are right-aligned,
+# so cells are matched to header columns on their right edge
+DIGIT_WIDTH = 0.507
+VOORKEUR_KEYS = ["eerste", "tweede", "derde", "vierde_plus"]
+
+
+def _right_edge(item) -> float:
+    x, _, size, text = item
+    return x + DIGIT_WIDTH * size * len(text.strip())
+
+
+def _item_rows(items, tolerance: float = 1.0) -> list[list]:
+    """Group items into rows on y (top of the page first), each sorted on x."""
+    rows = []
+    for item in sorted(items, key=lambda item: (-item[1], item[0])):
+        if rows and abs(rows[-1][0][1] - item[1]) <= tolerance:
+            rows[-1].append(item)
+        else:
+            rows.append([item])
+    return [sorted(row, key=lambda item: item[0]) for row in rows]
+
+
+def _join_fragments(texts) -> str:
+    """Join the text items of one line: 'v.a. vmbo', '-', 'b' -> 'v.a. vmbo-b'."""
+    text = re.sub(r" -(?=\S)", " - ", "".join(texts))
+    return " ".join(text.split())
+
+
+def _header_columns(row):
+    """
+    Return the (group, key, right edge) columns of the Tabel 17 header row.
+
+    The row has four groups: capacity per year, preferences 1-3, placements
+    per year and placements per preference 1-4+. A missing '4+' is added
+    at the spacing of the other preference columns.
+    """
+    groups = []
+    previous_kind = None
+    for item in row:
+        kind = "jaar" if re.fullmatch(r"\d{4}", item[3].strip()) else "positie"
+        if kind != previous_kind:
+            groups.append([])
+            previous_kind = kind
+        groups[-1].append(_right_edge(item))
+    if len(groups) != 4:
+        return None
+
+    capaciteit, voorkeuren, geplaatst, naar_voorkeur = groups
+    if len(naar_voorkeur) == 3:
+        naar_voorkeur.append(naar_voorkeur[-1] + naar_voorkeur[-1] - naar_voorkeur[-2])
+    jaren = [item[3].strip() for item in row if re.fullmatch(r"\d{4}", item[3].strip())]
+    return (
+        [("capaciteit", jaar, edge) for jaar, edge in zip(jaren, capaciteit)]
+        + [("voorkeuren", key, edge) for key, edge in zip(VOORKEUR_KEYS, voorkeuren)]
+        + [("geplaatst", jaar, edge) for jaar, edge in zip(jaren[len(capaciteit):], geplaatst)]
+        + [("naar_voorkeur", key, edge) for key, edge in zip(VOORKEUR_KEYS, naar_voorkeur)]
+    )
+
+
+def _name_blocks(items, gap: float = 9.5):
+    """Group school name lines (8.4pt apart) into names with their vertical center."""
+    blocks = []
+    for row in _item_rows(items):
+        y = row[0][1]
+        line = _join_fragments(item[3] for item in row)
+        if blocks and blocks[-1][-1][0] - y <= gap:
+            blocks[-1].append((y, line))
+        else:
+            blocks.append([(y, line)])
+    return [
+        (" ".join(line for _, line in block), (block[0][0] + block[-1][0]) / 2)
+        for block in blocks
+    ]
+
+
+def _assign_rows(row_ys, names, carry_penalty: float = 2.0):
+    """
+    Assign rows (top first) to the school names they are centered on.
+
+    Each name covers a contiguous run of rows whose vertical center is
+    closest to the name's; rows before the first name continue the school
+    of the previous page. Returns a name index per row, -1 for carried rows.
+    """
+    n_rows, n_names = len(row_ys), len(names)
+    inf = float("inf")
+    # cost[k][i]: best cost of covering the first i rows with the first k names
+    cost = [[inf] * (n_rows + 1) for _ in range(n_names + 1)]
+    choice = [[0] * (n_rows + 1) for _ in range(n_names + 1)]
+    for i in range(n_rows + 1):
+        cost[0][i] = carry_penalty * i
+    for k in range(1, n_names + 1):
+        center = names[k - 1][1]
+        for i in range(1, n_rows + 1):
+            for start in range(i):
+                if cost[k - 1][start] == inf:
+                    continue
+                candidate = cost[k - 1][start] + abs((row_ys[start] + row_ys[i - 1]) / 2 - center)
+                if candidate < cost[k][i]:
+                    cost[k][i] = candidate
+                    choice[k][i] = start
+
+    owners = [-1] * n_rows
+    end = n_rows
+    for k in range(n_names, 0, -1):
+        start = choice[k][end]
+        owners[start:end] = [k - 1] * (end - start)
+        end = start
+    return owners
+
+
+def parse_schooldata_page(items, jaar: int, previous_school=None):
+    """Parse the rows of one Tabel 17 page; returns (entries, last school)."""
+    rows = _item_rows(items)
+    header_index = next(
+        (i for i, row in enumerate(rows) if sum(bool(re.fullmatch(r"\d{4}", item[3].strip())) for item in row) >= 10),
+        None,
+    )
+    if header_index is None:
+        return [], previous_school
+    columns = _header_columns(rows[header_index])
+    if columns is None:
+        return [], previous_school
+    header_y = rows[header_index][0][1]
+    body = [item for item in items if item[1] < header_y - 1]
+    first_column = min(edge for _, _, edge in columns) - 25
+
+    niveau_x = min((item[0] for item in body if NIVEAU_START.match(item[3].strip())), default=first_column)
+    numbers = [item for item in body if re.fullmatch(r"\d+", item[3].strip()) and item[0] > first_column]
+    names = _name_blocks([item for item in body if item[0] < niveau_x - 0.5])
+
+    # Every afdeling row has a niveau; number rows without one (the page
+    # number) are left out before the rows are matched to school names
+    niveau_items = sorted(
+        (item for item in body if niveau_x - 0.5 <= item[0] < first_column), key=lambda item: item[0]
+    )
+    data_rows = []
+    for row in _item_rows(numbers):
+        y = row[0][1]
+        niveau = _join_fragments(item[3] for item in niveau_items if abs(item[1] - y) <= 1.0)
+        if niveau:
+            data_rows.append((row, y, niveau))
+
+    entries = []
+    jaren = [key for group, key, _ in columns if group == "capaciteit"]
+    owners = _assign_rows([y for _, y, _ in data_rows], names)
+    for (row, y, niveau), owner in zip(data_rows, owners):
+        values = {}
+        for item in row:
+            edge = _right_edge(item)
+            group, key, column_edge = min(columns, key=lambda column: abs(column[2] - edge))
+            if abs(column_edge - edge) <= 6:
+                values.setdefault(group, {})[key] = int(item[3])
+
+        school = names[owner][0] if owner >= 0 else previous_school
+        entries.append({
+            "school": school,
+            "niveau": niveau,
+            "capaciteit": {key: values.get("capaciteit", {}).get(key) for key in jaren},
+            f"voorkeuren_{jaar}": {key: values.get("voorkeuren", {}).get(key) for key in VOORKEUR_KEYS[:3]},
+            "geplaatst": {key: values.get("geplaatst", {}).get(key) for key in jaren},
+            f"geplaatst_naar_voorkeur_{jaar}": {
+                key: values.get("naar_voorkeur", {}).get(key) for key in VOORKEUR_KEYS
+            },
+        })
+        previous_school = school
+    return entries, previous_school
+
+
+def parse_gedetailleerde_schooldata(layouts, jaar: int):
+    """Tabel 17 from a stream of page layouts: capacity, preferences and placements per afdeling."""
+    entries = []
+    school = None
+    for layout in layouts:
+        page_entries, school = parse_schooldata_page(layout["items"], jaar, school)
+        entries.extend(page_entries)
+    return entries
+
+
+# =============================================================================
+# Main Entry Point
+# =============================================================================
+
+# Tables parsed from their text lines: (tabel, output file, parser)
+TEXT_TABLES = [
+    (2, "voorlopige_capaciteit.json", parse_voorlopige_capaciteit),
+    (3, "capaciteit_aanpassingen.json", parse_capaciteit_aanpassingen),
+    (5, "eerste_voorkeur_vs_capaciteit.json", parse_eerste_voorkeur_vs_capaciteit),
+    (6, "voorkeuren_type_stadsdeel.json", parse_voorkeuren_type_stadsdeel),
+    (7, "eerste_voorkeuren_vergelijking.json", parse_eerste_voorkeuren_vergelijking),
+    (8, "hardheidsclausule.json", parse_hardheidsclausule),
+    (14, "clustering_voorkeuren.json", parse_clustering_voorkeuren),
+]
+SCHOOLDATA_TABLE = 17
+SUMMARY_TABLES = (3, 9, 10)
+
+
+def find_verslag(base_dir: Path):
+    """Return the most recent Loting-en-Matching-<jaar>-Verslag.pdf, or None."""
+    reports = sorted(base_dir.glob("Loting-en-Matching-*-Verslag.pdf"))
+    return reports[-1] if reports else None
+
+
+def write_json(path: Path, data, indent: int | None = 2):
+    """Write a JSON file atomically."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+def extract_pdf(base_dir: Path, pdf_path: Path | None = None, jobs: int = 1, output_dir: Path | None = None) -> bool:
+    """
+    Extract the tables of a verslag to the JSON files in output_dir.
+
+    Only the pages of the tables are laid out, on up to jobs worker
+    processes; pages cached from an earlier run are read from pdf_cache/.
+    The PDF's hash is kept in the build manifest, so it is only read again
+    when the file changed. Prints the time spent per table, including
+    waiting for its pages.
+    """
+    pdf_path = pdf_path or find_verslag(base_dir)
+    if pdf_path is None or not pdf_path.exists():
+        print(f"Error: no verslag PDF found ({pdf_path or base_dir / 'Loting-en-Matching-*-Verslag.pdf'})")
+        return False
+    output_dir = output_dir or base_dir / "json" / "matching_en_plaatsing"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    manifest = load_manifest(base_dir)
+    states = manifest.get("pdf", {})
+    state = file_state(pdf_path, states.get(pdf_path.name))
+    if states.get(pdf_path.name) != state:
+        manifest["pdf"] = {**states, pdf_path.name: state}
+        save_manifest(base_dir, manifest)
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        cache = PageCache(pdf_path, base_dir / CACHE_DIR, state["hash"], pool)
+        match = re.search(r"Loting en Matching (\d{4})", cache.get(1)["text"])
+        if not match:
+            print(f"Error: {pdf_path.name} does not look like a Loting en Matching verslag")
+            return False
+        jaar = int(match.group(1))
+        starts = read_toc(cache.get(TOC_PAGE))
+        print(f"Extracting tables from {pdf_path.name} ({jaar}, {len(cache)} pages)...")
+
+        tables = [number for number, _, _ in TEXT_TABLES] + [SCHOOLDATA_TABLE, *SUMMARY_TABLES]
+        missing = sorted(set(tables) - set(starts))
+        if missing:
+            print(f"  Tables missing from the table of contents: {', '.join(map(str, missing))}")
+        # Queue every page that will be needed, in reading order, before parsing any;
+        # the workers write to the cache, so only the page being parsed is in memory
+        cache.request(sorted({
+            page for number in set(tables) & set(starts) for page in table_pages(starts, number, len(cache))
+        }))
+
+        timings = {}
+        for number, filename, parse in TEXT_TABLES:
+            if number not in starts:
+                continue
+            table_start = time.perf_counter()
+            data = parse(table_lines(table_layouts(cache, starts, number), number), jaar)
+            write_json(output_dir / filename, data)
+            timings[f"Tabel {number} -> {filename}"] = (len(data), time.perf_counter() - table_start)
+
+        if SCHOOLDATA_TABLE in starts:
+            table_start = time.perf_counter()
+            entries = parse_gedetailleerde_schooldata(table_layouts(cache, starts, SCHOOLDATA_TABLE), jaar)
+            write_json(output_dir / "gedetailleerde_schooldata.json", entries)
+            write_json(
+                output_dir / "gedetailleerde_schooldata_vwo.json",
+                [entry for entry in entries if entry["niveau"] == "vwo"],
+            )
+            timings[f"Tabel {SCHOOLDATA_TABLE} -> gedetailleerde_schooldata.json"] = (
+                len(entries), time.perf_counter() - table_start
+            )
+
+        if all(number in starts for number in SUMMARY_TABLES):
+            table_start = time.perf_counter()
+            summary = parse_jaar_samenvatting(cache, starts, jaar)
+            write_json(output_dir / "jaar_samenvatting.json", summary)
+            timings["Tabel 3, 9, 10 -> jaar_samenvatting.json"] = (
+                len(summary[str(jaar)]), time.perf_counter() - table_start
+            )
+    finally:
+        if pool is not None:
+            # Pages queued for a table that ended early are not needed
+            pool.shutdown(cancel_futures=True)
+    wall_time = time.perf_counter() - start
+
+    print("\n--- Table Timing ---")
+    for table, (count, seconds) in timings.items():
+        print(f"  {table}: {count} rows in {seconds * 1000:.1f}ms")
+    print(f"Laid out {len(cache.laid_out)} pages ({len(cache.cached - cache.laid_out)} more from cache) "
+          f"with {jobs} job(s) "
+          f"in {wall_time:.2f}s")
+    return not missing
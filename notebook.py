@@ -10,76 +10,35 @@ def _():
     import altair as alt
     import polars as pl
     import duckdb
+    from middelbare.explorer import explorer_rows
+    from middelbare.search import load_name_index
     db = duckdb.connect()
-    return alt, db, mo, pl
+    return alt, db, explorer_rows, load_name_index, mo, pl
 
 
 @app.cell
 def _(db):
-    # Create a shared connection with both databases attached
-    _ = db.execute("ATTACH 'scholen.duckdb' AS scholen_db (READ_ONLY)")
-    _ = db.execute("ATTACH 'loting_matching.duckdb' AS loting_db (READ_ONLY)")
-    return
+    from middelbare.query_cache import QueryCache
+
+    # Attach both databases to the shared connection; query results are
+    # cached until `middelbare` swaps in a rebuilt database
+    query_cache = QueryCache(db, {
+        "scholen_db": "scholen.duckdb",
+        "loting_db": "loting_matching.duckdb",
+    })
+    return (query_cache,)
 
 
 @app.cell
 def _():
-    SCHOOL_MAPPING = {
-        "Ignatiusgymnasium": "Sint Ignatiusgymnasium",
-        "Alasca": "ALASCA",
-        "Damstede": "Damstede Lyceum",
-        "Geert Groote College": "Geert Groote College Amsterdam",
-        "HLZ (Hervormd Lyceum Zuid)": "HLZ",
-        "Hervormd Lyceum West": "Het Hervormd Lyceum West",
-        "Cartesius Amsterdam": "Het Cartesius Lyceum",
-        "Metis Montessori Lyceum": "Metis Montessori Lyceum . vwo . havo",
-        "Montessori Lyceum Amsterdam": "Montessori Lyceum Amsterdam - Hoofdlocatie",
-        "OSB": "OSB Amsterdam",
-        "Spinoza Lyceum": "Spinoza Lyceum Amsterdam",
-        "Xplore": "Xplore - Agora Amsterdam",
-        "Cornelius Haga Lyceum": "Cornelius Haga Lyceum, Islamitische Scholengemeenschap voor mavo havo en vwo",
-    }
-    SCHOOL_MAPPING_REVERSE = {v: k for k, v in SCHOOL_MAPPING.items()}
-
-    # Coordinates geocoded from school addresses in database
-    SCHOOL_COORDS = {
-        "Alasca": (52.3713958, 4.9690576),
-        "Barlaeus Gymnasium": (52.3622182, 4.8848119),
-        "Berlage Lyceum": (52.3489255, 4.8998884),
-        "Calandlyceum": (52.3538022, 4.8061461),
-        "Cartesius Amsterdam": (52.3778986, 4.8760676),
-        "Comenius Lyceum Amsterdam": (52.3614383, 4.8309923),
-        "Cornelius Haga Lyceum": (52.387923, 4.8287524),
-        "Cygnus Gymnasium": (52.3550112, 4.9126447),
-        "DENISE": (52.3660597, 4.8371097),
-        "Damstede": (52.3953717, 4.9268668),
-        "Fons Vitae Lyceum": (52.3517112, 4.8784287),
-        "Geert Groote College": (52.3417594, 4.8628283),
-        "Gerrit van der Veen College": (52.3487738, 4.8746171),
-        "HLZ (Hervormd Lyceum Zuid)": (52.3481913, 4.878747),
-        "Hervormd Lyceum West": (52.3624113, 4.8256131),
-        "Het 4e Gymnasium": (52.3941814, 4.8730885),
-        "Het Amsterdams Lyceum": (52.3512131, 4.865166),
-        "Hyperion Lyceum": (52.3856461, 4.9058383),
-        "Ignatiusgymnasium": (52.3495634, 4.8740741),
-        "Ir. Lely Lyceum": (52.29734, 4.9786707),
-        "Kairos Tienercollege": (52.3906179, 4.9251195),
-        "Lumion": (52.3465856, 4.8354225),
-        "Marcanti College": (52.3752236, 4.8661317),
-        "Metis Montessori Lyceum": (52.3617798, 4.918157),
-        "Metropolis Lyceum": (52.3891583, 4.9255208),
-        "Montessori Lyceum Amsterdam": (52.3550038, 4.885466),
-        "Montessori Lyceum Pax": (52.3725796, 4.9381457),
-        "Montessori Lyceum Terra Nova": (52.3512957, 5.0043355),
-        "OSB": (52.3182996, 4.9651766),
-        "Pieter Nieuwland College": (52.3497219, 4.9236415),
-        "Spinoza Lyceum": (52.3426421, 4.8659125),
-        "St. Nicolaaslyceum": (52.3415072, 4.8781148),
-        "Vinse School": (52.3813999, 4.8894626),
-        "Vossius Gymnasium": (52.3456859, 4.883913),
-        "Xplore": (52.3991324, 4.9261752),
-    }
-    return SCHOOL_COORDS, SCHOOL_MAPPING
+    from pathlib import Path as _Path
+    from middelbare.distance import SchoolLocations, cycling_minutes, load_postcodes, parse_origin
+
+    # Coordinates geocoded from school addresses, keyed by loting school name;
+    # postcode centroids are optional, without them only "lat, lon" works
+    school_locations = SchoolLocations.from_json(_Path("json/school_coordinates.json"))
+    postcodes = load_postcodes(_Path("postcodes.csv"))
+    return cycling_minutes, parse_origin, postcodes, school_locations
 
 
 @app.cell
@@ -119,13 +78,13 @@ def _(mo):
     def _save_my_list(my_list):
         _my_list_file.write_text(json.dumps(my_list))
 
-    _initial_hidden = _load_hidden()
-    _initial_my_list = _load_my_list()
+    initial_hidden = _load_hidden()
+    initial_my_list = _load_my_list()
 
-    my_list_state, _set_my_list_raw = mo.state(_initial_my_list)
+    my_list_state, _set_my_list_raw = mo.state(initial_my_list)
     selected_school_state, set_selected_school = mo.state(None)  # (afdeling_id, school_name)
     active_tab_state, set_active_tab = mo.state("Scholen Verkenner")
-    hidden_schools_state, _set_hidden_schools_raw = mo.state(_initial_hidden)
+    hidden_schools_state, _set_hidden_schools_raw = mo.state(initial_hidden)
     show_hidden_state, set_show_hidden = mo.state(False)
 
     # Wrapper to also persist when setting hidden schools
@@ -139,19 +98,19 @@ def _(mo):
         _set_my_list_raw(new_list)
 
     return (
-        active_tab_state, hidden_schools_state, my_list_state, selected_school_state,
+        active_tab_state, hidden_schools_state, initial_hidden, initial_my_list, my_list_state, selected_school_state,
         set_active_tab, set_hidden_schools, set_my_list, set_selected_school, set_show_hidden, show_hidden_state
     )
 
 
 @app.cell
-def _(db, mo, pl):
+def _(mo, pl, query_cache):
     # Fetch current year stats for loting tab
-    _latest_stats = pl.from_arrow(db.execute("""
+    _latest_stats = pl.from_arrow(query_cache.arrow("""
         SELECT totaal_deelnemers, totaal_capaciteit, percentage_eerste_voorkeur, percentage_top3
         FROM loting_db.jaar_samenvatting
         WHERE jaar = 2025
-    """).fetch_arrow_table())
+    """))
 
     _latest = _latest_stats.to_dicts()[0] if not _latest_stats.is_empty() else {}
 
@@ -185,11 +144,11 @@ def _(db, mo, pl):
 
 
 @app.cell
-def _(db, mo, pl):
+def _(mo, pl, query_cache):
     # Fetch stadsdelen for dropdown (no display needed)
-    _stadsdeel_data = pl.from_arrow(db.execute(
+    _stadsdeel_data = pl.from_arrow(query_cache.arrow(
         "SELECT id, naam FROM loting_db.stadsdeel ORDER BY naam"
-    ).fetch_arrow_table())
+    ))
     _stadsdeel_options = {"Alle stadsdelen": None}
     for _row in _stadsdeel_data.to_dicts():
         _stadsdeel_options[_row['naam']] = _row['id']
@@ -212,18 +171,40 @@ def _(db, mo, pl):
         start=0, stop=3, step=0.1, value=[0, 3],
         label="Populariteitsratio"
     )
-    return ratio_filter, school_name_filter, stadsdeel_filter, type_filter
+    origin_filter = mo.ui.text(
+        placeholder="Postcode of lat, lon",
+        label="Vanaf",
+    )
+    radius_filter = mo.ui.slider(
+        start=0, stop=15, step=0.5, value=0,
+        label="Max. afstand (km, 0 = geen)"
+    )
+    return (
+        origin_filter,
+        radius_filter,
+        ratio_filter,
+        school_name_filter,
+        stadsdeel_filter,
+        type_filter,
+    )
 
 
 @app.cell
 def _(
-    SCHOOL_MAPPING,
-    db,
+    cycling_minutes,
+    explorer_rows,
     hidden_schools_state,
+    load_name_index,
     mo,
     my_list_state,
+    origin_filter,
+    parse_origin,
     pl,
+    postcodes,
+    query_cache,
+    radius_filter,
     ratio_filter,
+    school_locations,
     school_name_filter,
     set_active_tab,
     set_selected_school,
@@ -231,89 +212,50 @@ def _(
     stadsdeel_filter,
     type_filter,
 ):
-    _stadsdeel_clause = f"AND ls.stadsdeel_id = {stadsdeel_filter.value}" if stadsdeel_filter.value else ""
-    _type_clause = f"AND ls.type = '{type_filter.value}'" if type_filter.value else ""
+    _hidden = hidden_schools_state()
+    _show_hidden = show_hidden_state()
+    _origin = parse_origin(origin_filter.value, postcodes)
+
+    # Fetch filtered schools (no display - we show via explorer_table);
+    # all filters are applied in the query, the name search fuzzily
+    # through the trigram index built with scholen.duckdb
+    _filtered = query_cache.call(
+        explorer_rows,
+        stadsdeel_id=stadsdeel_filter.value,
+        school_type=type_filter.value,
+        ratio_range=ratio_filter.value,
+        name_search=school_name_filter.value,
+        hidden=_hidden,
+        show_hidden=_show_hidden,
+        name_index=query_cache.call(load_name_index),
+        locations=school_locations,
+        origin=_origin,
+        max_distance=radius_filter.value * 1000 if _origin and radius_filter.value else None,
+    )
 
-    # Fetch filtered schools (no display - we show via explorer_table)
-    _filtered = pl.from_arrow(db.execute(f"""
-        SELECT
-            a.id as afdeling_id, ls.naam as school, a.naam as afdeling, a.variant,
-            ls.type, sd.naam as stadsdeel, c.definitieve_capaciteit as capaciteit,
-            v.eerste_voorkeur,
-            ROUND(CAST(v.eerste_voorkeur AS FLOAT) / NULLIF(c.definitieve_capaciteit, 0), 2) as ratio
-        FROM loting_db.afdeling a
-        JOIN loting_db.loting_school ls ON a.school_id = ls.id
-        JOIN loting_db.stadsdeel sd ON ls.stadsdeel_id = sd.id
-        LEFT JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = 2025
-        LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = 2025
-        WHERE a.onderwijsniveau_id = 1 {_stadsdeel_clause} {_type_clause}
-        ORDER BY ratio DESC NULLS LAST
-    """).fetch_arrow_table())
-
-    # Fetch quality data for all schools (most recent year)
-    _quality = pl.from_arrow(db.execute("""
-        SELECT
-            s.name,
-            s.aantal_leerlingen,
-            e.eindcijfer,
-            e.centraal_examen as ce,
-            e.centraal_examen_vergelijking as ce_land,
-            sp.percentage as slaag_pct,
-            sp.vergelijking as slaag_land,
-            MAX(CASE WHEN t.metric = 'leerlingen' THEN t.cijfer END) as tevr_leerlingen,
-            MAX(CASE WHEN t.metric = 'ouders' THEN t.cijfer END) as tevr_ouders,
-            MAX(CASE WHEN t.metric = 'sfeer' THEN t.cijfer END) as tevr_sfeer,
-            MAX(CASE WHEN t.metric = 'veiligheid' THEN t.cijfer END) as tevr_veiligheid
-        FROM scholen_db.schools s
-        LEFT JOIN (
-            SELECT school_id, eindcijfer, centraal_examen, centraal_examen_vergelijking,
-                   ROW_NUMBER() OVER (PARTITION BY school_id ORDER BY schooljaar DESC) as rn
-            FROM scholen_db.examencijfers
-        ) e ON s.id = e.school_id AND e.rn = 1
-        LEFT JOIN (
-            SELECT school_id, percentage, vergelijking,
-                   ROW_NUMBER() OVER (PARTITION BY school_id ORDER BY schooljaar DESC) as rn
-            FROM scholen_db.slagingspercentage
-        ) sp ON s.id = sp.school_id AND sp.rn = 1
-        LEFT JOIN (
-            SELECT school_id, metric, cijfer,
-                   ROW_NUMBER() OVER (PARTITION BY school_id, metric ORDER BY schooljaar DESC) as rn
-            FROM scholen_db.tevredenheid_trend
-        ) t ON s.id = t.school_id AND t.rn = 1
-        GROUP BY s.name, s.aantal_leerlingen, e.eindcijfer, e.centraal_examen, e.centraal_examen_vergelijking, sp.percentage, sp.vergelijking
-    """).fetch_arrow_table())
+    # Quality data per afdeling (most recent year), precomputed at build time
+    # and linked to the loting afdelingen by the identity tables
+    _quality = pl.from_arrow(query_cache.arrow("""
+        SELECT ai.afdeling_id, s.aantal_leerlingen, s.eindcijfer, s.ce, s.ce_land, s.slaag_pct,
+               s.slaag_land, s.tevr_leerlingen, s.tevr_ouders, s.tevr_sfeer, s.tevr_veiligheid
+        FROM scholen_db.afdeling_identity ai
+        JOIN scholen_db.school_identity i ON i.school_key = ai.school_key
+        JOIN scholen_db.school_snapshot s ON s.school_id = i.school_id
+    """))
 
     # Create lookup dict for quality data
-    _quality_lookup = {row['name']: row for row in _quality.to_dicts()}
+    _quality_lookup = {row['afdeling_id']: row for row in _quality.to_dicts()}
 
-    _min_ratio, _max_ratio = ratio_filter.value
-    _hidden = hidden_schools_state()
-    _show_hidden = show_hidden_state()
-    _name_search = (school_name_filter.value or "").strip().lower()
+    _my_list_ids = {item['afdeling_id'] for item in my_list_state()}
 
     schools_list = []
     school_buttons = {}  # Map school name to button for clicking
 
-    for _row in _filtered.to_dicts():
+    for _row in _filtered:
         _afdeling_id = _row['afdeling_id']
-        _is_hidden = _afdeling_id in _hidden
-
-        # Skip hidden schools unless show_hidden is enabled
-        if _is_hidden and not _show_hidden:
-            continue
-
+        _is_hidden = _row['is_hidden']
         _ratio = _row.get('ratio') or 0
-        if _ratio < _min_ratio or _ratio > _max_ratio:
-            continue
-
-        # Filter by school name (approximate matching - case-insensitive substring)
-        if _name_search:
-            _school_name_lower = _row['school'].lower()
-            _variant_lower = (_row.get('variant') or "").lower()
-            # Match against school name or variant
-            if _name_search not in _school_name_lower and _name_search not in _variant_lower:
-                continue
-        _in_list = any(item['afdeling_id'] == _afdeling_id for item in my_list_state())
+        _in_list = _afdeling_id in _my_list_ids
         if _ratio > 1.0:
             _ratio_display = f"🔴 {_ratio:.2f}"
         elif _ratio >= 0.7:
@@ -321,10 +263,8 @@ def _(
         else:
             _ratio_display = f"🟢 {_ratio:.2f}"
 
-        # Get quality data using school name mapping
         _school_name = _row['school']
-        _quality_name = SCHOOL_MAPPING.get(_school_name, _school_name)
-        _q = _quality_lookup.get(_quality_name, {})
+        _q = _quality_lookup.get(_afdeling_id, {})
 
         # Format CE with landelijk baseline in parentheses
         _ce = _q.get('ce')
@@ -368,6 +308,8 @@ def _(
             "Sfeer": f"{_q.get('tevr_sfeer'):.1f}" if _q.get('tevr_sfeer') else "-",
             "Veilig": f"{_q.get('tevr_veiligheid'):.1f}" if _q.get('tevr_veiligheid') else "-",
             "In Lijst": "✓" if _in_list else "",
+            "Afstand (km)": round(_row['afstand'] / 1000, 1) if _row['afstand'] is not None else None,
+            "Fiets (min)": round(float(cycling_minutes(_row['afstand']))) if _row['afstand'] is not None else None,
             "_afdeling_id": _afdeling_id,
             "_ratio": _ratio,
             "_stadsdeel": _row['stadsdeel'],
@@ -378,6 +320,9 @@ def _(
 
     # For the table display, filter out internal columns (starting with _)
     _visible_columns = ["School", "Leerlingen", "Capaciteit", "1e Voorkeur", "Ratio", "Eindcijfer", "CE", "Slaag%", "Tevr.Leerl.", "Tevr.Ouders", "Sfeer", "Veilig", "In Lijst"]
+    # Distance columns only once an origin is given; sortable as numbers
+    if _origin:
+        _visible_columns[1:1] = ["Afstand (km)", "Fiets (min)"]
     _display_list = [{k: v for k, v in row.items() if k in _visible_columns} for row in schools_list]
 
     explorer_table = mo.ui.table(
@@ -393,23 +338,37 @@ def _(
 
 
 @app.cell
-def _(SCHOOL_COORDS, mo, my_list_state, schools_list):
-    import folium
-    _map = folium.Map(location=[52.36, 4.89], zoom_start=12)
-    _my_schools = {item['school'] for item in my_list_state()}
-    for _school in schools_list:
-        _name = _school['_school_name']
-        _coords = SCHOOL_COORDS.get(_name)
-        if not _coords:
-            continue
-        _ratio = _school['_ratio']
-        _in_list = _name in _my_schools
-        _color = 'red' if _ratio > 1.0 else ('orange' if _ratio >= 0.7 else 'green')
-        _icon = folium.Icon(color=_color, icon='star' if _in_list else 'info-sign')
-        _popup = f"<b>{_name}</b><br>Ratio: {_ratio:.2f}<br>{'⭐ In je lijst' if _in_list else ''}"
-        folium.Marker(location=_coords, popup=folium.Popup(_popup, max_width=200), icon=_icon, tooltip=_name).add_to(_map)
-    explorer_map = mo.Html(_map._repr_html_())
-    return (explorer_map,)
+def _(explorer_rows, initial_hidden, initial_my_list, query_cache, school_locations):
+    from middelbare.kaart import SchoolMap, map_state
+
+    # The map is rendered once per session, showing the explorer as it
+    # opens: no filters, the saved hidden schools and list. Later changes
+    # only send it the markers to show, their colours and the home marker
+    _rows = [
+        {
+            "_school_name": _row['school'],
+            "_afdeling_id": _row['afdeling_id'],
+            "_ratio": _row.get('ratio') or 0,
+            "_variant": _row.get('variant') or "Regulier",
+        }
+        for _row in query_cache.call(explorer_rows, hidden=initial_hidden)
+    ]
+    school_map = SchoolMap(
+        school_locations,
+        map_state(_rows, school_locations, {item['afdeling_id'] for item in initial_my_list}),
+    )
+    return map_state, school_map
+
+
+@app.cell
+def _(map_state, mo, my_list_state, origin_filter, parse_origin, postcodes, school_locations, school_map, schools_list):
+    _state = map_state(
+        schools_list, school_locations,
+        {item['afdeling_id'] for item in my_list_state()},
+        origin=parse_origin(origin_filter.value, postcodes),
+    )
+    explorer_map_state = mo.iframe(school_map.state_html(_state), height="0px")
+    return (explorer_map_state,)
 
 
 @app.cell
@@ -494,11 +453,13 @@ def _(explorer_table, hidden_schools_state, mo, my_list_state, schools_list, set
 @app.cell
 def _(
     add_button,
-    explorer_map,
+    explorer_map_state,
     explorer_table,
     hidden_count,
     list_status,
     mo,
+    origin_filter,
+    radius_filter,
     ratio_filter,
     school_name_filter,
     set_show_hidden,
@@ -519,44 +480,48 @@ def _(
 
 Verken alle VWO-scholen op populariteit en kwaliteit. 🔴 = populair (ratio > 1), 🟡 = gemiddeld, 🟢 = minder populair.
 
-**Kwaliteitskolommen:** CE en Slaag% tonen landelijk gemiddelde tussen haakjes. Tevredenheid: Leerl./Ouders/Sfeer/Veilig (schaal 1-10)."""),
+**Kwaliteitskolommen:** CE en Slaag% tonen landelijk gemiddelde tussen haakjes. Tevredenheid: Leerl./Ouders/Sfeer/Veilig (schaal 1-10).
+
+**Afstand:** vul een postcode of "lat, lon" in voor de hemelsbrede afstand en een geschatte fietstijd per school."""),
         mo.hstack([school_name_filter, stadsdeel_filter, type_filter, ratio_filter], gap=2),
+        mo.hstack([origin_filter, radius_filter], gap=2),
         mo.hstack([add_button, visibility_button, show_hidden_checkbox, list_status], gap=2),
         explorer_table,
-        explorer_map,
+        explorer_map_state,
     ])
     return (explorer_content,)
 
 
 @app.cell
-def _(db, pl):
+def _(pl, query_cache):
     # Cache quality data - this only runs once at startup, not on every list change
-    _quality = pl.from_arrow(db.execute("""
-        SELECT
-            s.name,
-            s.aantal_leerlingen,
-            e.centraal_examen as ce,
-            MAX(CASE WHEN t.metric = 'leerlingen' THEN t.cijfer END) as tevr_leerlingen,
-            MAX(CASE WHEN t.metric = 'ouders' THEN t.cijfer END) as tevr_ouders
-        FROM scholen_db.schools s
-        LEFT JOIN (
-            SELECT school_id, centraal_examen,
-                   ROW_NUMBER() OVER (PARTITION BY school_id ORDER BY schooljaar DESC) as rn
-            FROM scholen_db.examencijfers
-        ) e ON s.id = e.school_id AND e.rn = 1
-        LEFT JOIN (
-            SELECT school_id, metric, cijfer,
-                   ROW_NUMBER() OVER (PARTITION BY school_id, metric ORDER BY schooljaar DESC) as rn
-            FROM scholen_db.tevredenheid_trend
-        ) t ON s.id = t.school_id AND t.rn = 1
-        GROUP BY s.name, s.aantal_leerlingen, e.centraal_examen
-    """).fetch_arrow_table())
-    list_quality_lookup = {row['name']: row for row in _quality.to_dicts()}
+    _quality = pl.from_arrow(query_cache.arrow("""
+        SELECT ai.afdeling_id, s.name, s.aantal_leerlingen, s.ce, s.tevr_leerlingen, s.tevr_ouders
+        FROM scholen_db.afdeling_identity ai
+        JOIN scholen_db.school_identity i ON i.school_key = ai.school_key
+        JOIN scholen_db.school_snapshot s ON s.school_id = i.school_id
+    """))
+    list_quality_lookup = {row['afdeling_id']: row for row in _quality.to_dicts()}
     return (list_quality_lookup,)
 
 
 @app.cell
-def _(SCHOOL_MAPPING, list_quality_lookup, mo, my_list_state):
+def _(db, mo, query_cache):
+    from pathlib import Path as _Path
+    from middelbare.simulatie import ListSimulation, load_market
+
+    # Matchings for the placement probabilities are simulated once in the
+    # background; every list and ordering is scored on the same replications
+    list_simulation = ListSimulation(load_market(db, _Path(".")))
+    query_cache.on_invalidate.append(lambda: list_simulation.restart(load_market(db, _Path("."))))
+
+    # Re-scores the list while more replications come in
+    simulation_refresh = mo.ui.refresh(default_interval="2s")
+    return list_simulation, simulation_refresh
+
+
+@app.cell
+def _(list_quality_lookup, mo, my_list_state):
     # This cell creates the table display - depends on my_list_state but NOT on database
     _current_list = my_list_state()
 
@@ -574,8 +539,7 @@ def _(SCHOOL_MAPPING, list_quality_lookup, mo, my_list_state):
 
             # Get quality data from cached lookup
             _school_name = _item['school']
-            _quality_name = SCHOOL_MAPPING.get(_school_name, _school_name)
-            _q = list_quality_lookup.get(_quality_name, {})
+            _q = list_quality_lookup.get(_item['afdeling_id'], {})
 
             list_table_data.append({
                 "#": _idx + 1,
@@ -613,6 +577,55 @@ def _(SCHOOL_MAPPING, list_quality_lookup, mo, my_list_state):
     return list_analysis, list_table, list_table_data
 
 
+@app.cell
+def _(list_simulation, mo, my_list_state, simulation_refresh):
+    # Placement probability per entry, updated as the simulation progresses
+    _ = simulation_refresh.value
+    _current_list = my_list_state()
+
+    if not _current_list:
+        list_probabilities = mo.md("")
+    else:
+        _estimate = list_simulation.estimate([item['afdeling_id'] for item in _current_list])
+        if not _estimate.replications:
+            list_probabilities = mo.vstack([
+                mo.md("### Plaatsingskans\n\n*Simulatie van de loting wordt gestart...*"),
+                simulation_refresh,
+            ])
+        else:
+            _rows = [
+                {
+                    "#": _idx + 1,
+                    "School": _item['school'],
+                    "Variant": _item.get('variant', 'Regulier'),
+                    "Kans": f"{_p:.1%}",
+                    "± se": f"{_se:.1%}",
+                }
+                for _idx, (_item, _p, _se) in enumerate(zip(_current_list, _estimate.placed, _estimate.placed_se))
+            ]
+            _status = (
+                f"{_estimate.replications} gesimuleerde lotingen"
+                if _estimate.complete
+                else f"{_estimate.replications} van {_estimate.target} gesimuleerde lotingen..."
+            )
+            list_probabilities = mo.vstack([
+                mo.md("### Plaatsingskans"),
+                mo.hstack([
+                    mo.stat(
+                        value=f"{_estimate.total:.1%}",
+                        label="Geplaatst op je lijst",
+                        caption=f"± {_estimate.total_se:.1%}",
+                        bordered=True,
+                    ),
+                    mo.md(f"*{_status}. Zonder voorrang en hardheidsclausule; "
+                          "niet geplaatst betekent door naar de tweede ronde.*"),
+                ], justify="start", gap=2),
+                mo.ui.table(_rows, selection=None, page_size=12, show_column_summaries=False),
+                mo.md("") if _estimate.complete else simulation_refresh,
+            ])
+    return (list_probabilities,)
+
+
 @app.cell
 def _(list_table, mo, my_list_state, set_my_list):
     # Create action buttons - these just trigger state changes
@@ -684,7 +697,7 @@ def _(list_btn_down, list_btn_remove, list_btn_up, list_table, list_table_data,
 
 
 @app.cell
-def _(list_action_buttons, list_analysis, list_table, mo, my_list_state):
+def _(list_action_buttons, list_analysis, list_probabilities, list_table, mo, my_list_state):
     if not my_list_state():
         _list_display = mo.callout("Je lijst is nog leeg. Ga naar 'Scholen Verkenner' om scholen toe te voegen.", kind="info")
     else:
@@ -697,20 +710,21 @@ def _(list_action_buttons, list_analysis, list_table, mo, my_list_state):
         mo.md("## Mijn Voorkeurslijst\n\nBouw je lijst van maximaal 12 scholen. Selecteer een school en gebruik de knoppen om te verplaatsen of verwijderen."),
         _list_display,
         list_analysis,
+        list_probabilities,
     ])
     return (list_content,)
 
 
 @app.cell
-def _(db, mo, pl, selected_school_state, set_selected_school):
+def _(mo, pl, query_cache, selected_school_state, set_selected_school):
     # Fetch all schools for dropdown
-    _all_schools = pl.from_arrow(db.execute("""
+    _all_schools = pl.from_arrow(query_cache.arrow("""
         SELECT a.id, ls.naam || ' - ' || COALESCE(a.variant, 'VWO') as display_name, ls.naam as school
         FROM loting_db.loting_school ls
         JOIN loting_db.afdeling a ON ls.id = a.school_id
         WHERE a.onderwijsniveau_id = 1
         ORDER BY ls.naam, a.variant
-    """).fetch_arrow_table())
+    """))
     _options = {_row['display_name']: (_row['id'], _row['school']) for _row in _all_schools.to_dicts()}
     _options_list = list(_options.keys())
 
@@ -740,7 +754,18 @@ def _(db, mo, pl, selected_school_state, set_selected_school):
 
 
 @app.cell
-def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, selected_school_state, set_active_tab):
+def _(db, query_cache):
+    from middelbare.details import SchoolDetailCache
+
+    # Recently viewed school details; neighbours are prefetched in the background
+    # and everything is forgotten when the databases are rebuilt
+    detail_cache = SchoolDetailCache(db)
+    query_cache.on_invalidate.append(detail_cache.clear)
+    return (detail_cache,)
+
+
+@app.cell
+def _(detail_cache, detail_school_options, list_quality_lookup, mo, school_dropdown, selected_school_state, set_active_tab):
     # Back button to return to explorer
     back_button = mo.ui.button(
         label="← Terug naar Verkenner",
@@ -765,25 +790,19 @@ def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, select
             mo.md("*Selecteer een school uit de dropdown of klik op een school in de Verkenner*")
         ])
     else:
-        _quality_name = SCHOOL_MAPPING.get(_selected_name, _selected_name)
-
-        # Get lottery info with preference breakdown (1st-5th)
-        _loting = pl.from_arrow(db.execute(f"""
-            SELECT ls.naam as school, a.naam as afdeling, a.variant, ls.type, sd.naam as stadsdeel,
-                   c.definitieve_capaciteit as capaciteit,
-                   v.eerste_voorkeur, v.tweede_voorkeur, v.derde_voorkeur,
-                   ROUND(CAST(v.eerste_voorkeur AS FLOAT) / NULLIF(c.definitieve_capaciteit, 0), 2) as ratio
-            FROM loting_db.afdeling a
-            JOIN loting_db.loting_school ls ON a.school_id = ls.id
-            JOIN loting_db.stadsdeel sd ON ls.stadsdeel_id = sd.id
-            LEFT JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = 2025
-            LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = 2025
-            WHERE a.id = {_selected_id}
-        """).fetch_arrow_table())
+        # The scholenopdekaart name of the afdeling's school, from the identity tables
+        _quality_name = list_quality_lookup.get(_selected_id, {}).get('name')
+        _detail = detail_cache.get(_selected_id, _quality_name)
+
+        # Prefetch the schools before and after this one in the dropdown
+        _keys = [(_aid, list_quality_lookup.get(_aid, {}).get('name')) for _aid, _ in detail_school_options.values()]
+        _index = next((_i for _i, (_aid, _) in enumerate(_keys) if _aid == _selected_id), None)
+        if _index is not None:
+            detail_cache.prefetch(_keys[max(_index - 1, 0):_index] + _keys[_index + 1:_index + 2])
 
         _sections = []
-        if not _loting.is_empty():
-            _info = _loting.to_dicts()[0]
+        if _detail.loting:
+            _info = _detail.loting
             _ratio = _info.get('ratio') or 0
             _sections.append(mo.md(f"## {_info['school']}"))
             _sections.append(mo.md(f"**Type:** {_info['type']} | **Stadsdeel:** {_info['stadsdeel']} | **Variant:** {_info.get('variant') or 'Regulier'}"))
@@ -798,14 +817,8 @@ def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, select
             _ev2 = _info.get('tweede_voorkeur') or 0
             _ev3 = _info.get('derde_voorkeur') or 0
 
-            # Get placement data per preference position
-            _plaatsingen = pl.from_arrow(db.execute(f"""
-                SELECT voorkeur_positie, aantal
-                FROM loting_db.plaatsing_per_voorkeur
-                WHERE afdeling_id = {_selected_id} AND jaar = 2025
-                ORDER BY voorkeur_positie
-            """).fetch_arrow_table())
-            _plaatsing_dict = {row['voorkeur_positie']: row['aantal'] for row in _plaatsingen.to_dicts()}
+            # Placement data per preference position
+            _plaatsing_dict = _detail.plaatsingen
             _pl1 = _plaatsing_dict.get(1, 0)
             _pl2 = _plaatsing_dict.get(2, 0)
             _pl3 = _plaatsing_dict.get(3, 0)
@@ -818,17 +831,10 @@ def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, select
                 mo.stat(value=str(_ev3), label="3e Voorkeur", caption=f"{_pl3} geplaatst", bordered=True),
             ], gap=2))
 
-        # Get exam results
-        _exams = pl.from_arrow(db.execute(f"""
-            SELECT e.schooljaar, ROUND(e.centraal_examen, 2) as ce, ROUND(e.centraal_examen_vergelijking, 2) as ce_land,
-                   ROUND(e.eindcijfer, 2) as eindcijfer
-            FROM scholen_db.schools s
-            JOIN scholen_db.examencijfers e ON s.id = e.school_id
-            WHERE s.name = '{_quality_name}'
-            ORDER BY e.schooljaar DESC
-        """).fetch_arrow_table())
-        if not _exams.is_empty():
-            _ex = _exams.to_dicts()[0]
+        # Exam results
+        _exams = _detail.examens
+        if _exams:
+            _ex = _exams[0]
             _ce = _ex.get('ce') or 0
             _ce_land = _ex.get('ce_land') or 0
             _diff = _ce - _ce_land if _ce and _ce_land else 0
@@ -841,35 +847,18 @@ def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, select
             ], gap=2))
             _sections.append(mo.ui.table(_exams, page_size=5))
 
-        # Get pass rates
-        _pass = pl.from_arrow(db.execute(f"""
-            SELECT sp.schooljaar, ROUND(sp.percentage, 1) as pct, ROUND(sp.vergelijking, 1) as land
-            FROM scholen_db.schools s
-            JOIN scholen_db.slagingspercentage sp ON s.id = sp.school_id
-            WHERE s.name = '{_quality_name}'
-            ORDER BY sp.schooljaar DESC LIMIT 1
-        """).fetch_arrow_table())
-        if not _pass.is_empty():
-            _p = _pass.to_dicts()[0]
+        # Pass rate
+        if _detail.slagingspercentage:
+            _p = _detail.slagingspercentage
             _sections.append(mo.md("### Slagingspercentage"))
             _sections.append(mo.hstack([
                 mo.stat(value=f"{_p.get('pct', 0):.0f}%", label="Geslaagd", caption=_p.get('schooljaar', ''), bordered=True),
                 mo.stat(value=f"{_p.get('land', 0):.0f}%", label="Landelijk", bordered=True),
             ], gap=2))
 
-        # Get satisfaction summary
-        _sat = pl.from_arrow(db.execute(f"""
-            SELECT t.metric, ROUND(t.cijfer, 1) as cijfer
-            FROM scholen_db.schools s
-            JOIN scholen_db.tevredenheid_trend t ON s.id = t.school_id
-            WHERE s.name = '{_quality_name}'
-            ORDER BY t.schooljaar DESC
-        """).fetch_arrow_table())
-        if not _sat.is_empty():
-            _metrics = {}
-            for _r in _sat.to_dicts():
-                if _r['metric'] not in _metrics:
-                    _metrics[_r['metric']] = _r['cijfer']
+        # Satisfaction summary (most recent score per metric)
+        if _detail.tevredenheid:
+            _metrics = _detail.tevredenheid
             _labels = {'leerlingen': 'Leerlingen', 'ouders': 'Ouders', 'sfeer': 'Sfeer', 'veiligheid': 'Veiligheid'}
             _stats = [mo.stat(value=f"{_metrics[m]:.1f}", label=l, bordered=True) for m, l in _labels.items() if m in _metrics and _metrics[m]]
             if _stats:
@@ -877,46 +866,35 @@ def _(SCHOOL_MAPPING, db, detail_school_options, mo, pl, school_dropdown, select
                 _sections.append(mo.md("### Tevredenheid (Samenvatting)"))
                 _sections.append(mo.hstack(_stats, gap=2))
 
-        # Get detailed satisfaction questions from tevredenheid_vragen
-        _tevr_vragen = pl.from_arrow(db.execute(f"""
-            SELECT tv.respondent, tv.vraag, ROUND(tv.cijfer, 1) as cijfer
-            FROM scholen_db.schools s
-            JOIN scholen_db.tevredenheid_vragen tv ON s.id = tv.school_id
-            WHERE s.name = '{_quality_name}'
-            ORDER BY tv.respondent, tv.cijfer DESC
-        """).fetch_arrow_table())
-        if not _tevr_vragen.is_empty():
+        # Detailed satisfaction questions from tevredenheid_vragen
+        _tevr_vragen = _detail.tevredenheid_vragen
+        if _tevr_vragen:
             _sections.append(mo.md("#### Tevredenheid: Gedetailleerde vragen"))
 
             # Split by respondent type
-            _leerling_vragen = _tevr_vragen.filter(pl.col("respondent") == "leerling")
-            _ouder_vragen = _tevr_vragen.filter(pl.col("respondent") == "ouder")
+            _leerling_vragen = [{"Vraag": _r['vraag'], "Cijfer": _r['cijfer']} for _r in _tevr_vragen if _r['respondent'] == "leerling"]
+            _ouder_vragen = [{"Vraag": _r['vraag'], "Cijfer": _r['cijfer']} for _r in _tevr_vragen if _r['respondent'] == "ouder"]
 
             _tevr_tabs = {}
-            if not _leerling_vragen.is_empty():
+            if _leerling_vragen:
                 _tevr_tabs["Leerlingen"] = mo.ui.table(
-                    _leerling_vragen.select(["vraag", "cijfer"]).rename({"vraag": "Vraag", "cijfer": "Cijfer"}),
+                    _leerling_vragen,
                     page_size=10, show_column_summaries=False
                 )
-            if not _ouder_vragen.is_empty():
+            if _ouder_vragen:
                 _tevr_tabs["Ouders"] = mo.ui.table(
-                    _ouder_vragen.select(["vraag", "cijfer"]).rename({"vraag": "Vraag", "cijfer": "Cijfer"}),
+                    _ouder_vragen,
                     page_size=10, show_column_summaries=False
                 )
             if _tevr_tabs:
                 _sections.append(mo.ui.tabs(_tevr_tabs))
 
-        # Get inspection indicators
-        _insp = pl.from_arrow(db.execute(f"""
-            SELECT o.indicator, ROUND(o.schoolwaarde, 2) as waarde, ROUND(o.inspectienorm, 2) as norm
-            FROM scholen_db.schools s
-            JOIN scholen_db.oordeel_inspectie o ON s.id = o.school_id
-            WHERE s.name = '{_quality_name}'
-        """).fetch_arrow_table())
-        if not _insp.is_empty():
+        # Inspection indicators
+        _insp = _detail.inspectie
+        if _insp:
             _ind_labels = {'onderwijspositie': 'Onderwijspositie', 'onderbouwsnelheid': 'Onderbouwsnelheid', 'bovenbouwsucces': 'Bovenbouwsucces'}
             _stats = []
-            for _r in _insp.to_dicts():
+            for _r in _insp:
                 _label = _ind_labels.get(_r['indicator'], _r['indicator'])
                 if _r.get('waarde') is not None:
                     _stats.append(mo.stat(value=f"{_r['waarde']:.2f}", label=_label, caption=f"norm: {_r.get('norm', 0):.2f}", bordered=True))
@@ -996,9 +974,9 @@ def _(loting_2025_stats, mo, stats_historical_content):
 
 
 @app.cell
-def _(alt, db, mo, pl):
+def _(alt, mo, pl, query_cache):
     # Historical summary: yearly participation and placement rates (2019-2025)
-    _year_summary = pl.from_arrow(db.execute("""
+    _year_summary = pl.from_arrow(query_cache.arrow("""
         SELECT
             CAST(jaar AS VARCHAR) as jaar,
             totaal_deelnemers,
@@ -1008,7 +986,7 @@ def _(alt, db, mo, pl):
         FROM loting_db.jaar_samenvatting
         WHERE percentage_eerste_voorkeur IS NOT NULL
         ORDER BY jaar
-    """).fetch_arrow_table())
+    """))
 
     # Create trend chart
     _trend_chart = mo.md("")
@@ -1036,7 +1014,7 @@ def _(alt, db, mo, pl):
         _trend_chart = mo.ui.altair_chart(_chart)
 
     # Schools overview: 3 years of capacity, demand and ratio per school
-    _schools_overview = pl.from_arrow(db.execute("""
+    _schools_overview = pl.from_arrow(query_cache.arrow("""
         WITH school_years AS (
             SELECT
                 ls.naam as school,
@@ -1065,7 +1043,7 @@ def _(alt, db, mo, pl):
         FROM school_years
         GROUP BY school, stadsdeel
         ORDER BY school
-    """).fetch_arrow_table())
+    """))
 
     stats_historical_content = mo.vstack([
         mo.md("""
@@ -1131,5 +1109,15 @@ def _(
     return
 
 
+@app.cell
+def _(mo, school_map):
+    # The map is the output of its own cell, which only runs once: the
+    # tabs above are redrawn on every change, and the map would be sent
+    # to the browser again with them. Changes reach it through
+    # explorer_map_state
+    mo.vstack([mo.md("## Kaart"), mo.Html(school_map.html)])
+    return
+
+
 if __name__ == "__main__":
     app.run()
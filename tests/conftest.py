@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the tests.
+
+Run with `uv run pytest`; the timing cases use pytest-benchmark, and
+`uv run pytest --benchmark-only` runs just those.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from middelbare import distance
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def repo_dir() -> Path:
+    """The repository, with the html/ and json/ source files."""
+    return REPO_DIR
+
+
+@pytest.fixture
+def rng():
+    """A random generator with a fixed seed."""
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def random_points(rng):
+    """Return a function giving n random (lat, lon) points around Amsterdam."""
+    def points(n: int) -> np.ndarray:
+        return np.column_stack([rng.uniform(52.28, 52.43, n), rng.uniform(4.75, 5.05, n)])
+    return points
+
+
+@pytest.fixture
+def random_locations(random_points):
+    """Return a function giving SchoolLocations of n schools named "School <i>"."""
+    def locations(n: int) -> distance.SchoolLocations:
+        return distance.SchoolLocations({f"School {i}": tuple(point) for i, point in enumerate(random_points(n))})
+    return locations
@@ -0,0 +1,51 @@
+"""
+Distances from one or many origins to all schools in one NumPy expression
+against a loop over point pairs, on random points around Amsterdam (e.g.
+4000 postcode centroids to 35 schools).
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from middelbare import distance
+
+CASES = [(1, 35), (1, 700), (4000, 35), (1000, 700)]
+
+
+def haversine_python(lat1, lon1, lat2, lon2):
+    """Haversine distance in metres for one pair of points, with math."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * distance.EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def distances_python(locations, origins):
+    """Distances from every origin to every school, one pair at a time."""
+    return [[haversine_python(lat1, lon1, lat2, lon2) for lat2, lon2 in locations.points] for lat1, lon1 in origins]
+
+
+@pytest.fixture(params=CASES, ids=lambda case: f"{case[0]} origins x {case[1]} schools")
+def points(request, random_points, random_locations):
+    """(origins, origins as passed to distances(), locations)."""
+    n_origins, n_schools = request.param
+    origins = random_points(n_origins)
+    return origins, origins[0] if n_origins == 1 else origins, random_locations(n_schools)
+
+
+def test_distances_match_loop(points):
+    origins, origins_arg, locations = points
+    actual = locations.distances(origins_arg)
+    expected = np.reshape(distances_python(locations, origins), np.shape(actual))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("method", ["numpy", "loop"])
+def test_bench_distances(benchmark, points, method):
+    origins, origins_arg, locations = points
+    benchmark.group = f"distances {len(origins)} origins x {len(locations)} schools"
+    if method == "numpy":
+        benchmark(locations.distances, origins_arg)
+    else:
+        benchmark(distances_python, locations, origins)
@@ -0,0 +1,143 @@
+"""
+Explorer filtering in SQL (explorer.explorer_rows) against fetching every
+afdeling and filtering in Python, as the notebook did before, on synthetic
+databases of 35, 500 and 5000 afdelingen.
+"""
+
+import duckdb
+import pytest
+
+from middelbare import explorer
+
+SIZES = [35, 500, 5000]
+
+CASES = {
+    "no filters": {},
+    "name search": {"name_search": "lyc"},
+    "ratio 0.5-1.5": {"ratio_range": (0.5, 1.5)},
+    "hidden 10%": {"hidden": "tenth"},
+    "all filters": {"name_search": "tweet", "ratio_range": (0.2, 2.0), "hidden": "tenth", "stadsdeel_id": 3},
+}
+
+
+def synthetic_loting_db(n_afdelingen: int):
+    """
+    Return a connection with an in-memory loting_db holding n_afdelingen
+    made-up afdelingen (three per school), with 2025 capaciteit and
+    voorkeuren derived from hashes of the ids.
+    """
+    db = duckdb.connect()
+    db.execute("ATTACH ':memory:' AS loting_db")
+    params = {"n": n_afdelingen, "schools": (n_afdelingen + 2) // 3}
+    statements = [
+        """
+        CREATE TABLE loting_db.stadsdeel AS
+        SELECT i AS id, 'Stadsdeel ' || i AS naam FROM range(1, 8) t(i)
+        """,
+        """
+        CREATE TABLE loting_db.loting_school AS
+        SELECT i AS id,
+               ['Lyceum', 'College', 'Gymnasium', 'School'][1 + i % 4] || ' ' || i AS naam,
+               1 + i % 7 AS stadsdeel_id,
+               CASE WHEN i % 3 = 0 THEN 'Categoraal' ELSE 'Breed' END AS type
+        FROM range(1, $schools + 1) t(i)
+        """,
+        """
+        CREATE TABLE loting_db.afdeling AS
+        SELECT i AS id, 'Afdeling ' || i AS naam, 1 + (i - 1) // 3 AS school_id,
+               1 AS onderwijsniveau_id,
+               [NULL, 'Tweetalig', 'Technasium', NULL][1 + i % 4] AS variant
+        FROM range(1, $n + 1) t(i)
+        """,
+        """
+        CREATE TABLE loting_db.capaciteit AS
+        SELECT id AS afdeling_id, 2025 AS jaar,
+               CASE WHEN id % 50 = 0 THEN NULL ELSE 20 + hash(id) % 180 END::INTEGER AS definitieve_capaciteit
+        FROM loting_db.afdeling
+        """,
+        """
+        CREATE TABLE loting_db.voorkeuren AS
+        SELECT id AS afdeling_id, 2025 AS jaar, (hash(id * 7) % 300)::INTEGER AS eerste_voorkeur
+        FROM loting_db.afdeling
+        """,
+    ]
+    for statement in statements:
+        db.execute(statement, {name: value for name, value in params.items() if f"${name}" in statement})
+    return db
+
+
+def explorer_rows_python(db, stadsdeel_id=None, school_type=None, ratio_range=(0, 3),
+                         name_search="", hidden=(), show_hidden=False, jaar=2025):
+    """
+    The explorer filtering as the notebook did it before: fetch, then filter
+    in Python. Ties in ratio are ordered by id, like explorer_rows.
+    """
+    stadsdeel_clause = f"AND ls.stadsdeel_id = {stadsdeel_id}" if stadsdeel_id else ""
+    type_clause = f"AND ls.type = '{school_type}'" if school_type else ""
+    cursor = db.execute(f"""
+        SELECT
+            a.id as afdeling_id, ls.naam as school, a.naam as afdeling, a.variant,
+            ls.type, sd.naam as stadsdeel, c.definitieve_capaciteit as capaciteit,
+            v.eerste_voorkeur,
+            ROUND(CAST(v.eerste_voorkeur AS FLOAT) / NULLIF(c.definitieve_capaciteit, 0), 2) as ratio
+        FROM loting_db.afdeling a
+        JOIN loting_db.loting_school ls ON a.school_id = ls.id
+        JOIN loting_db.stadsdeel sd ON ls.stadsdeel_id = sd.id
+        LEFT JOIN loting_db.capaciteit c ON a.id = c.afdeling_id AND c.jaar = {jaar}
+        LEFT JOIN loting_db.voorkeuren v ON a.id = v.afdeling_id AND v.jaar = {jaar}
+        WHERE a.onderwijsniveau_id = 1 {stadsdeel_clause} {type_clause}
+        ORDER BY ratio DESC NULLS LAST, a.id
+    """)
+    columns = [column[0] for column in cursor.description]
+    min_ratio, max_ratio = ratio_range
+    name_search = (name_search or "").strip().lower()
+
+    rows = []
+    for row in (dict(zip(columns, values)) for values in cursor.fetchall()):
+        is_hidden = row["afdeling_id"] in hidden
+        if is_hidden and not show_hidden:
+            continue
+        ratio = row.get("ratio") or 0
+        if ratio < min_ratio or ratio > max_ratio:
+            continue
+        if name_search:
+            if name_search not in row["school"].lower() and name_search not in (row.get("variant") or "").lower():
+                continue
+        rows.append({**row, "is_hidden": is_hidden})
+    return rows
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size} afdelingen")
+def loting_db(request):
+    db = synthetic_loting_db(request.param)
+    yield request.param, db
+    db.close()
+
+
+def case_filters(case: str, size: int) -> dict:
+    """The filters of an explorer case, with every tenth afdeling hidden for "tenth"."""
+    filters = CASES[case]
+    if filters.get("hidden") == "tenth":
+        filters = {**filters, "hidden": set(range(1, size + 1, 10))}
+    return filters
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_sql_matches_python_filtering(loting_db, case):
+    size, db = loting_db
+    filters = case_filters(case, size)
+    expected = explorer_rows_python(db, **filters)
+    actual = explorer.explorer_rows(db, **filters)
+    # explorer_rows also has afstand, NULL without an origin
+    assert [row.pop("afstand") for row in actual] == [None] * len(actual)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("case", ["no filters", "all filters"])
+@pytest.mark.parametrize("filtering", ["sql", "python"])
+def test_bench_refresh(benchmark, loting_db, filtering, case):
+    size, db = loting_db
+    filters = case_filters(case, size)
+    rows = explorer.explorer_rows if filtering == "sql" else explorer_rows_python
+    benchmark.group = f"explorer {size} afdelingen, {case}"
+    benchmark(rows, db, **filters)
@@ -0,0 +1,163 @@
+"""
+fetch.fetch() against a local stand-in for scholenopdekaart: conditional
+requests, the rate limit, retries and page snapshots.
+"""
+
+import gzip
+import hashlib
+import http.server
+import threading
+import time
+
+import pytest
+
+from middelbare import fetch
+from middelbare import pagestore
+
+N_SCHOOLS = 10
+THREADS = 4
+INTERVAL = 0.02
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """
+    Local stand-in for scholenopdekaart: serves pages from a dict with an
+    ETag, answers If-None-Match with 304 and gzips on request. Counts
+    connections and records when each request arrived.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pages, fail_once=()):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.pages = pages
+        self.fail_once = set(fail_once)
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), self.path))
+            fail = self.path in self.server.fail_once
+            self.server.fail_once.discard(self.path)
+        body = self.server.pages.get(self.path)
+        if fail or body is None:
+            self.send_response(503 if fail else 404)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def site(tmp_path):
+    """
+    (server, {path: page name}, base_dir) for N_SCHOOLS schools, with
+    urls.txt in base_dir; the first page fails once.
+    """
+    slugs = [f"school-{i}" for i in range(N_SCHOOLS)]
+    urls = {
+        f"/middelbare-scholen/amsterdam/{i}/{slug}/{page}/": f"{page}-{slug}.html"
+        for i, slug in enumerate(slugs) for page in fetch.PAGES
+    }
+    pages = {path: f"<html>{name}</html>".encode() for path, name in urls.items()}
+    server = StandInServer(pages, fail_once=[next(iter(pages))])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    (tmp_path / "urls.txt").write_text("".join(
+        f"{server.base_url}/middelbare-scholen/amsterdam/{i}/{slug}/\n" for i, slug in enumerate(slugs)
+    ))
+    yield server, urls, tmp_path
+    server.shutdown()
+    server.server_close()
+
+
+def snapshots(base_dir, urls):
+    """(the page store, snapshots per page name)."""
+    store = pagestore.PageStore(base_dir / pagestore.STORE_DIR)
+    return store, {name: len(store.history(name)) for name in urls.values()}
+
+
+def test_first_fetch_stores_every_page(site):
+    server, urls, base_dir = site
+    assert fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+
+    store, _ = snapshots(base_dir, urls)
+    for path, name in urls.items():
+        stored = store.latest(name)
+        assert stored is not None and stored.read_bytes() == server.pages[path]
+    # One page failed once and was retried
+    assert len(server.requests) == len(urls) + 1
+
+
+def test_first_fetch_is_rate_limited(site):
+    server, urls, base_dir = site
+    fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+
+    # Arrival times jitter a little around the slots the limiter hands out
+    times = sorted(arrived for arrived, _ in server.requests)
+    assert (times[-1] - times[0]) / (len(times) - 1) >= INTERVAL * 0.95
+    assert server.connections <= THREADS
+
+
+def test_refetch_stores_nothing(site):
+    server, urls, base_dir = site
+    fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+    _, first = snapshots(base_dir, urls)
+
+    assert fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+    assert snapshots(base_dir, urls)[1] == first
+
+
+def test_changed_page_gets_snapshots(site):
+    server, urls, base_dir = site
+    fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+    _, first = snapshots(base_dir, urls)
+
+    changed = next(iter(server.pages))
+    original = server.pages[changed]
+    server.pages[changed] = b"<html>changed</html>"
+    fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+    server.pages[changed] = original
+    fetch.fetch(base_dir, threads=THREADS, interval=INTERVAL)
+
+    store, last = snapshots(base_dir, urls)
+    assert [name for name in urls.values() if last[name] != first[name]] == [urls[changed]]
+    assert last[urls[changed]] == 3
+    # Changing the page back adds no new blob
+    assert len(store.blobs) == len(server.pages) + 1
@@ -0,0 +1,67 @@
+"""
+Explorer map updates, as a state for the map built once, against
+re-rendering the whole folium map, on random schools around Amsterdam of
+which half match the filters.
+"""
+
+from html import escape
+
+import folium
+import pytest
+
+from middelbare import kaart
+
+SIZES = [35, 1000]
+
+
+def rebuild_map(rows, locations, list_ids):
+    """The explorer map as the notebook built it before: all markers re-rendered per change."""
+    school_map = folium.Map(location=kaart.CENTER, zoom_start=kaart.ZOOM)
+    for row in rows:
+        coords = locations.get(row["_school_name"])
+        if not coords:
+            continue
+        in_list = row["_afdeling_id"] in list_ids
+        color = "red" if row["_ratio"] > 1.0 else ("orange" if row["_ratio"] >= 0.7 else "green")
+        popup = f"<b>{row['_school_name']}</b><br>Ratio: {row['_ratio']:.2f}"
+        folium.Marker(location=coords, popup=folium.Popup(popup, max_width=200),
+                      icon=folium.Icon(color=color, icon="star" if in_list else "info-sign"),
+                      tooltip=row["_school_name"]).add_to(school_map)
+    return school_map._repr_html_()
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size} schools")
+def explorer(request, rng, random_locations):
+    """(locations, explorer rows for every other school, the ids of the first 12 rows)."""
+    locations = random_locations(request.param)
+    rows = [
+        {"_school_name": name, "_afdeling_id": i, "_ratio": float(rng.uniform(0, 2)), "_variant": "Regulier"}
+        for i, name in enumerate(locations.names) if i % 2 == 0
+    ]
+    return locations, rows, {row["_afdeling_id"] for row in rows[:12]}
+
+
+def test_state_shows_filtered_schools(explorer):
+    locations, rows, list_ids = explorer
+    state = kaart.map_state(rows, locations, list_ids)
+    assert [marker[0] for marker in state["markers"]] == sorted(locations.positions[r["_school_name"]] for r in rows)
+    assert [marker[0] for marker in state["markers"] if marker[2]] == sorted(list_ids)
+
+
+def test_initial_state_is_rendered_into_map(explorer):
+    locations, rows, list_ids = explorer
+    school_map = kaart.SchoolMap(locations, kaart.map_state(rows, locations, list_ids))
+    assert school_map.channel in school_map.html
+    # The page is in the srcdoc of an iframe, HTML-escaped
+    assert escape('"seq": 0') in school_map.html
+
+
+@pytest.mark.parametrize("method", ["update", "rebuild"])
+def test_bench_map(benchmark, explorer, method):
+    locations, rows, list_ids = explorer
+    benchmark.group = f"map {len(locations)} schools"
+    if method == "update":
+        school_map = kaart.SchoolMap(locations, kaart.map_state(rows, locations, list_ids))
+        benchmark(lambda: school_map.state_html(kaart.map_state(rows, locations, list_ids)))
+    else:
+        benchmark(rebuild_map, rows, locations, list_ids)
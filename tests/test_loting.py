@@ -0,0 +1,24 @@
+"""
+Finding and staging the years of the Loting en Matching JSON.
+"""
+
+from middelbare import loting
+
+ENTRY = {
+    "capaciteit": {"2023": 120, "2024": 124},
+    "voorkeuren_2024": {"eerste": 150, "tweede": 80, "derde": 40},
+    "geplaatst": {"2024": 124, "2025": 118},
+    "geplaatst_naar_voorkeur_2024": {"eerste": 100, "tweede": 15, "derde": 6, "vierde_plus": 3},
+}
+
+
+def test_discover_years_includes_year_keyed_fields():
+    assert loting.discover_years([ENTRY], {"2022": {}}) == [2022, 2023, 2024, 2025]
+
+
+def test_stage_entry():
+    staged = {table: {} for table in [*loting.STAGING_TABLES, "plaatsing_per_voorkeur"]}
+    loting.stage_entry(staged, 7, 2024, ENTRY)
+    assert staged["capaciteit"] == {(7, 2024): {"definitieve_capaciteit": 124}}
+    assert staged["plaatsingen"] == {(7, 2024): {"totaal_geplaatst": 124}}
+    assert staged["plaatsing_per_voorkeur"] == {(7, 2024): [(1, 100), (2, 15), (3, 6), (4, 3)]}
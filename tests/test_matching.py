@@ -0,0 +1,79 @@
+"""
+The deferred-acceptance kernel against the reference implementation, on
+synthetic matchings of 1k, 10k and 100k students.
+"""
+
+import numpy as np
+import pytest
+
+from middelbare import matching
+
+SIZES = [1000, 10000, 100000]
+TIE_BREAKING = ["single", "multiple"]
+# Students per batched call, as the simulator does
+BATCH_STUDENTS = 100000
+
+
+def synthetic_matching(n_students: int, n_afdelingen: int = 150, list_length: int = 12,
+                       n_lotteries: int = 1, tie_breaking: str = "single", seed: int = 0):
+    """
+    Return (prefs, capacity, lotteries) for a synthetic matching.
+
+    Capacity is spread evenly over the afdelingen (10% more seats than
+    students) while popularity is skewed, so popular afdelingen reject a
+    lot and long rejection chains occur, as in the real matching.
+    lotteries holds n_lotteries independent draws.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = rng.pareto(1.0, n_afdelingen) + 1
+    capacity = rng.multinomial(int(n_students * 1.1), np.full(n_afdelingen, 1 / n_afdelingen)).astype(np.int32)
+    keys = rng.standard_exponential((n_students, n_afdelingen)) / popularity
+    prefs = np.argpartition(keys, list_length - 1, axis=1)[:, :list_length]
+    prefs = np.take_along_axis(prefs, np.take_along_axis(keys, prefs, axis=1).argsort(axis=1), axis=1)
+
+    if tie_breaking == "single":
+        lotteries = np.stack([rng.permutation(n_students) for _ in range(n_lotteries)])
+    else:
+        lotteries = rng.random((n_lotteries, n_students, n_afdelingen)).argsort(axis=1).argsort(axis=1)
+    return prefs.astype(np.int16), capacity, lotteries.astype(np.int32)
+
+
+@pytest.mark.parametrize("tie_breaking", TIE_BREAKING)
+@pytest.mark.parametrize("size", SIZES)
+def test_kernel_matches_reference(size, tie_breaking):
+    batch = max(1, BATCH_STUDENTS // size)
+    prefs, capacity, lotteries = synthetic_matching(size, n_lotteries=batch, tie_breaking=tie_breaking)
+
+    expected = matching.deferred_acceptance_reference(prefs, capacity, lotteries[0])
+    np.testing.assert_array_equal(matching.deferred_acceptance(prefs, capacity, lotteries[0]), expected)
+
+    placed = matching.deferred_acceptance(np.broadcast_to(prefs, (batch, *prefs.shape)), capacity, lotteries)
+    for lottery, positions in zip(lotteries[:3], placed[:3]):
+        np.testing.assert_array_equal(positions, matching.deferred_acceptance_reference(prefs, capacity, lottery))
+
+
+@pytest.mark.parametrize("tie_breaking", TIE_BREAKING)
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_kernel(benchmark, size, tie_breaking):
+    prefs, capacity, lotteries = synthetic_matching(size, tie_breaking=tie_breaking)
+    benchmark.group = f"matching {size} students, {tie_breaking} tie-breaking"
+    benchmark(matching.deferred_acceptance, prefs, capacity, lotteries[0])
+
+
+@pytest.mark.parametrize("tie_breaking", TIE_BREAKING)
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_reference(benchmark, size, tie_breaking):
+    prefs, capacity, lotteries = synthetic_matching(size, tie_breaking=tie_breaking)
+    benchmark.group = f"matching {size} students, {tie_breaking} tie-breaking"
+    benchmark.pedantic(matching.deferred_acceptance_reference, (prefs, capacity, lotteries[0]), rounds=1)
+
+
+@pytest.mark.parametrize("tie_breaking", TIE_BREAKING)
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_kernel_batched(benchmark, size, tie_breaking):
+    batch = max(1, BATCH_STUDENTS // size)
+    prefs, capacity, lotteries = synthetic_matching(size, n_lotteries=batch, tie_breaking=tie_breaking)
+    prefs = np.broadcast_to(prefs, (batch, *prefs.shape))
+    benchmark.group = f"matching {size} students, {tie_breaking} tie-breaking"
+    benchmark.extra_info["batch"] = batch
+    benchmark(matching.deferred_acceptance, prefs, capacity, lotteries)
@@ -0,0 +1,81 @@
+"""
+Importing html/ into the page store, and deleting pages from html/.
+"""
+
+import shutil
+
+import duckdb
+
+from middelbare import pagestore
+from middelbare import scholen
+
+PAGES = ["resultaten-barlaeus-gymnasium.html", "resultaten-berlage-lyceum.html"]
+
+
+def test_import_changed_files(tmp_path):
+    (tmp_path / "html").mkdir()
+    page = tmp_path / "html" / "resultaten-a.html"
+    page.write_text("<html>a</html>")
+    assert pagestore.open_store(tmp_path).names() == ["resultaten-a.html"]
+
+    page.write_text("<html>b</html>")
+    store = pagestore.open_store(tmp_path)
+    assert len(store.history("resultaten-a.html")) == 2
+    assert store.latest("resultaten-a.html").read_text() == "<html>b</html>"
+    assert pagestore.open_store(tmp_path).history("resultaten-a.html") == store.history("resultaten-a.html")
+
+
+def test_deleted_file_is_removed(tmp_path):
+    (tmp_path / "html").mkdir()
+    for name in ["resultaten-a.html", "resultaten-b.html"]:
+        (tmp_path / "html" / name).write_text(f"<html>{name}</html>")
+    pagestore.open_store(tmp_path)
+
+    (tmp_path / "html" / "resultaten-a.html").unlink()
+    assert pagestore.open_store(tmp_path).names() == ["resultaten-b.html"]
+    assert pagestore.PageStore(tmp_path / pagestore.STORE_DIR).names() == ["resultaten-b.html"]
+
+
+def test_deleted_file_keeps_fetched_versions(tmp_path):
+    (tmp_path / "html").mkdir()
+    (tmp_path / "html" / "resultaten-a.html").write_text("<html>imported</html>")
+    store = pagestore.open_store(tmp_path)
+    store.put("resultaten-a.html", b"<html>fetched</html>")
+    store.save()
+
+    (tmp_path / "html" / "resultaten-a.html").unlink()
+    store = pagestore.open_store(tmp_path)
+    assert len(store.history("resultaten-a.html")) == 1
+    assert store.latest("resultaten-a.html").read_bytes() == b"<html>fetched</html>"
+
+
+def test_deleted_page_leaves_database(repo_dir, tmp_path):
+    (tmp_path / "html").mkdir()
+    for name in PAGES:
+        shutil.copy(repo_dir / "html" / name, tmp_path / "html" / name)
+    scholen.build(tmp_path)
+
+    (tmp_path / "html" / PAGES[0]).unlink()
+    scholen.build(tmp_path)
+
+    assert sorted(path.name for path in (tmp_path / "json").glob("resultaten-*.json")) == [
+        PAGES[1].replace(".html", ".json")
+    ]
+    with duckdb.connect(str(tmp_path / "scholen.duckdb"), read_only=True) as con:
+        assert con.execute("SELECT COUNT(*) FROM schools").fetchone()[0] == 1
+
+
+def test_save_flushes_every_new_segment(tmp_path, monkeypatch):
+    monkeypatch.setattr(pagestore, "SEGMENT_SIZE", 64)
+    flushed = []
+    monkeypatch.setattr(pagestore.os, "fsync", lambda fd: flushed.append(fd))
+    store = pagestore.PageStore(tmp_path / pagestore.STORE_DIR)
+    for i in range(4):
+        store.put(f"page-{i}.html", bytes(range(256)) * (i + 1))
+
+    store.save()
+    segments = {blob[0] for blob in store.blobs.values()}
+    assert len(segments) > 1 and len(flushed) == len(segments)
+    # Nothing was appended since
+    store.save()
+    assert len(flushed) == len(segments)
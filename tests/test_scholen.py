@@ -0,0 +1,51 @@
+"""
+The single-pass HTML parser against the multi-pass one on the pages in
+html/, and the read_json load of scholen.duckdb against the Python load.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from middelbare import scholen
+
+RESULT_PAGES = sorted((Path(__file__).resolve().parent.parent / "html").glob("resultaten-*.html"))
+
+
+@pytest.mark.parametrize("html_file", RESULT_PAGES, ids=lambda path: path.stem)
+def test_parser_matches_multipass(html_file):
+    content = html_file.read_text(encoding="utf-8")
+    assert scholen.parse_school_content(content) == scholen.parse_school_content_multipass(content)
+
+
+@pytest.mark.parametrize("span", [
+    '<span class=infotip-term data-dfn="Het aantal leerlingen op de school.">723 leerlingen</span>',
+    '<span data-dfn="Het aantal leerlingen op de school.">723 leerlingen</span>',
+    '<span data-v-1 class="infotip-term" data-dfn="Het aantal leerlingen op de school.">723\nleerlingen</span>',
+])
+def test_aantal_leerlingen_anywhere_in_span(span):
+    assert scholen.parse_school_content(span)["school"]["aantalLeerlingen"] == 723
+
+
+@pytest.mark.parametrize("parser", ["single-pass", "multi-pass"])
+def test_bench_parse(benchmark, parser):
+    # The largest page, where the number of scans shows most
+    content = max((path.read_text(encoding="utf-8") for path in RESULT_PAGES), key=len)
+    benchmark.group = "parse largest resultaten page"
+    benchmark(scholen.parse_school_content if parser == "single-pass" else scholen.parse_school_content_multipass,
+              content)
+
+
+def test_sql_load_matches_python_load(repo_dir, tmp_path):
+    python_dir, sql_dir = tmp_path / "python", tmp_path / "sql"
+    for directory in (python_dir, sql_dir):
+        directory.mkdir()
+        (directory / "json").symlink_to(repo_dir / "json")
+        # The sources of the identity tables, if present
+        for name in ["urls.txt", "loting_matching.duckdb"]:
+            if (repo_dir / name).exists():
+                (directory / name).symlink_to(repo_dir / name)
+
+    scholen.create_database(python_dir, full=True)
+    scholen.create_database_sql(sql_dir)
+    assert scholen.compare_databases(python_dir / "scholen.duckdb", sql_dir / "scholen.duckdb") == []
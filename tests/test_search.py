@@ -0,0 +1,94 @@
+"""
+Fuzzy name search through the trigram index against the substring scan the
+explorer did before, on 100, 1000 and 5000 synthetic afdelingen.
+"""
+
+import pytest
+
+from middelbare import search
+
+SIZES = [100, 1000, 5000]
+
+WORDS = [
+    "Barlaeus", "Berlage", "Caland", "Cartesius", "Comenius", "Cygnus", "Damstede", "Fons Vitae",
+    "Gerrit van der Veen", "Hyperion", "Ignatius", "Marcanti", "Metis", "Nicolaas", "Spinoza", "Vossius",
+]
+KINDS = ["Lyceum", "College", "Gymnasium", "Montessori Lyceum", "Scholengemeenschap"]
+NIVEAUS = ["vwo", "v.a. havo", "v.a. vmbo-g-t"]
+
+
+def synthetic_names(n_afdelingen: int):
+    """
+    Return (schools, afdelingen) like identity.read_loting_schools(), with
+    n_afdelingen afdelingen (three per school) of made-up but realistic
+    school names, e.g. "Cartesius Lyceum Noord 12 - Tweetalig - vwo".
+    """
+    schools, afdelingen = [], []
+    for school_id in range(1, (n_afdelingen + 2) // 3 + 1):
+        word = WORDS[school_id % len(WORDS)]
+        kind = KINDS[school_id // len(WORDS) % len(KINDS)]
+        naam = f"{word} {kind} {['Noord', 'Zuid', 'Oost', 'West'][school_id % 4]} {school_id}"
+        schools.append((school_id, naam))
+        for niveau in NIVEAUS:
+            afdeling_id = len(afdelingen) + 1
+            if afdeling_id > n_afdelingen:
+                break
+            variant = [None, "Tweetalig", "Technasium", None][afdeling_id % 4]
+            full_name = f"{naam} - {variant} - {niveau}" if variant else f"{naam} - {niveau}"
+            afdelingen.append((afdeling_id, school_id, full_name, variant))
+    return schools, afdelingen
+
+
+def typo(text: str) -> str:
+    """Swap the first two different adjacent letters in the middle of the longest word of text."""
+    word = max(text.split(), key=len)
+    i = next(i for i in range(len(word) // 2, len(word)) if word[i - 1] != word[i])
+    return text.replace(word, word[:i - 1] + word[i] + word[i - 1] + word[i + 1:], 1)
+
+
+def scan(names, query: str) -> list:
+    """The afdeling ids whose name or variant contains query, as the explorer searched before."""
+    return [i + 1 for i, (naam, variant) in enumerate(names) if query in naam or query in variant]
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size} afdelingen")
+def names(request):
+    """(index, lowercased (naam, variant) per afdeling, a school to look for)."""
+    schools, afdelingen = synthetic_names(request.param)
+    index = search.NameIndex(search.name_entries(schools, afdelingen))
+    names = [(naam.lower(), (variant or "").lower()) for _, _, naam, variant in afdelingen]
+    return index, names, schools[len(schools) // 2]
+
+
+def queries(target: str) -> dict:
+    """Queries for target: its first word, its first letters and a typo."""
+    return {
+        "substring": target.split()[0].lower(),
+        "prefix": target.lower()[:4],
+        "typo": typo(target).lower(),
+    }
+
+
+@pytest.mark.parametrize("case", ["substring", "prefix", "typo"])
+def test_index_finds_substring_matches(names, case):
+    index, names, (_, target) = names
+    query = queries(target)[case]
+    assert set(scan(names, query)) <= set(index.afdeling_scores(query))
+
+
+def test_typo_ranks_school_first(names):
+    index, _, (target_id, target) = names
+    best = index.search(typo(target).lower(), limit=1, kinds={"loting_school"})
+    assert [result["id"] for result in best] == [target_id]
+
+
+@pytest.mark.parametrize("case", ["substring", "typo"])
+@pytest.mark.parametrize("method", ["index", "scan"])
+def test_bench_search(benchmark, names, method, case):
+    index, names, (_, target) = names
+    query = queries(target)[case]
+    benchmark.group = f"search {len(names)} afdelingen, {case}"
+    if method == "index":
+        benchmark(index.afdeling_scores, query)
+    else:
+        benchmark(scan, names, query)